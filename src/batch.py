@@ -0,0 +1,213 @@
+import glob
+import json
+import signal
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from functools import partial
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, TextIO, Tuple
+
+from src.cache import ResultCache, cached_solve
+from src.container import MapContainer, is_container
+from src.main import solve
+
+# One cache per worker process and cache directory, the directory itself is shared between the workers
+_worker_caches: Dict[str, ResultCache] = {}
+# Not available on Windows, the time limit is then only checked by the walk itself
+HAS_ALARM = hasattr(signal, 'SIGALRM')
+
+
+class MapTimeoutError(Exception):
+    pass
+
+
+def _worker_cache(cache_dir: str) -> ResultCache:
+    if cache_dir not in _worker_caches:
+        _worker_caches[cache_dir] = ResultCache(directory=cache_dir)
+    return _worker_caches[cache_dir]
+
+
+def collect_map_paths(source: Optional[str] = None, manifest: Optional[str] = None) -> List[Path]:
+    """
+    Resolves the maps of a batch. Source is either a directory (all `.txt` files in it) or a glob pattern, manifest
+    is a file that lists one map path per line, relative paths are resolved against the manifest's directory.
+
+    :param source: Directory or glob pattern
+    :param manifest: Path to the manifest file
+    :return: Paths of the maps
+    """
+    if manifest is not None:
+        manifest_path = Path(manifest)
+        with manifest_path.open() as f:
+            return [manifest_path.parent / line.strip() for line in f if line.strip()]
+    if Path(source).is_dir():
+        return sorted(Path(source).glob('*.txt'))
+    return [Path(p) for p in sorted(glob.glob(source, recursive=True))]
+
+
+@contextmanager
+def _time_limit(seconds: Optional[float]) -> Iterator[None]:
+    """
+    Raises `MapTimeoutError` in the current process once the time limit is reached. Relies on `SIGALRM` so it's
+    meant to be used in the main thread of a worker process, without `SIGALRM` it does nothing.
+
+    :param seconds: Time limit, None for no limit
+    """
+    if not seconds or not HAS_ALARM:
+        yield
+        return
+
+    def _on_alarm(signum, frame):
+        raise MapTimeoutError(f"Timed out after {seconds}s")
+
+    previous_handler = signal.signal(signal.SIGALRM, _on_alarm)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous_handler)
+
+
+def solve_map(map_path: Path, timeout: Optional[float] = None, lazy: bool = False,
+              corridors: bool = False, table: bool = False, cache_dir: Optional[str] = None,
+              map_index: Optional[int] = None, container: Optional[MapContainer] = None) -> Dict[str, str]:
+    """
+    Solves a single map and turns the outcome into a JSON serializable record.
+
+    :param map_path: Path to the map
+    :param timeout: Time limit in seconds, on platforms without `SIGALRM` it's the `time_limit` of `solve`, which
+        can't interrupt the loading itself
+    :param lazy: Memory-map the file and decode only the cells next to the path
+    :param corridors: Cross straight corridors in a single step
+    :param table: Walk the path using precomputed neighbour masks
+    :param cache_dir: Directory of the shared result cache, the record then also tells if it was `cached`
+    :param map_index: Index of the map when the file is a map container, the record then also has the `map_index`
+    :param container: The container at `map_path` when it's already open, the map is then solved from its mapping
+    :return: Record with either `letters` and `path` or an `error`
+    """
+    solver, cache = solve, None
+    if cache_dir is not None:
+        cache = _worker_cache(cache_dir)
+        solver = partial(cached_solve, cache=cache)
+    if timeout and not HAS_ALARM:
+        solver = partial(solver, time_limit=timeout)
+    if map_index is not None:
+        solver = partial(solver, map_index=map_index)
+    hits = cache.hits if cache is not None else 0
+    record = {'map': str(map_path)} if map_index is None else {'map': str(map_path), 'map_index': map_index}
+    try:
+        with _time_limit(timeout):
+            letters, path = solver(container if container is not None else str(map_path), lazy=lazy,
+                                   corridors=corridors, table=table)
+        record.update(letters=letters, path=path)
+    except ValueError as err:
+        record['error'] = str(err.args[0]) if err.args else ''
+    except MapTimeoutError as err:
+        record['error'] = str(err)
+    except Exception as err:
+        record['error'] = f"{type(err).__name__}: {err}"
+    if cache is not None:
+        record['cached'] = cache.hits > hits
+    return record
+
+
+def solve_chunk(entries: List[Tuple[Path, Optional[int]]], timeout: Optional[float] = None, lazy: bool = False,
+                corridors: bool = False, table: bool = False, cache_dir: Optional[str] = None) -> List[Dict[str, str]]:
+    """
+    Worker entry point, solves a chunk of maps one after another. An entry is a map path and the index of the map
+    when the path is a map container, every container of the chunk is mapped once for all of its maps.
+    """
+    containers: Dict[Path, MapContainer] = {}
+    try:
+        records = []
+        for map_path, map_index in entries:
+            container = None
+            if map_index is not None:
+                if map_path not in containers:
+                    containers[map_path] = MapContainer(Path(map_path))
+                container = containers[map_path]
+            records.append(solve_map(map_path, timeout=timeout, lazy=lazy, corridors=corridors, table=table,
+                                     cache_dir=cache_dir, map_index=map_index, container=container))
+        return records
+    finally:
+        for container in containers.values():
+            container.close()
+
+
+def _expand_containers(map_paths: List[Path]) -> Iterator[Tuple[Path, Optional[int]]]:
+    for map_path in map_paths:
+        if not is_container(Path(map_path)):
+            yield map_path, None
+            continue
+        try:
+            with MapContainer(Path(map_path)) as container:
+                count = len(container)
+        except ValueError:
+            # Not a container this version can read, `solve` reports it as the error of the map
+            yield map_path, None
+            continue
+        yield from ((map_path, index) for index in range(count))
+
+
+def run_batch(
+        map_paths: List[Path],
+        workers: Optional[int] = None,
+        chunk_size: int = 16,
+        ordered: bool = False,
+        timeout: Optional[float] = None,
+        lazy: bool = False,
+        corridors: bool = False,
+        table: bool = False,
+        cache_dir: Optional[str] = None,
+        output: TextIO = sys.stdout
+) -> int:
+    """
+    Solves the maps in a process pool and writes one JSON line per map as soon as its chunk is done, a map container
+    gets a line for each of its maps. The maps of containers are split into chunks like any other maps, so a big
+    container is solved by all the workers. If a worker dies (killed, out of memory) the maps of its chunk and of
+    every chunk still pending are reported as failed.
+
+    :param map_paths: Paths of the maps
+    :param workers: Number of worker processes, defaults to the number of CPUs
+    :param chunk_size: Number of maps sent to a worker at once
+    :param ordered: Write results in the order of `map_paths` instead of the order of completion
+    :param timeout: Time limit in seconds for a single map
+    :param lazy: Memory-map the files and decode only the cells next to the path
+    :param corridors: Cross straight corridors in a single step
+    :param table: Walk the paths using precomputed neighbour masks
+    :param cache_dir: Directory of a result cache shared by the workers, hits and misses are reported on stderr
+    :param output: Stream for the JSON lines
+    :return: Number of maps that failed
+    """
+    entries = list(_expand_containers(map_paths))
+    chunks = [entries[i:i + chunk_size] for i in range(0, len(entries), chunk_size)]
+    failed = 0
+    solved = 0
+    cache_hits = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(
+                solve_chunk, chunk, timeout=timeout, lazy=lazy, corridors=corridors, table=table, cache_dir=cache_dir
+            ): chunk
+            for chunk in chunks
+        }
+        for future in (futures if ordered else as_completed(futures)):
+            try:
+                records = future.result()
+            except BrokenProcessPool as err:
+                records = [
+                    {'map': str(p), **({} if i is None else {'map_index': i}), 'error': f"{type(err).__name__}: {err}"}
+                    for p, i in futures[future]
+                ]
+            for record in records:
+                solved += 1
+                failed += 'error' in record
+                cache_hits += record.get('cached', False)
+                output.write(json.dumps(record) + '\n')
+            output.flush()
+    if cache_dir is not None:
+        print(f"cache hits: {cache_hits}, misses: {solved - cache_hits}", file=sys.stderr)
+    return failed
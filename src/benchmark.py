@@ -0,0 +1,149 @@
+import json
+import sys
+import time
+import tracemalloc
+from argparse import ArgumentParser
+from typing import Any, Dict, List, Optional, Sequence
+
+from src.grid import Grid, Node
+from src.main import load_nodes, traverse
+from src.map_generator import INVALID_KINDS, VALID_GENERATORS, invalid_map
+from src.neighbour_table import build_neighbour_table, iter_table_path
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000, 10_000_000]
+
+
+def _walk(start_node: Node, nodes: Grid, table: bool) -> int:
+    if table:
+        return sum(1 for _ in iter_table_path(start_node=start_node, table=build_neighbour_table(nodes)))
+    return len(traverse(start_node=start_node, nodes=nodes))
+
+
+def _measure(lines: List[str], table: bool = False) -> Dict[str, Any]:
+    """
+    Parses and traverses a map once for timings and once more under `tracemalloc` for the peak memory.
+
+    :param lines: Map rows
+    :param table: Walk the path using precomputed neighbour masks, building the table counts as traversal time
+    :return: Measurements of the run
+    """
+    error = None
+    steps = 0
+    traverse_start = None
+    parse_start = time.perf_counter()
+    try:
+        start_node, nodes = load_nodes(lines)
+        traverse_start = time.perf_counter()
+        steps = _walk(start_node=start_node, nodes=nodes, table=table)
+    except ValueError as err:
+        error = str(err.args[0])
+    end = time.perf_counter()
+    if traverse_start is None:
+        traverse_start = end
+
+    tracemalloc.start()
+    try:
+        start_node, nodes = load_nodes(lines)
+        _walk(start_node=start_node, nodes=nodes, table=table)
+    except ValueError:
+        pass
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    traverse_time = end - traverse_start
+    return {
+        'parse_seconds': traverse_start - parse_start,
+        'traverse_seconds': traverse_time,
+        'steps': steps,
+        'steps_per_second': steps / traverse_time if traverse_time > 0 else 0.0,
+        'peak_memory_bytes': peak_memory,
+        'error': error,
+    }
+
+
+def run_benchmarks(
+        kinds: Sequence[str],
+        sizes: Sequence[int],
+        seed: int = 0,
+        table: bool = False
+) -> List[Dict[str, Any]]:
+    """
+    Generates every requested kind of map in every size and measures it. Invalid kinds are prefixed with
+    `invalid:`, e.g. `invalid:fork`.
+
+    :param kinds: Names of the generators
+    :param sizes: Approximate numbers of cells of the maps
+    :param seed: Seed of the valid map generators
+    :param table: Walk the paths using precomputed neighbour masks
+    :return: One result per kind and size
+    """
+    results = []
+    for kind in kinds:
+        for size in sizes:
+            if kind.startswith('invalid:'):
+                lines = invalid_map(kind[len('invalid:'):], size)
+            else:
+                lines = VALID_GENERATORS[kind](size, seed)
+            cells = len(lines) * max((len(line) for line in lines), default=0)
+            results.append({'kind': kind, 'size': size, 'cells': cells, **_measure(lines, table=table)})
+    return results
+
+
+def find_regressions(
+        results: List[Dict[str, Any]],
+        baseline: List[Dict[str, Any]],
+        tolerance: float
+) -> List[Dict[str, Any]]:
+    """
+    Compares results with a previous run. A result regressed if its traversal throughput dropped or its peak memory
+    grew by more than the tolerance.
+
+    :param results: Current results
+    :param baseline: Results of a previous run
+    :param tolerance: Allowed relative change, e.g. 0.2 for 20%
+    :return: Regressed results with their baseline values
+    """
+    previous = {(r['kind'], r['size']): r for r in baseline}
+    regressions = []
+    for result in results:
+        before = previous.get((result['kind'], result['size']))
+        if before is None:
+            continue
+        slower = result['steps_per_second'] < before['steps_per_second'] * (1 - tolerance)
+        bigger = result['peak_memory_bytes'] > before['peak_memory_bytes'] * (1 + tolerance)
+        if slower or bigger:
+            regressions.append({'current': result, 'baseline': before})
+    return regressions
+
+
+def main(args: Optional[Sequence[str]] = None) -> int:
+    parser = ArgumentParser(description='Measures parsing and traversal of generated maps')
+    parser.add_argument('--kinds', nargs='+', default=list(VALID_GENERATORS),
+                        help=f"Map kinds: {', '.join(VALID_GENERATORS)} or invalid:<{'|'.join(INVALID_KINDS)}>")
+    parser.add_argument('--sizes', nargs='+', type=float, default=DEFAULT_SIZES, help='Approximate cells per map')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the map generators')
+    parser.add_argument('--table', action='store_true', help='Walk the paths using precomputed neighbour masks')
+    parser.add_argument('--output', type=str, default=None, help='Write results to this JSON file')
+    parser.add_argument('--baseline', type=str, default=None, help='JSON results of a previous run to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed relative regression')
+    parsed = parser.parse_args(args)
+
+    results = run_benchmarks(kinds=parsed.kinds, sizes=[int(s) for s in parsed.sizes], seed=parsed.seed,
+                             table=parsed.table)
+    report = json.dumps(results, indent=2)
+    if parsed.output is not None:
+        with open(parsed.output, 'w') as f:
+            f.write(report)
+    else:
+        print(report)
+    if parsed.baseline is None:
+        return 0
+    with open(parsed.baseline) as f:
+        regressions = find_regressions(results, json.load(f), tolerance=parsed.tolerance)
+    for regression in regressions:
+        print(json.dumps(regression), file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,192 @@
+import os
+import re
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from multiprocessing.shared_memory import SharedMemory
+from typing import Iterator, Optional, Tuple
+
+from src.grid import Grid, Node
+from src.lookahead import RouteTable
+from src.main import (
+    _CORNER, _DIRECTION_BITS, _END_CHAR, _HORIZONTAL_DIRECTION, _START_CHAR, _VERTICAL_DIRECTION, Direction,
+    check_orientation_valid, expand_node, iter_path, next_step
+)
+
+_END = re.compile(re.escape(_END_CHAR.encode('ascii')))
+# The reverse walker checks the stop flag every this many steps
+_STOP_CHECK_STEPS = 1024
+# The forward walk looks for the chain of the reverse walker every this many steps
+_MEET_CHECK_STEPS = 64
+# Smaller grids are walked forward only, starting the worker and copying the grid costs more than half of their walk
+MIN_CELLS = 1 << 20
+
+
+def _is_set(states: memoryview, index: int, direction_bit: int) -> bool:
+    return bool(states[index >> 1] & (direction_bit << ((index & 1) << 2)))
+
+
+def _set(states: memoryview, index: int, direction_bit: int):
+    states[index >> 1] |= direction_bit << ((index & 1) << 2)
+
+
+def _reverse_candidate(current_node: Node, next_node: Node, grid: Grid) -> Optional[Node]:
+    """
+    Finds the only node the forward walk can come from to step from `current_node` to `next_node`.
+
+    :return: Previous node, None at the start, the end or an ambiguous junction
+    """
+    pos_x, pos_y = current_node.pos_x, current_node.pos_y
+    move_x, move_y = next_node.pos_x - pos_x, next_node.pos_y - pos_y
+    value = current_node.value
+    if value in [_VERTICAL_DIRECTION, _HORIZONTAL_DIRECTION]:
+        return grid.get((pos_x - move_x, pos_y - move_y))
+    if value == _CORNER:
+        # A corner always turns, so the walk came from one of the two sides
+        sides = [grid.get((pos_x - move_y, pos_y - move_x)), grid.get((pos_x + move_y, pos_y + move_x))]
+        sides = [side for side in sides if side is not None]
+        return sides[0] if len(sides) == 1 else None
+    if value.isupper():
+        neighbours = grid.neighbours(pos_x, pos_y, next_node.pos_x, next_node.pos_y)
+        if len(neighbours) == 3:
+            return grid.get((pos_x - move_x, pos_y - move_y))
+        return neighbours[0] if len(neighbours) == 1 else None
+    return None
+
+
+def _walk_back(grid: Grid, states: memoryview, stop_index: int, end_offset: int) -> Tuple[array, array]:
+    """
+    Walks the path backwards from the end. Every step is checked with the forward rules before its state is marked,
+    so a marked `(cell, direction)` state is one from which the forward walk is known to follow the chain to the end.
+    The walk stops at the start, at anything the forward walk wouldn't do and at an ambiguous junction.
+
+    :return: Cell indices and direction bits of the chain, from the end backwards
+    """
+    cells, direction_bits = array('Q'), array('B')
+    routes = RouteTable(grid)
+    width = grid.width
+    end_node = Node(value=_END_CHAR, pos_x=end_offset % width, pos_y=end_offset // width)
+    neighbours = expand_node(previous_node=end_node, current_node=end_node, nodes=grid)
+    if len(neighbours) != 1:
+        return cells, direction_bits
+    next_node, current_node = end_node, neighbours[0]
+    cells.append(end_offset)
+    direction_bits.append(_DIRECTION_BITS[(end_node.pos_x - current_node.pos_x, end_node.pos_y - current_node.pos_y)])
+    _set(states, end_offset, direction_bits[-1])
+    while current_node.value not in [_START_CHAR, _END_CHAR]:
+        if len(cells) % _STOP_CHECK_STEPS == 0 and states[stop_index]:
+            break
+        pos_x, pos_y = current_node.pos_x, current_node.pos_y
+        move_x, move_y = next_node.pos_x - pos_x, next_node.pos_y - pos_y
+        if current_node.value in [_VERTICAL_DIRECTION, _HORIZONTAL_DIRECTION]:
+            # A dash goes straight on, the forward step only has to be allowed to enter the next node
+            previous_node = grid.get((pos_x - move_x, pos_y - move_y))
+            if previous_node is None or not check_orientation_valid(
+                    current_node=next_node, direction=Direction(x=move_x, y=move_y), nodes=grid):
+                break
+        elif current_node.value.isupper() and grid.neighbour_count(pos_x, pos_y) == 4:
+            # The forward walk goes straight through a letter on a crossing
+            previous_node = grid.get((pos_x - move_x, pos_y - move_y))
+        else:
+            previous_node = _reverse_candidate(current_node=current_node, next_node=next_node, grid=grid)
+            if previous_node is None:
+                break
+            move_x, move_y = pos_x - previous_node.pos_x, pos_y - previous_node.pos_y
+            try:
+                forward_node, _ = next_step(
+                    current_node=current_node,
+                    neighbours=grid.neighbours(pos_x, pos_y, previous_node.pos_x, previous_node.pos_y),
+                    direction=Direction(x=move_x, y=move_y),
+                    nodes=grid,
+                    routes=routes
+                )
+            except ValueError:
+                break
+            if forward_node is None or forward_node.pos_x != next_node.pos_x or forward_node.pos_y != next_node.pos_y:
+                break
+        index = pos_y * width + pos_x
+        direction_bit = _DIRECTION_BITS[(move_x, move_y)]
+        mask = direction_bit << ((index & 1) << 2)
+        if states[index >> 1] & mask:
+            break
+        cells.append(index)
+        direction_bits.append(direction_bit)
+        states[index >> 1] |= mask
+        next_node, current_node = current_node, previous_node
+    return cells, direction_bits
+
+
+def walk_back(grid_name: str, width: int, height: int, states_name: str, end_offset: int) -> Tuple[array, array]:
+    """
+    Worker side of the bidirectional walk, attaches the shared grid and states and walks back from the end.
+
+    :param grid_name: Name of the shared memory block of the grid
+    :param width: Width of the grid
+    :param height: Height of the grid
+    :param states_name: Name of the shared memory block of the states, its last byte is the stop flag
+    :param end_offset: Cell index of the end
+    :return: Cell indices and direction bits of the chain, from the end backwards
+    """
+    grid_memory = SharedMemory(name=grid_name)
+    states_memory = SharedMemory(name=states_name)
+    cells = grid_memory.buf[:width * height]
+    try:
+        return _walk_back(Grid(cells=cells, width=width, height=height), states_memory.buf,
+                          stop_index=(width * height + 1) // 2, end_offset=end_offset)
+    finally:
+        cells.release()
+        grid_memory.close()
+        states_memory.close()
+
+
+def iter_bidirectional_path(start_node: Node, grid: Grid) -> Iterator[Node]:
+    """
+    Same path as `iter_path`, walked from both ends at once. The grid is copied into shared memory and a worker
+    process walks back from the end, marking the `(cell, direction)` states it has verified with the forward rules.
+    The forward walk runs here and every `_MEET_CHECK_STEPS` steps looks whether its state is marked. The walk is
+    deterministic, so once it has reached the chain of the worker it stays on it - from a marked state on, the path
+    is the reversed chain. If the worker stops at an ambiguous junction (or the map has more than one end) the chains
+    never meet and the forward walk simply goes on, errors are the ones of the forward walk.
+    Without a second CPU for the worker, or for grids smaller than `MIN_CELLS`, the path is walked forward only.
+
+    :param start_node: Starting node on the map
+    :param grid: Dense grid of the map
+    :return: Iterator over the nodes of the path
+    """
+    ends = [match.start() for match in islice(_END.finditer(grid.cells), 2)]
+    if len(ends) != 1 or grid.cell_count < MIN_CELLS or (os.cpu_count() or 1) < 2:
+        yield from iter_path(start_node=start_node, nodes=grid)
+        return
+    cell_count = grid.cell_count
+    grid_memory = SharedMemory(create=True, size=max(cell_count, 1))
+    states_memory = SharedMemory(create=True, size=(cell_count + 1) // 2 + 1)
+    executor = ProcessPoolExecutor(max_workers=1)
+    states = states_memory.buf
+    stop_index = (cell_count + 1) // 2
+    width = grid.width
+    try:
+        grid_memory.buf[:cell_count] = grid.cells
+        chain = executor.submit(walk_back, grid_memory.name, width, grid.height, states_memory.name, ends[0])
+        previous_node = None
+        for step, node in enumerate(iter_path(start_node=start_node, nodes=grid)):
+            if step % _MEET_CHECK_STEPS == 0 and previous_node is not None:
+                index = node.pos_y * width + node.pos_x
+                direction_bit = _DIRECTION_BITS[(node.pos_x - previous_node.pos_x, node.pos_y - previous_node.pos_y)]
+                if _is_set(states, index, direction_bit):
+                    states[stop_index] = 1
+                    cells, direction_bits = chain.result()
+                    meeting = next(i for i, state in enumerate(zip(cells, direction_bits))
+                                   if state == (index, direction_bit))
+                    for cell in reversed(cells[:meeting + 1]):
+                        pos_x, pos_y = cell % width, cell // width
+                        yield Node(value=grid.value_at(pos_x, pos_y), pos_x=pos_x, pos_y=pos_y)
+                    return
+            yield node
+            previous_node = node
+    finally:
+        states[stop_index] = 1
+        executor.shutdown(wait=True)
+        grid_memory.close()
+        grid_memory.unlink()
+        states_memory.close()
+        states_memory.unlink()
@@ -0,0 +1,171 @@
+import hashlib
+import json
+import os
+import tempfile
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Mapping, Optional, Tuple, Union
+
+from src.container import MapContainer, is_container
+from src.main import ENGINE_VERSION, solve
+
+Record = Dict[str, str]
+
+# Options of `solve` that can change its result, the others only pick a different engine for the same path. With
+# `max_steps` a whole corridor counts as a single step, so `corridors` is one of them too
+RESULT_OPTIONS = ('lazy', 'corridors', 'max_steps', 'map_index')
+# Other processes may write to a shared cache directory, so its size is recounted after this many writes
+_RECOUNT_PUTS = 256
+
+
+def map_key(raw_map: bytes, options: Optional[Mapping[str, Any]] = None) -> str:
+    """
+    Content address of a map, the engine version is part of it so results of older traversal rules are never reused.
+
+    :param raw_map: Content of the map file, or `MapContainer.map_bytes` of a map in a container
+    :param options: Options of `solve`, the ones in `RESULT_OPTIONS` that aren't falsy are part of the key
+    :return: Hex digest
+    """
+    used = {name: options[name] for name in RESULT_OPTIONS if options and options.get(name)}
+    header = f'engine-{ENGINE_VERSION}\n' + (json.dumps(used, sort_keys=True) + '\n' if used else '')
+    digest = hashlib.sha256(header.encode())
+    digest.update(raw_map)
+    return digest.hexdigest()
+
+
+def _raw_map(file_path: Union[str, MapContainer], map_index: int) -> bytes:
+    # Only the map's own bytes are hashed, a batch of a container then reads every map once instead of the whole file
+    if isinstance(file_path, MapContainer):
+        return file_path.map_bytes(map_index)
+    file_path = Path(file_path)
+    if is_container(file_path):
+        with MapContainer(file_path) as container:
+            return container.map_bytes(map_index)
+    return file_path.read_bytes()
+
+
+class ResultCache:
+    """
+    Cache of solved maps keyed by `map_key`. Records are either `{'letters': ..., 'path': ...}` or
+    `{'error': ...}`. There is an in-process LRU tier and an optional on-disk tier that can be shared between
+    processes: files are written atomically and the least recently used ones are removed when the directory grows
+    over `max_disk_bytes`. The size of the directory is kept as a running total, it's only listed again when the
+    total goes over the limit or every `_RECOUNT_PUTS` writes.
+    """
+
+    def __init__(self, max_entries: int = 1024, directory: Optional[str] = None, max_disk_bytes: int = 1 << 30):
+        self.max_entries = max_entries
+        self.directory = Path(directory) if directory is not None else None
+        self.max_disk_bytes = max_disk_bytes
+        self.memory: 'OrderedDict[str, Record]' = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.disk_bytes: Optional[int] = None
+        self.puts_since_count = 0
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _disk_path(self, key: str) -> Path:
+        return self.directory / f'{key}.json'
+
+    def get(self, key: str) -> Optional[Record]:
+        record = self.memory.get(key)
+        if record is not None:
+            self.memory.move_to_end(key)
+            self.hits += 1
+            return record
+        if self.directory is not None:
+            try:
+                with self._disk_path(key).open() as f:
+                    record = json.load(f)
+                # Keep the modification time as the "last used" time for the eviction
+                os.utime(self._disk_path(key))
+            except (OSError, ValueError):
+                record = None
+            if record is not None:
+                self._remember(key, record)
+                self.hits += 1
+                self.disk_hits += 1
+                return record
+        self.misses += 1
+        return None
+
+    def put(self, key: str, record: Record):
+        self._remember(key, record)
+        if self.directory is None:
+            return
+        disk_path = self._disk_path(key)
+        try:
+            replaced_size = disk_path.stat().st_size
+        except OSError:
+            replaced_size = 0
+        fd, temporary_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(record, f)
+                written_size = f.tell()
+            os.replace(temporary_path, disk_path)
+        except OSError:
+            Path(temporary_path).unlink(missing_ok=True)
+            raise
+        self.puts_since_count += 1
+        if self.disk_bytes is not None:
+            self.disk_bytes += written_size - replaced_size
+        if self.disk_bytes is None or self.disk_bytes > self.max_disk_bytes or self.puts_since_count >= _RECOUNT_PUTS:
+            self._evict_disk()
+
+    def _remember(self, key: str, record: Record):
+        self.memory[key] = record
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+    def _evict_disk(self):
+        entries = []
+        total = 0
+        for path in self.directory.glob('*.json'):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        for _, size, path in sorted(entries):
+            if total <= self.max_disk_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+        self.disk_bytes = total
+        self.puts_since_count = 0
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {'hits': self.hits, 'disk_hits': self.disk_hits, 'misses': self.misses}
+
+
+def cached_solve(file_path: Union[str, MapContainer], cache: ResultCache, **options) -> Tuple[str, str]:
+    """
+    `solve` that looks the map up in the cache first. Errors are cached as well and raised again on a hit. A solve
+    with a `time_limit` depends on the machine and its load, so it always runs and its result isn't cached.
+
+    :param file_path: Path to the file or an open map container
+    :param cache: Result cache
+    :param options: Options passed to `solve`, the ones in `RESULT_OPTIONS` are part of the key
+    :return: Visited letters and full path chars
+    """
+    if options.get('time_limit') is not None:
+        return solve(file_path, **options)
+    key = map_key(_raw_map(file_path, options.get('map_index', 0)), options)
+    record = cache.get(key)
+    if record is None:
+        try:
+            letters, path = solve(file_path, **options)
+        except ValueError as err:
+            cache.put(key, {'error': str(err.args[0]) if err.args else ''})
+            raise
+        record = {'letters': letters, 'path': path}
+        cache.put(key, record)
+    if 'error' in record:
+        raise ValueError(record['error'])
+    return record['letters'], record['path']
@@ -0,0 +1,168 @@
+import bz2
+import gzip
+import io
+import lzma
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+from typing import AbstractSet, BinaryIO, Iterator, Tuple, Union
+
+from src.grid import Grid, Node
+
+_START = b'@'
+_END = b'x'
+_CARRIAGE_RETURN = b'\r'
+# Magic bytes of the supported compressed formats and how they are decoded as a stream
+_COMPRESSED_FORMATS = [
+    (b'\x1f\x8b', lambda stream: gzip.GzipFile(fileobj=stream)),
+    (b'BZh', bz2.BZ2File),
+    (b'\xfd7zXZ\x00', lzma.LZMAFile),
+]
+_MAGIC_LENGTH = max(len(magic) for magic, _ in _COMPRESSED_FORMATS)
+# Path that stands for the standard input
+STDIN = '-'
+
+MapSource = Union[str, Path, BinaryIO]
+
+
+class _PrefixedReader(io.RawIOBase):
+    """
+    Raw stream that returns the bytes already read for the magic check before the rest of the wrapped stream. The
+    wrapped stream is never closed.
+    """
+
+    def __init__(self, prefix: bytes, stream: BinaryIO):
+        self.prefix = prefix
+        self.stream = stream
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if self.prefix:
+            count = min(len(buffer), len(self.prefix))
+            buffer[:count] = self.prefix[:count]
+            self.prefix = self.prefix[count:]
+            return count
+        data = self.stream.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def is_compressed(file_path: Path) -> bool:
+    """
+    Checks the magic bytes of the file, so compressed maps are recognised whatever their extension is.
+
+    :param file_path: Path to the file
+    :return: True for a gzip, bz2 or xz file
+    """
+    try:
+        with file_path.open('rb') as f:
+            head = f.read(_MAGIC_LENGTH)
+    except OSError:
+        return False
+    return any(head.startswith(magic) for magic, _ in _COMPRESSED_FORMATS)
+
+
+def is_stream_source(source: MapSource) -> bool:
+    """
+    :param source: Path to a map, `-` or a binary file-like object
+    :return: True if the map has to be read as a stream instead of loaded from a plain file
+    """
+    if not isinstance(source, (str, Path)):
+        return True
+    return str(source) == STDIN or is_compressed(Path(source))
+
+
+@contextmanager
+def open_map_stream(source: MapSource) -> Iterator[BinaryIO]:
+    """
+    Opens the map as a binary stream, compressed content is decompressed on the fly as the stream is read.
+
+    :param source: Path to a map, `-` for the standard input or a binary file-like object, which is not closed
+    :return: Context manager with the stream of the (decompressed) map bytes
+    """
+    if isinstance(source, (str, Path)) and str(source) != STDIN:
+        with open(source, 'rb') as f:
+            with open_map_stream(f) as stream:
+                yield stream
+        return
+    raw = sys.stdin.buffer if isinstance(source, (str, Path)) else source
+    head = raw.read(_MAGIC_LENGTH)
+    with io.BufferedReader(_PrefixedReader(head, raw)) as buffered:
+        for magic, decoder in _COMPRESSED_FORMATS:
+            if head.startswith(magic):
+                with decoder(buffered) as stream:
+                    yield stream
+                return
+        yield buffered
+
+
+def iter_map_lines(stream: BinaryIO) -> Iterator[bytes]:
+    """
+    Reads the map line by line, with the same newlines as the text mode of `load_map_from_file`.
+
+    :param stream: Binary stream of the map
+    :return: Iterator over the lines without their line endings
+    """
+    for line in stream:
+        if line.endswith(b'\n'):
+            line = line[:-1]
+        if _CARRIAGE_RETURN not in line:
+            yield line
+            continue
+        parts = line.split(_CARRIAGE_RETURN)
+        if not parts[-1]:
+            # `\r\n` or a trailing `\r` end the line, they don't start a new one
+            parts.pop()
+        yield from parts
+
+
+def load_grid_stream(stream: BinaryIO, allowed: AbstractSet[int]) -> Tuple[Node, Grid]:
+    """
+    Validates the map and builds its `Grid` while the stream is read, only one line is decoded at a time. Rows are
+    padded to a capacity that doubles whenever a longer line comes, so a widening map is re-padded a few times at
+    most, and the rows are packed to the real width in place at the end. The errors are the ones of `load_nodes`.
+
+    :param stream: Binary stream of the map
+    :param allowed: Byte values of valid non-empty chars
+    :return: Starting Node and the grid with all other nodes
+    """
+    valid_chars = bytes(sorted(allowed)) + b' '
+    cells = bytearray()
+    capacity = width = height = 0
+    start_node = None
+    end_found = False
+    for line in iter_map_lines(stream):
+        invalid = line.translate(None, valid_chars)
+        first_invalid = line.find(invalid[:1]) if invalid else len(line)
+        start = line.find(_START)
+        if start_node is not None:
+            second_start = start
+        else:
+            second_start = line.find(_START, start + 1) if start != -1 else -1
+        if second_start != -1 and second_start < first_invalid:
+            raise ValueError("Multiple start characters")
+        if invalid:
+            raise ValueError("Invalid char")
+        if start != -1 and start_node is None:
+            start_node = Node(value='@', pos_x=start, pos_y=height)
+        end_found = end_found or _END in line
+        if len(line) > capacity:
+            new_capacity = max(len(line), 2 * capacity)
+            cells = bytearray(b''.join(
+                cells[row * capacity:(row + 1) * capacity].ljust(new_capacity) for row in range(height)
+            ))
+            capacity = new_capacity
+        cells += line.ljust(capacity)
+        width = max(width, len(line))
+        height += 1
+    if start_node is None:
+        raise ValueError("Missing start character")
+    if not end_found:
+        raise ValueError("Missing end character")
+    if capacity > width:
+        for row in range(1, height):
+            cells[row * width:(row + 1) * width] = cells[row * capacity:row * capacity + width]
+        del cells[width * height:]
+    return start_node, Grid(cells=cells, width=width, height=height)
@@ -0,0 +1,177 @@
+import mmap
+import struct
+from argparse import ArgumentParser
+from pathlib import Path
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+from src.grid import Grid, Node
+
+CONTAINER_MAGIC = b'TMAP'
+CONTAINER_VERSION = 2
+# Magic, version and number of maps
+_HEADER = struct.Struct('<4sIQ')
+# Offset of the map data, length of the name, width, height, start x, start y and status
+_ENTRY = struct.Struct('<QIIIIIB3x')
+# Status of a map that failed to load. Its name is followed by the error message instead of the grid, the length of
+# the message is stored as the width
+_INVALID = 1
+
+
+class ContainerEntry(NamedTuple):
+    name: str
+    width: int
+    height: int
+    start_x: int
+    start_y: int
+    error: Optional[str]
+
+
+def is_container(file_path: Path) -> bool:
+    """
+    Checks the magic bytes of the file, so containers are recognised whatever their extension is.
+
+    :param file_path: Path to the file
+    :return: True for a map container
+    """
+    try:
+        with file_path.open('rb') as f:
+            return f.read(len(CONTAINER_MAGIC)) == CONTAINER_MAGIC
+    except OSError:
+        return False
+
+
+def compile_container(map_paths: Sequence[Path], output_path: Path) -> int:
+    """
+    Validates the maps and writes them into a single binary container. The file starts with a header and an index of
+    fixed size entries, followed by the name and the padded grid bytes of every map. Invalid maps are stored with
+    their error message instead of the grid.
+
+    :param map_paths: Paths of the text maps
+    :param output_path: Path of the container
+    :return: Number of maps written
+    """
+    from src.main import load_grid
+
+    data_offset = _HEADER.size + _ENTRY.size * len(map_paths)
+    entries = []
+    with output_path.open('wb') as f:
+        f.write(_HEADER.pack(CONTAINER_MAGIC, CONTAINER_VERSION, len(map_paths)))
+        f.write(bytes(_ENTRY.size * len(map_paths)))
+        for map_path in map_paths:
+            name = str(map_path).encode()
+            try:
+                start_node, grid = load_grid(Path(map_path))
+                entry = (data_offset, len(name), grid.width, grid.height, start_node.pos_x, start_node.pos_y, 0)
+                cells = grid.cells
+            except ValueError as err:
+                cells = (str(err.args[0]) if err.args else '').encode()
+                entry = (data_offset, len(name), len(cells), 0, 0, 0, _INVALID)
+            f.write(name)
+            f.write(cells)
+            entries.append(entry)
+            data_offset += len(name) + len(cells)
+        f.seek(_HEADER.size)
+        for entry in entries:
+            f.write(_ENTRY.pack(*entry))
+    return len(entries)
+
+
+class MapContainer:
+    """
+    Memory-mapped map container. Only the header is read when it's opened, `load` looks the map up in the index and
+    returns a `Grid` whose cells are a view into the mapped file, nothing is parsed or copied. The grids can't be used
+    after the container is closed.
+    """
+
+    def __init__(self, file_path: Path):
+        self._file = file_path.open('rb')
+        self.buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.count = _HEADER.unpack_from(self.buffer, 0)
+        if magic != CONTAINER_MAGIC or version != CONTAINER_VERSION:
+            self.close()
+            raise ValueError("Not a map container")
+        self._views: List[memoryview] = []
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _raw_entry(self, index: int) -> Tuple[int, int, int, int, int, int, int]:
+        if not 0 <= index < self.count:
+            raise IndexError(f"Map {index} not in container of {self.count} maps")
+        return _ENTRY.unpack_from(self.buffer, _HEADER.size + _ENTRY.size * index)
+
+    def _error(self, offset: int, name_length: int, width: int, status: int) -> Optional[str]:
+        if not status:
+            return None
+        return self.buffer[offset + name_length:offset + name_length + width].decode()
+
+    def entry(self, index: int) -> ContainerEntry:
+        offset, name_length, width, height, start_x, start_y, status = self._raw_entry(index)
+        error = self._error(offset, name_length, width, status)
+        return ContainerEntry(
+            name=self.buffer[offset:offset + name_length].decode(),
+            width=0 if error is not None else width,
+            height=height,
+            start_x=start_x,
+            start_y=start_y,
+            error=error
+        )
+
+    def map_bytes(self, index: int) -> bytes:
+        """
+        Everything the result of a map depends on: its index entry without the offset and the name, followed by its
+        grid bytes (or error message). It doesn't depend on the other maps of the container.
+
+        :param index: Index of the map
+        :return: Bytes of the map
+        """
+        offset, name_length, width, height, start_x, start_y, status = self._raw_entry(index)
+        data_offset = offset + name_length
+        data_length = width if status else width * height
+        return (_ENTRY.pack(0, 0, width, height, start_x, start_y, status)
+                + self.buffer[data_offset:data_offset + data_length])
+
+    def load(self, index: int) -> Tuple[Node, Grid]:
+        """
+        Same as `load_grid` for the map stored at the given index, raises the error found when it was compiled.
+
+        :param index: Index of the map
+        :return: Starting Node and the grid with all other nodes
+        """
+        offset, name_length, width, height, start_x, start_y, status = self._raw_entry(index)
+        if status:
+            raise ValueError(self._error(offset, name_length, width, status))
+        cells_offset = offset + name_length
+        view = memoryview(self.buffer)[cells_offset:cells_offset + width * height]
+        self._views.append(view)
+        return Node(value='@', pos_x=start_x, pos_y=start_y), Grid(cells=view, width=width, height=height)
+
+    def close(self):
+        for view in getattr(self, '_views', []):
+            view.release()
+        self.buffer.close()
+        self._file.close()
+
+    def __enter__(self) -> 'MapContainer':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def main(args: Optional[Sequence[str]] = None):
+    from src.batch import collect_map_paths
+
+    parser = ArgumentParser(description='Compiles text maps into a single binary map container')
+    parser.add_argument('source', nargs='?', default=None, help='Directory or glob of the maps')
+    parser.add_argument('--manifest', type=str, default=None, help='File listing one map path per line')
+    parser.add_argument('--output', type=str, required=True, help='Path of the container')
+    parsed = parser.parse_args(args)
+    if (parsed.source is None) == (parsed.manifest is None):
+        parser.error('Exactly one of source and --manifest is needed')
+    count = compile_container(collect_map_paths(source=parsed.source, manifest=parsed.manifest), Path(parsed.output))
+    print(f"Compiled {count} maps into {parsed.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+import re
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from src.grid import Grid, Node
+
+_HORIZONTAL_RUN = re.compile(rb'-{2,}')
+_VERTICAL_RUN = re.compile(rb'\|{2,}')
+
+
+class Corridor(NamedTuple):
+    """
+    Straight run of `-` or `|` chars that the traversal crossed in a single step.
+    """
+    value: str
+    length: int
+    pos_x: int
+    pos_y: int
+
+    @property
+    def text(self) -> str:
+        return self.value * self.length
+
+
+class CorridorIndex:
+    """
+    Precomputed run-length index of the straight corridors on a `Grid`. A corridor is a run of at least two `-` chars
+    in a row or `|` chars in a column. The index maps the offset of each end of a run to the offset of the other end,
+    so it costs two dictionary entries per corridor regardless of its length.
+    """
+    __slots__ = ('grid', 'ends')
+
+    def __init__(self, grid: Grid, ends: Dict[int, int]):
+        self.grid = grid
+        self.ends = ends
+
+    def jump(self, current_node: Node, step_x: int, step_y: int) -> Optional[Tuple[Corridor, Node, Node]]:
+        """
+        Crosses the corridor that starts at the current node, if the path enters it along its orientation.
+
+        :param current_node: Current node, first cell of the corridor
+        :param step_x: Horizontal direction of the path
+        :param step_y: Vertical direction of the path
+        :return: Crossed corridor without its last cell, node before the last cell and the last cell of the corridor,
+        or None if there is nothing to jump over
+        """
+        if (step_x == 0) != (current_node.value == '|'):
+            return None
+        width = self.grid.width
+        offset = current_node.pos_y * width + current_node.pos_x
+        other_end = self.ends.get(offset)
+        if other_end is None:
+            return None
+        end_x, end_y = other_end % width, other_end // width
+        length = (end_x - current_node.pos_x) * step_x + (end_y - current_node.pos_y) * step_y
+        if length <= 0:
+            return None
+        corridor = Corridor(value=current_node.value, length=length, pos_x=current_node.pos_x, pos_y=current_node.pos_y)
+        previous_node = Node(value=current_node.value, pos_x=end_x - step_x, pos_y=end_y - step_y)
+        return corridor, previous_node, Node(value=current_node.value, pos_x=end_x, pos_y=end_y)
+
+
+def build_corridor_index(grid: Grid) -> CorridorIndex:
+    """
+    Scans the rows for `-` runs and the columns for `|` runs of the grid.
+
+    :param grid: Map of characters
+    :return: Corridor index
+    """
+    ends = {}
+    width = grid.width
+    for pos_y in range(grid.height):
+        row_offset = pos_y * width
+        for run in _HORIZONTAL_RUN.finditer(grid.cells, row_offset, row_offset + width):
+            ends[run.start()] = run.end() - 1
+            ends[run.end() - 1] = run.start()
+    for pos_x in range(width):
+        column = bytes(grid.cells[pos_x::width])
+        for run in _VERTICAL_RUN.finditer(column):
+            first, last = run.start() * width + pos_x, (run.end() - 1) * width + pos_x
+            ends[first] = last
+            ends[last] = first
+    return CorridorIndex(grid=grid, ends=ends)
@@ -0,0 +1,233 @@
+import json
+import re
+from argparse import ArgumentParser
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+
+from src.compressed import MapSource, open_map_stream
+from src.grid import Grid
+from src.main import _VALID_BYTES
+from src.numpy_loader import NUMPY_AVAILABLE, np
+from src.prescan import prescan_map
+
+# Kinds of issues in the order they are reported for a cell, with the error the walk raises when it meets them
+ISSUE_ERRORS = {
+    'isolated_start': "No neighbours for starting point",
+    'multiple_start_paths': "Multiple starting paths",
+    'fork': "Fork in path",
+    'fake_turn': "Fake turn",
+    'letter_intersection': "Found letter intersection with 3 surrounding chars - don't know what to do!",
+    'dangling_dash': "Reached a problematic node with wrong dash",
+    'invalid_corner': "Invalid corner",
+    'broken_end': "Broken path",
+}
+ISSUE_KINDS = list(ISSUE_ERRORS)
+_EMPTY = ord(' ')
+_START = ord('@')
+_START_CHARS = re.compile(rb'@')
+_END = ord('x')
+_CORNER = ord('+')
+_HORIZONTAL = ord('-')
+_VERTICAL = ord('|')
+# (dx, dy) of the left, right, up and down neighbours
+_MOVES = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+
+
+class Issue(NamedTuple):
+    kind: str
+    pos_x: int
+    pos_y: int
+    char: str
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {'kind': self.kind, 'x': self.pos_x, 'y': self.pos_y, 'char': self.char,
+                'error': ISSUE_ERRORS[self.kind]}
+
+
+def _classify(value, occupied, dash, wrong, weak) -> list:
+    """
+    Rules of every issue kind. They only use `&`, `|`, `==`, `!=`, `<=` and sums, so the same code classifies whole
+    NumPy arrays at once and the plain values of a single cell.
+
+    :param value: Byte value of the cell
+    :param occupied: Occupancy of the left, right, up and down neighbours
+    :param dash: Whether each neighbour is a dash
+    :param wrong: Whether each neighbour is a dash across the move into it
+    :param weak: Whether each neighbour has at most 2 neighbours of its own
+    :return: Mask of every issue kind, in the order of `ISSUE_KINDS`
+    """
+    left, right, up, down = occupied
+    count = left * 1 + right * 1 + up * 1 + down * 1
+    horizontal, vertical = left | right, up | down
+    # A corner never turns into a dash across the move, the walk of a letter only avoids those that are dead ends
+    side = [occupied[i] & (wrong[i] == 0) for i in range(4)]
+    real = [occupied[i] & ((wrong[i] & weak[i]) == 0) for i in range(4)]
+    is_corner = value == _CORNER
+    is_letter = (value >= ord('A')) & (value <= ord('Z'))
+    is_horizontal = value == _HORIZONTAL
+    is_vertical = value == _VERTICAL
+    wrong_sides = left & right & wrong[0] & wrong[1] & vertical | up & down & wrong[2] & wrong[3] & horizontal
+    # A dash that has nothing ahead of it when it's walked along its orientation
+    dead_end = is_horizontal & (left != right) | is_vertical & (up != down)
+    return [
+        (value == _START) & (count == 0),
+        (value == _START) & (count > 1),
+        is_corner & (side[0] & side[1] & vertical | side[2] & side[3] & horizontal),
+        is_corner & (count >= 2) & ((horizontal == 0) | (vertical == 0) | wrong_sides),
+        is_letter & (count == 3) & (real[0] * 1 + real[1] * 1 + real[2] * 1 + real[3] * 1 == 3),
+        # Only checked by a dash that moves straight into it
+        (is_horizontal & (dash[2] | dash[3]) | is_vertical & (dash[0] | dash[1])) & (count <= 2),
+        dead_end & (count >= 2),
+        (dead_end | is_letter | is_corner) & (count == 1),
+    ]
+
+
+def _issue_masks_numpy(grid: Grid) -> list:
+    cells = np.frombuffer(grid.cells, dtype=np.uint8).reshape(grid.height, grid.width)
+    padded = np.full((grid.height + 2, grid.width + 2), _EMPTY, dtype=np.uint8)
+    padded[1:-1, 1:-1] = cells
+    is_occupied = padded != _EMPTY
+    counts = np.zeros(padded.shape, dtype=np.int8)
+    for dx, dy in _MOVES:
+        counts[1:-1, 1:-1] += is_occupied[1 + dy:grid.height + 1 + dy, 1 + dx:grid.width + 1 + dx]
+
+    def shifted(array, dx, dy):
+        return array[1 + dy:grid.height + 1 + dy, 1 + dx:grid.width + 1 + dx]
+
+    wrong_dash = [_VERTICAL, _VERTICAL, _HORIZONTAL, _HORIZONTAL]
+    is_dash = (padded == _HORIZONTAL) | (padded == _VERTICAL)
+    return _classify(
+        value=cells,
+        occupied=[shifted(is_occupied, dx, dy) for dx, dy in _MOVES],
+        dash=[shifted(is_dash, dx, dy) for dx, dy in _MOVES],
+        wrong=[shifted(padded, dx, dy) == dash for (dx, dy), dash in zip(_MOVES, wrong_dash)],
+        weak=[shifted(counts, dx, dy) <= 2 for dx, dy in _MOVES]
+    )
+
+
+def _issues_numpy(grid: Grid) -> List[Issue]:
+    found = []
+    for kind_index, mask in enumerate(_issue_masks_numpy(grid)):
+        found.extend((int(offset), kind_index) for offset in np.flatnonzero(mask))
+    return [_issue(grid, offset, kind_index) for offset, kind_index in sorted(found)]
+
+
+def _issues_python(grid: Grid) -> List[Issue]:
+    def value_at(pos_x, pos_y):
+        if 0 <= pos_x < grid.width and 0 <= pos_y < grid.height:
+            return grid.cells[pos_y * grid.width + pos_x]
+        return _EMPTY
+
+    def count_at(pos_x, pos_y):
+        return sum(value_at(pos_x + dx, pos_y + dy) != _EMPTY for dx, dy in _MOVES)
+
+    wrong_dash = [_VERTICAL, _VERTICAL, _HORIZONTAL, _HORIZONTAL]
+    issues = []
+    for offset, value in enumerate(grid.cells):
+        if value == _EMPTY:
+            continue
+        pos_x, pos_y = offset % grid.width, offset // grid.width
+        neighbours = [value_at(pos_x + dx, pos_y + dy) for dx, dy in _MOVES]
+        masks = _classify(
+            value=value,
+            occupied=[neighbour != _EMPTY for neighbour in neighbours],
+            dash=[neighbour in (_HORIZONTAL, _VERTICAL) for neighbour in neighbours],
+            wrong=[neighbour == dash for neighbour, dash in zip(neighbours, wrong_dash)],
+            weak=[count_at(pos_x + dx, pos_y + dy) <= 2 for dx, dy in _MOVES]
+        )
+        issues.extend(_issue(grid, offset, kind_index) for kind_index, mask in enumerate(masks) if mask)
+    return issues
+
+
+def _issue(grid: Grid, offset: int, kind_index: int) -> Issue:
+    pos_x, pos_y = offset % grid.width, offset // grid.width
+    return Issue(kind=ISSUE_KINDS[kind_index], pos_x=pos_x, pos_y=pos_y, char=chr(grid.cells[offset]))
+
+
+def _reachable(grid: Grid) -> bytearray:
+    """
+    Marks the cells connected to a start, the walk ends at `x`, so nothing is reached through one.
+
+    :param grid: Map of characters
+    :return: One byte per cell, non-zero for the reached ones
+    """
+    cells, width, size = grid.cells, grid.width, len(grid.cells)
+    reached = bytearray(size)
+    pending = [match.start() for match in _START_CHARS.finditer(cells)]
+    for offset in pending:
+        reached[offset] = 1
+    while pending:
+        offset = pending.pop()
+        if cells[offset] == _END:
+            continue
+        pos_x = offset % width
+        for neighbour, inside in ((offset - 1, pos_x > 0), (offset + 1, pos_x + 1 < width),
+                                  (offset - width, offset >= width), (offset + width, offset + width < size)):
+            if inside and not reached[neighbour] and cells[neighbour] != _EMPTY:
+                reached[neighbour] = 1
+                pending.append(neighbour)
+    return reached
+
+
+def diagnose_grid(grid: Grid, vectorized: bool = NUMPY_AVAILABLE) -> List[Issue]:
+    """
+    Classifies the neighbourhood of every cell of the map in one pass, instead of stopping at the first problem like
+    the walk does. The checks are local: a cell is reported if the walk would raise there when it arrives from one of
+    its neighbours. Only the cells connected to the start (and not only through `x`) are reported, as the walk can't
+    get anywhere else. With NumPy the neighbours of all cells are compared at once as shifted arrays, otherwise the
+    cells are checked one by one with the same rules.
+
+    :param grid: Map of characters
+    :param vectorized: Use NumPy, only possible when it's installed
+    :return: Issues in reading order
+    """
+    if grid.width == 0 or grid.height == 0:
+        return []
+    issues = _issues_numpy(grid) if vectorized else _issues_python(grid)
+    if not issues:
+        return issues
+    # Only maps with issues pay for the flood
+    reached = _reachable(grid)
+    return [issue for issue in issues if reached[issue.pos_y * grid.width + issue.pos_x]]
+
+
+def diagnose_map(source: MapSource, vectorized: bool = NUMPY_AVAILABLE) -> Dict[str, Any]:
+    """
+    Diagnoses a map file, the map doesn't have to be valid.
+
+    :param source: Path to the map (may be compressed), `-` or a binary file-like object
+    :param vectorized: Use NumPy, only possible when it's installed
+    :return: JSON-ready report with the load error of the map (or None), the number of issues of every kind and the
+        issues themselves
+    """
+    with open_map_stream(source) as stream:
+        raw_map = stream.read()
+    if b'\r' in raw_map:
+        raw_map = raw_map.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+    error: Optional[str] = None
+    try:
+        prescan_map(raw_map, allowed=_VALID_BYTES)
+    except ValueError as err:
+        error = err.args[0]
+    lines = raw_map.split(b'\n')
+    if raw_map.endswith(b'\n'):
+        lines.pop()
+    issues = diagnose_grid(Grid.from_lines(lines), vectorized=vectorized)
+    return {
+        'error': error,
+        'counts': {kind: sum(issue.kind == kind for issue in issues) for kind in ISSUE_KINDS},
+        'issues': [issue.as_dict() for issue in issues],
+    }
+
+
+def main(args: Optional[Sequence[str]] = None):
+    parser = ArgumentParser(description='Reports every structural issue of the maps, one JSON line per map')
+    parser.add_argument('maps', nargs='+', help='Paths of the maps, - for stdin')
+    parser.add_argument('--no-numpy', action='store_true', help='Check the cells one by one without NumPy')
+    parsed = parser.parse_args(args)
+    for map_path in parsed.maps:
+        report = diagnose_map(map_path, vectorized=NUMPY_AVAILABLE and not parsed.no_numpy)
+        print(json.dumps({'map': map_path, **report}))
+
+
+if __name__ == '__main__':
+    main()
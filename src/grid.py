@@ -0,0 +1,488 @@
+import mmap
+import re
+from abc import ABC, abstractmethod
+from array import array
+from bisect import bisect_right
+from collections.abc import Mapping
+from dataclasses import dataclass
+from typing import AbstractSet, Iterator, List, Optional, Tuple, Union
+
+_EMPTY = ord(' ')
+# Non-empty content of a row, gaps shorter than 8 spaces are kept inside a segment so paths don't split into cells
+_SEGMENT = re.compile(rb'[^ ]+(?: {1,7}[^ ]+)*')
+# Same newlines as the text mode of `load_map_from_file`
+_LINE_BREAK = re.compile(rb'\r\n?|\n')
+# Char of every byte value, indexing a list is cheaper than calling `chr` on the walk's hot path
+_CHARS = [chr(value) for value in range(256)]
+
+
+@dataclass
+class Node:
+    __slots__ = ('value', 'pos_x', 'pos_y')
+    value: str
+    pos_x: int
+    pos_y: int
+
+
+class _CellMap(Mapping, ABC):
+    """
+    Common read-only `Dict[Tuple[int, int], Node]` behaviour for map storages. It's an abstract base class, subclasses
+    have to provide `value_at`, `cell_index`, `cell_count` and iteration over occupied positions.
+    """
+    __slots__ = ()
+    # The sets of the walk are bitsets over `cell_index`, maps that are mostly never read use plain sets instead
+    dense_sets = True
+
+    @abstractmethod
+    def value_at(self, pos_x: int, pos_y: int) -> Optional[str]:
+        """
+        Character at the given position, or None if the cell is empty or outside of the map.
+        """
+
+    @abstractmethod
+    def cell_index(self, pos_x: int, pos_y: int) -> int:
+        """
+        Unique index of a cell in the range `[0, cell_count)`, used to key per-cell tables.
+        """
+
+    @property
+    @abstractmethod
+    def cell_count(self) -> int:
+        """
+        Number of cells that `cell_index` numbers.
+        """
+
+    @abstractmethod
+    def __iter__(self) -> Iterator[Tuple[int, int]]:
+        """
+        Positions of the occupied cells.
+        """
+
+    def get(self, position: Tuple[int, int], default: Optional[Node] = None) -> Optional[Node]:
+        value = self.value_at(position[0], position[1])
+        if value is None:
+            return default
+        return Node(value=value, pos_x=position[0], pos_y=position[1])
+
+    def neighbour_count(self, pos_x: int, pos_y: int) -> int:
+        """
+        Number of non-empty left, right, up and down neighbours of a cell, without creating their nodes.
+
+        :param pos_x: Column of the cell
+        :param pos_y: Row of the cell
+        :return: Number of neighbours
+        """
+        around = ((pos_x - 1, pos_y), (pos_x + 1, pos_y), (pos_x, pos_y - 1), (pos_x, pos_y + 1))
+        return sum(self.value_at(neighbour_x, neighbour_y) is not None for neighbour_x, neighbour_y in around)
+
+    def neighbours(self, pos_x: int, pos_y: int, previous_x: int, previous_y: int) -> List[Node]:
+        """
+        Non-empty left, right, up and down neighbours of a cell, except the one at the previous position. Nodes are
+        only created for the occupied cells.
+
+        :param pos_x: Column of the cell
+        :param pos_y: Row of the cell
+        :param previous_x: Column of the previous cell
+        :param previous_y: Row of the previous cell
+        :return: Neighbouring nodes
+        """
+        found = []
+        around = ((pos_x - 1, pos_y), (pos_x + 1, pos_y), (pos_x, pos_y - 1), (pos_x, pos_y + 1))
+        for neighbour_x, neighbour_y in around:
+            if neighbour_x == previous_x and neighbour_y == previous_y:
+                continue
+            value = self.value_at(neighbour_x, neighbour_y)
+            if value is not None:
+                found.append(Node(value, neighbour_x, neighbour_y))
+        return found
+
+    def __getitem__(self, position: Tuple[int, int]) -> Node:
+        node = self.get(position)
+        if node is None:
+            raise KeyError(position)
+        return node
+
+    def __contains__(self, position: object) -> bool:
+        return isinstance(position, tuple) and self.value_at(*position) is not None
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+
+class Grid(_CellMap):
+    """
+    Map of characters backed by a single flat `bytearray`. Every row is padded with spaces up to the width of the
+    widest row, so the cell at `(x, y)` lives at offset `y * width + x`. `Node` instances are not stored - they are
+    created on demand by lookups, which keeps memory at one byte per cell. The cells can also be a read-only
+    `memoryview`, for grids that live in a memory-mapped map container.
+
+    The class behaves like a read-only `Dict[Tuple[int, int], Node]` of non-empty cells, so handlers written against
+    a plain dictionary work on it unchanged.
+    """
+    __slots__ = ('cells', 'width', 'height')
+
+    def __init__(self, cells: Union[bytearray, memoryview], width: int, height: int):
+        self.cells = cells
+        self.width = width
+        self.height = height
+
+    @classmethod
+    def from_lines(cls, lines: List[bytes]) -> 'Grid':
+        """
+        Builds a grid out of encoded map rows, rows can be of different length.
+
+        :param lines: Rows of the map
+        :return: Grid instance
+        """
+        width = max((len(line) for line in lines), default=0)
+        cells = bytearray(b' ' * (width * len(lines)))
+        for i, line in enumerate(lines):
+            cells[i * width:i * width + len(line)] = line
+        return cls(cells=cells, width=width, height=len(lines))
+
+    def value_at(self, pos_x: int, pos_y: int) -> Optional[str]:
+        """
+        Returns the character at given position, or None if the cell is empty or outside of the map.
+
+        :param pos_x: Column of the cell
+        :param pos_y: Row of the cell
+        :return: Character or None
+        """
+        if 0 <= pos_x < self.width and 0 <= pos_y < self.height:
+            char = self.cells[pos_y * self.width + pos_x]
+            if char != _EMPTY:
+                return chr(char)
+        return None
+
+    def get(self, position: Tuple[int, int], default: Optional[Node] = None) -> Optional[Node]:
+        pos_x, pos_y = position
+        if 0 <= pos_x < self.width and 0 <= pos_y < self.height:
+            char = self.cells[pos_y * self.width + pos_x]
+            if char != _EMPTY:
+                return Node(_CHARS[char], pos_x, pos_y)
+        return default
+
+    def neighbour_count(self, pos_x: int, pos_y: int) -> int:
+        width, cells = self.width, self.cells
+        offset = pos_y * width + pos_x
+        return (
+            (pos_x > 0 and cells[offset - 1] != _EMPTY)
+            + (pos_x + 1 < width and cells[offset + 1] != _EMPTY)
+            + (pos_y > 0 and cells[offset - width] != _EMPTY)
+            + (pos_y + 1 < self.height and cells[offset + width] != _EMPTY)
+        )
+
+    def neighbours(self, pos_x: int, pos_y: int, previous_x: int, previous_y: int) -> List[Node]:
+        # Same as `_CellMap.neighbours` with the four cells read straight from the flat cells
+        width, cells = self.width, self.cells
+        offset = pos_y * width + pos_x
+        found = []
+        if pos_x > 0 and (pos_x - 1 != previous_x or pos_y != previous_y):
+            char = cells[offset - 1]
+            if char != _EMPTY:
+                found.append(Node(_CHARS[char], pos_x - 1, pos_y))
+        if pos_x + 1 < width and (pos_x + 1 != previous_x or pos_y != previous_y):
+            char = cells[offset + 1]
+            if char != _EMPTY:
+                found.append(Node(_CHARS[char], pos_x + 1, pos_y))
+        if pos_y > 0 and (pos_x != previous_x or pos_y - 1 != previous_y):
+            char = cells[offset - width]
+            if char != _EMPTY:
+                found.append(Node(_CHARS[char], pos_x, pos_y - 1))
+        if pos_y + 1 < self.height and (pos_x != previous_x or pos_y + 1 != previous_y):
+            char = cells[offset + width]
+            if char != _EMPTY:
+                found.append(Node(_CHARS[char], pos_x, pos_y + 1))
+        return found
+
+    def cell_index(self, pos_x: int, pos_y: int) -> int:
+        return pos_y * self.width + pos_x
+
+    @property
+    def cell_count(self) -> int:
+        return len(self.cells)
+
+    def __iter__(self) -> Iterator[Tuple[int, int]]:
+        for offset, char in enumerate(self.cells):
+            if char != _EMPTY:
+                yield offset % self.width, offset // self.width
+
+    def __len__(self) -> int:
+        cells = self.cells.tobytes() if isinstance(self.cells, memoryview) else self.cells
+        return len(cells) - cells.count(_EMPTY)
+
+
+class SparseGrid(_CellMap):
+    """
+    Map of characters that stores only the non-empty segments of every row, for wide maps that are mostly spaces.
+    The bytes of all segments are concatenated in `data`, a segment is described by its start and end column and
+    the offset of its bytes in `data`, and `row_segments[y]:row_segments[y + 1]` are the segments of row `y` sorted
+    by their start, so a lookup is a binary search within the row. Memory grows with the content of the map instead
+    of its width times its height.
+    """
+    __slots__ = ('data', 'starts', 'ends', 'offsets', 'row_segments', 'width', 'height')
+
+    def __init__(self, data: bytes, starts: array, ends: array, offsets: array, row_segments: array, width: int):
+        self.data = data
+        self.starts = starts
+        self.ends = ends
+        self.offsets = offsets
+        self.row_segments = row_segments
+        self.width = width
+        self.height = len(row_segments) - 1
+
+    @classmethod
+    def from_lines(cls, lines: List[bytes]) -> 'SparseGrid':
+        """
+        Builds a sparse grid out of encoded map rows.
+
+        :param lines: Rows of the map
+        :return: SparseGrid instance
+        """
+        segments = []
+        starts, ends, offsets, row_segments = array('I'), array('I'), array('Q'), array('Q', [0])
+        offset = 0
+        for line in lines:
+            for match in _SEGMENT.finditer(line):
+                segments.append(match.group(0))
+                starts.append(match.start())
+                ends.append(match.end())
+                offsets.append(offset)
+                offset += match.end() - match.start()
+            row_segments.append(len(starts))
+        width = max((len(line) for line in lines), default=0)
+        return cls(data=b''.join(segments), starts=starts, ends=ends, offsets=offsets, row_segments=row_segments,
+                   width=width)
+
+    def _segment(self, pos_x: int, pos_y: int) -> int:
+        if not 0 <= pos_y < self.height:
+            return -1
+        first = self.row_segments[pos_y]
+        segment = bisect_right(self.starts, pos_x, first, self.row_segments[pos_y + 1]) - 1
+        if segment < first or pos_x >= self.ends[segment]:
+            return -1
+        return segment
+
+    def value_at(self, pos_x: int, pos_y: int) -> Optional[str]:
+        segment = self._segment(pos_x, pos_y)
+        if segment == -1:
+            return None
+        char = self.data[self.offsets[segment] + pos_x - self.starts[segment]]
+        return chr(char) if char != _EMPTY else None
+
+    def cell_index(self, pos_x: int, pos_y: int) -> int:
+        """
+        Offset of the cell in `data`, only cells inside of the segments (all non-empty cells) have an index.
+        """
+        segment = self._segment(pos_x, pos_y)
+        if segment == -1:
+            raise KeyError((pos_x, pos_y))
+        return self.offsets[segment] + pos_x - self.starts[segment]
+
+    @property
+    def cell_count(self) -> int:
+        return len(self.data)
+
+    def __iter__(self) -> Iterator[Tuple[int, int]]:
+        for pos_y in range(self.height):
+            for segment in range(self.row_segments[pos_y], self.row_segments[pos_y + 1]):
+                offset = self.offsets[segment]
+                for pos_x in range(self.starts[segment], self.ends[segment]):
+                    if self.data[offset + pos_x - self.starts[segment]] != _EMPTY:
+                        yield pos_x, pos_y
+
+    def __len__(self) -> int:
+        return len(self.data) - self.data.count(_EMPTY)
+
+
+class MappedGrid(_CellMap):
+    """
+    Map of characters read lazily from a memory-mapped file. Lines are indexed on demand, up to the last row that was
+    looked at, and cells are decoded (and validated) when they are looked up, so pages of the file that the path never
+    reaches are never read. Lines may end with `\n`, `\r\n` or `\r`. The sets of the walk are plain sets of the
+    visited cells and states instead of bitsets over the whole file.
+    """
+    __slots__ = ('buffer', 'line_offsets', 'line_ends', 'allowed')
+    dense_sets = False
+
+    def __init__(self, buffer: mmap.mmap, allowed: AbstractSet[int]):
+        self.buffer = buffer
+        self.allowed = allowed
+        # Start of every indexed line plus the start of the line after them, and the end of every line's content
+        self.line_offsets = array('Q', [0])
+        self.line_ends = array('Q')
+
+    def _index_lines(self, pos_y: int) -> bool:
+        """
+        Indexes the lines of the file up to the given row.
+
+        :param pos_y: Row of the map
+        :return: False if the file has fewer rows
+        """
+        line_ends, line_offsets = self.line_ends, self.line_offsets
+        while len(line_ends) <= pos_y:
+            start = line_offsets[-1]
+            if start >= len(self.buffer):
+                return False
+            line_break = _LINE_BREAK.search(self.buffer, start)
+            if line_break is None:
+                line_ends.append(len(self.buffer))
+                line_offsets.append(len(self.buffer) + 1)
+            else:
+                line_ends.append(line_break.start())
+                line_offsets.append(line_break.end())
+        return True
+
+    @property
+    def height(self) -> int:
+        while self._index_lines(len(self.line_ends)):
+            pass
+        return len(self.line_ends)
+
+    def position_of(self, offset: int) -> Tuple[int, int]:
+        """
+        Converts byte offset in the file into `(x, y)` position on the map, lines are indexed up to the offset.
+
+        :param offset: Offset in the file
+        :return: Column and row of the cell
+        """
+        while self.line_offsets[-1] <= offset and self._index_lines(len(self.line_ends)):
+            pass
+        pos_y = bisect_right(self.line_offsets, offset) - 1
+        return offset - self.line_offsets[pos_y], pos_y
+
+    def value_at(self, pos_x: int, pos_y: int) -> Optional[str]:
+        if pos_x < 0 or pos_y < 0 or not self._index_lines(pos_y):
+            return None
+        offset = self.line_offsets[pos_y] + pos_x
+        if offset >= self.line_ends[pos_y]:
+            return None
+        char = self.buffer[offset]
+        if char == _EMPTY:
+            return None
+        if char not in self.allowed:
+            raise ValueError("Invalid char")
+        return chr(char)
+
+    def cell_index(self, pos_x: int, pos_y: int) -> int:
+        self._index_lines(pos_y)
+        return self.line_offsets[pos_y] + pos_x
+
+    @property
+    def cell_count(self) -> int:
+        return len(self.buffer)
+
+    def __iter__(self) -> Iterator[Tuple[int, int]]:
+        for pos_y in range(self.height):
+            for offset in range(self.line_offsets[pos_y], self.line_ends[pos_y]):
+                if self.buffer[offset] != _EMPTY:
+                    yield offset - self.line_offsets[pos_y], pos_y
+
+
+class CellBitset:
+    """
+    Set of cells of a map stored as one bit per cell.
+    """
+    __slots__ = ('bits', 'nodes')
+
+    def __init__(self, nodes: _CellMap):
+        self.nodes = nodes
+        self.bits = bytearray((nodes.cell_count + 7) // 8)
+
+    def add(self, pos_x: int, pos_y: int) -> bool:
+        """
+        Adds the cell to the set.
+
+        :param pos_x: Column of the cell
+        :param pos_y: Row of the cell
+        :return: True if the cell wasn't in the set before
+        """
+        index = self.nodes.cell_index(pos_x, pos_y)
+        mask = 1 << (index & 7)
+        if self.bits[index >> 3] & mask:
+            return False
+        self.bits[index >> 3] |= mask
+        return True
+
+
+class _PositionSet:
+    """
+    Fallback for `CellBitset` on plain dictionaries of nodes which have no cell indices.
+    """
+    __slots__ = ('positions',)
+
+    def __init__(self):
+        self.positions = set()
+
+    def add(self, pos_x: int, pos_y: int) -> bool:
+        if (pos_x, pos_y) in self.positions:
+            return False
+        self.positions.add((pos_x, pos_y))
+        return True
+
+
+class CellDirectionBitset:
+    """
+    Set of `(cell, direction)` states of a map stored as 4 bits per cell, one bit for each direction.
+    """
+    __slots__ = ('bits', 'cell_index')
+
+    def __init__(self, nodes: _CellMap):
+        self.cell_index = nodes.cell_index
+        self.bits = bytearray((nodes.cell_count + 1) // 2)
+
+    def add(self, pos_x: int, pos_y: int, direction_bit: int) -> bool:
+        """
+        Adds the state to the set.
+
+        :param pos_x: Column of the cell
+        :param pos_y: Row of the cell
+        :param direction_bit: One of 1, 2, 4 and 8
+        :return: True if the state wasn't in the set before
+        """
+        index = self.cell_index(pos_x, pos_y)
+        mask = direction_bit << ((index & 1) << 2)
+        if self.bits[index >> 1] & mask:
+            return False
+        self.bits[index >> 1] |= mask
+        return True
+
+
+class _StateSet:
+    """
+    Fallback for `CellDirectionBitset` on plain dictionaries of nodes which have no cell indices.
+    """
+    __slots__ = ('states',)
+
+    def __init__(self):
+        self.states = set()
+
+    def add(self, pos_x: int, pos_y: int, direction_bit: int) -> bool:
+        if (pos_x, pos_y, direction_bit) in self.states:
+            return False
+        self.states.add((pos_x, pos_y, direction_bit))
+        return True
+
+
+def state_set(nodes: Mapping) -> Union[CellDirectionBitset, _StateSet]:
+    """
+    Creates an empty set of `(cell, direction)` states for the given map, a bitset if the map has `dense_sets`.
+
+    :param nodes: Map of nodes
+    :return: Empty set of states
+    """
+    if isinstance(nodes, _CellMap) and nodes.dense_sets:
+        return CellDirectionBitset(nodes)
+    return _StateSet()
+
+
+def cell_set(nodes: Mapping) -> Union[CellBitset, _PositionSet]:
+    """
+    Creates an empty set of cells for the given map, a bitset if the map has `dense_sets`.
+
+    :param nodes: Map of nodes
+    :return: Empty set of cells
+    """
+    if isinstance(nodes, _CellMap) and nodes.dense_sets:
+        return CellBitset(nodes)
+    return _PositionSet()
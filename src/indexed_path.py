@@ -0,0 +1,225 @@
+import json
+import struct
+from argparse import ArgumentParser
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import Iterator, Optional, Sequence, Tuple, Union
+
+from src.corridors import Corridor
+from src.grid import Node, cell_set
+from src.main import _DIRECTION_BITS, NodeMap, open_path
+
+_MAGIC = b'IPTH'
+_VERSION = 1
+# Magic, version, number of steps and number of collected letters
+_HEADER = struct.Struct('<4sIQQ')
+# Type of the serialized arrays: xs, ys, directions and chars have one item per step, then the letter steps
+_ARRAY_TYPES = ['I', 'I', 'B', 'B', 'I']
+# Direction bit of a step (the move into its cell) -> (x, y) move, the first step has no direction
+_DIRECTIONS = {bit: move for move, bit in _DIRECTION_BITS.items()}
+
+
+def _cell_key(pos_x: int, pos_y: int) -> int:
+    return pos_y << 32 | pos_x
+
+
+class IndexedPath:
+    """
+    Solved path with indices for random-access queries. Steps are kept in compact arrays of positions, directions
+    and chars. The reverse index lists the steps of every visited cell, sorted by cell and then by step, so the steps
+    of a cell are found with a binary search. `letter_prefix[i]` is the number of collected letters before step `i`,
+    so the letters between any two steps are a slice.
+    """
+    __slots__ = ('xs', 'ys', 'directions', 'chars', 'letter_steps', 'cell_keys', 'cell_starts', 'cell_steps',
+                 'letter_prefix')
+
+    def __init__(self, xs: array, ys: array, directions: array, chars: bytes, letter_steps: array):
+        self.xs = xs
+        self.ys = ys
+        self.directions = directions
+        self.chars = chars
+        self.letter_steps = letter_steps
+
+        keys = [_cell_key(pos_x, pos_y) for pos_x, pos_y in zip(xs, ys)]
+        self.cell_steps = array('I', sorted(range(len(keys)), key=keys.__getitem__))
+        self.cell_keys = array('Q')
+        self.cell_starts = array('Q')
+        for index, step in enumerate(self.cell_steps):
+            if not self.cell_keys or self.cell_keys[-1] != keys[step]:
+                self.cell_keys.append(keys[step])
+                self.cell_starts.append(index)
+        self.cell_starts.append(len(self.cell_steps))
+
+        self.letter_prefix = array('I', bytes(4 * (len(xs) + 1)))
+        count = 0
+        for step in range(len(xs)):
+            self.letter_prefix[step] = count
+            if count < len(letter_steps) and letter_steps[count] == step:
+                count += 1
+        self.letter_prefix[len(xs)] = count
+
+    def __len__(self) -> int:
+        return len(self.xs)
+
+    @property
+    def path(self) -> str:
+        return self.chars.decode('ascii')
+
+    @property
+    def letters(self) -> str:
+        return ''.join(chr(self.chars[step]) for step in self.letter_steps)
+
+    def position(self, step: int) -> Tuple[int, int]:
+        return self.xs[step], self.ys[step]
+
+    def direction(self, step: int) -> Tuple[int, int]:
+        """
+        Move that led into the cell of the step, `(0, 0)` for the start.
+        """
+        return _DIRECTIONS.get(self.directions[step], (0, 0))
+
+    def steps_at(self, pos_x: int, pos_y: int) -> array:
+        """
+        Steps that visit the cell, in the order of the path.
+
+        :param pos_x: Column of the cell
+        :param pos_y: Row of the cell
+        :return: Step numbers, empty if the path never visits the cell
+        """
+        key = _cell_key(pos_x, pos_y)
+        index = bisect_left(self.cell_keys, key)
+        if index == len(self.cell_keys) or self.cell_keys[index] != key:
+            return array('I')
+        return self.cell_steps[self.cell_starts[index]:self.cell_starts[index + 1]]
+
+    def visit_count(self, pos_x: int, pos_y: int) -> int:
+        return len(self.steps_at(pos_x, pos_y))
+
+    def letters_between(self, start: int, stop: int) -> str:
+        """
+        Letters collected by the steps in `[start, stop)`.
+
+        :param start: First step
+        :param stop: Step after the last one
+        :return: Collected letters
+        """
+        steps = self.letter_steps[self.letter_prefix[start]:self.letter_prefix[stop]]
+        return ''.join(chr(self.chars[step]) for step in steps)
+
+    def to_bytes(self) -> bytes:
+        """
+        Serializes the steps and the collected letters, the indices are rebuilt when the path is read back.
+        """
+        return b''.join([
+            _HEADER.pack(_MAGIC, _VERSION, len(self), len(self.letter_steps)),
+            self.xs.tobytes(), self.ys.tobytes(), self.directions.tobytes(), self.chars, self.letter_steps.tobytes()
+        ])
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'IndexedPath':
+        """
+        Reads a path written by `to_bytes`, the data has to be complete.
+
+        :param data: Serialized path
+        :return: Indexed path
+        """
+        if len(data) < _HEADER.size:
+            raise ValueError("Not an indexed path")
+        magic, version, steps, letters = _HEADER.unpack_from(data, 0)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError("Not an indexed path")
+        counts = [steps, steps, steps, steps, letters]
+        size = _HEADER.size + sum(array(typecode).itemsize * count for typecode, count in zip(_ARRAY_TYPES, counts))
+        if len(data) != size:
+            raise ValueError(f"Indexed path of {steps} steps and {letters} letters needs {size} bytes, got {len(data)}")
+        arrays = []
+        offset = _HEADER.size
+        for typecode, count in zip(_ARRAY_TYPES, counts):
+            values = array(typecode)
+            values.frombytes(data[offset:offset + values.itemsize * count])
+            arrays.append(values)
+            offset += values.itemsize * count
+        xs, ys, directions, chars, letter_steps = arrays
+        if any(step >= steps for step in letter_steps) or any(a >= b for a, b in zip(letter_steps, letter_steps[1:])):
+            raise ValueError("Letter steps of the indexed path are out of order")
+        return cls(xs=xs, ys=ys, directions=directions, chars=chars.tobytes(), letter_steps=letter_steps)
+
+    def save(self, file_path: Path):
+        file_path.write_bytes(self.to_bytes())
+
+    @classmethod
+    def load(cls, file_path: Path) -> 'IndexedPath':
+        return cls.from_bytes(file_path.read_bytes())
+
+
+def _cells(steps: Iterator[Union[Node, Corridor]]) -> Iterator[Tuple[str, int, int, int]]:
+    previous_x = previous_y = None
+    for step in steps:
+        if isinstance(step, Corridor):
+            move_x, move_y = step.pos_x - previous_x, step.pos_y - previous_y
+            for i in range(step.length):
+                yield step.value, step.pos_x + i * move_x, step.pos_y + i * move_y, _DIRECTION_BITS[(move_x, move_y)]
+            previous_x, previous_y = step.pos_x + (step.length - 1) * move_x, step.pos_y + (step.length - 1) * move_y
+            continue
+        direction = 0 if previous_x is None else _DIRECTION_BITS[(step.pos_x - previous_x, step.pos_y - previous_y)]
+        yield step.value, step.pos_x, step.pos_y, direction
+        previous_x, previous_y = step.pos_x, step.pos_y
+
+
+def index_path(steps: Iterator[Union[Node, Corridor]], nodes: NodeMap) -> IndexedPath:
+    """
+    Walks the path and builds its indexed form, corridors are expanded into their cells.
+
+    :param steps: Steps from `iter_path`
+    :param nodes: Nodes that represent the map
+    :return: Indexed path
+    """
+    xs, ys, directions, letter_steps = array('I'), array('I'), array('B'), array('I')
+    chars = bytearray()
+    visited_letter_nodes = cell_set(nodes)
+    for step, (value, pos_x, pos_y, direction) in enumerate(_cells(steps)):
+        xs.append(pos_x)
+        ys.append(pos_y)
+        directions.append(direction)
+        chars.append(ord(value))
+        if value.isupper() and visited_letter_nodes.add(pos_x, pos_y):
+            letter_steps.append(step)
+    return IndexedPath(xs=xs, ys=ys, directions=directions, chars=bytes(chars), letter_steps=letter_steps)
+
+
+def solve_indexed(file_path: str, **options) -> IndexedPath:
+    """
+    Same as `solve` but returns the indexed path instead of the two strings.
+
+    :param file_path: Path to the file
+    :param options: Options of `open_path`
+    :return: Indexed path
+    """
+    with open_path(file_path, **options) as (node_map, steps):
+        return index_path(steps, node_map)
+
+
+def main(args: Optional[Sequence[str]] = None):
+    parser = ArgumentParser(description='Builds the indexed path of a map and answers queries about it, as JSON lines')
+    parser.add_argument('path', help='Map to solve, or an indexed path saved before with --load')
+    parser.add_argument('--load', action='store_true', help='Read a saved indexed path instead of solving a map')
+    parser.add_argument('--save', type=str, default=None, help='Store the indexed path in this file')
+    parser.add_argument('--cell', type=int, nargs=2, action='append', default=[], metavar=('X', 'Y'),
+                        help='Print the steps that visit the cell, can be repeated')
+    parser.add_argument('--letters-between', type=int, nargs=2, default=None, metavar=('START', 'STOP'),
+                        help='Print the letters collected by the steps in [START, STOP)')
+    parsed = parser.parse_args(args)
+    indexed = IndexedPath.load(Path(parsed.path)) if parsed.load else solve_indexed(parsed.path)
+    if parsed.save is not None:
+        indexed.save(Path(parsed.save))
+    print(json.dumps({'steps': len(indexed), 'letters': indexed.letters}))
+    for pos_x, pos_y in parsed.cell:
+        print(json.dumps({'cell': [pos_x, pos_y], 'steps': list(indexed.steps_at(pos_x, pos_y))}))
+    if parsed.letters_between is not None:
+        start, stop = parsed.letters_between
+        print(json.dumps({'start': start, 'stop': stop, 'letters': indexed.letters_between(start, stop)}))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+from typing import Dict, Mapping, Optional, Tuple
+
+from src.grid import Node, _CellMap
+from src.rules import is_intersection, is_wrong_dash
+
+# Bit of every move direction, same bits as the visited states in `src/main.py`
+_DIRECTION_BITS = {(-1, 0): 1, (1, 0): 2, (0, -1): 4, (0, 1): 8}
+
+
+class RouteTable:
+    """
+    Memoized answers to "is entering this cell in this direction a real route". Entering a dash across its
+    orientation is only a route if the dash is part of an intersection (it has more than 2 neighbours). The path goes
+    straight through an intersection and may cross another dash right after it, so the answer depends on the whole
+    run of crossed dashes and is false as soon as one of them isn't an intersection.
+    Every cell of the run gets the same answer, so each `(cell, direction)` pair is looked at once per solve. Dense
+    maps keep the answers in one byte per cell (known directions in the low 4 bits, valid ones in the high 4 bits),
+    allocated on the first question; plain dictionaries of nodes and maps without `dense_sets` use a dictionary.
+    """
+    __slots__ = ('nodes', 'bits', 'answers')
+
+    def __init__(self, nodes: Mapping[Tuple[int, int], Node]):
+        self.nodes = nodes
+        self.bits: Optional[bytearray] = None
+        dense = isinstance(nodes, _CellMap) and nodes.dense_sets
+        self.answers: Optional[Dict[Tuple[int, int, int], bool]] = None if dense else {}
+
+    def _cached(self, pos_x: int, pos_y: int, direction_bit: int) -> Optional[bool]:
+        if self.answers is not None:
+            return self.answers.get((pos_x, pos_y, direction_bit))
+        cell = self.bits[self.nodes.cell_index(pos_x, pos_y)]
+        if not cell & direction_bit:
+            return None
+        return bool(cell & direction_bit << 4)
+
+    def _store(self, pos_x: int, pos_y: int, direction_bit: int, valid: bool):
+        if self.answers is not None:
+            self.answers[(pos_x, pos_y, direction_bit)] = valid
+            return
+        index = self.nodes.cell_index(pos_x, pos_y)
+        self.bits[index] |= direction_bit | (direction_bit << 4 if valid else 0)
+
+    def _neighbour_count(self, pos_x: int, pos_y: int) -> int:
+        if isinstance(self.nodes, _CellMap):
+            return self.nodes.neighbour_count(pos_x, pos_y)
+        get = self.nodes.get
+        return sum(
+            get(position) is not None
+            for position in ((pos_x - 1, pos_y), (pos_x + 1, pos_y), (pos_x, pos_y - 1), (pos_x, pos_y + 1))
+        )
+
+    def is_route(self, node: Node, move_x: int, move_y: int) -> bool:
+        """
+        :param node: Cell that is entered
+        :param move_x: Horizontal part of the move into the cell
+        :param move_y: Vertical part of the move into the cell
+        :return: False if the run of dashes crossed from the cell runs into one that isn't an intersection
+        """
+        if self.answers is None and self.bits is None:
+            self.bits = bytearray(self.nodes.cell_count)
+        direction_bit = _DIRECTION_BITS[(move_x, move_y)]
+        run = []
+        valid = True
+        while node is not None:
+            cached = self._cached(node.pos_x, node.pos_y, direction_bit)
+            if cached is not None:
+                valid = cached
+                break
+            run.append(node)
+            if not is_wrong_dash(node.value, move_x):
+                break
+            if not is_intersection(self._neighbour_count(node.pos_x, node.pos_y)):
+                valid = False
+                break
+            node = self.nodes.get((node.pos_x + move_x, node.pos_y + move_y))
+        for cell in run:
+            self._store(cell.pos_x, cell.pos_y, direction_bit, valid)
+        return valid
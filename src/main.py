@@ -1,8 +1,35 @@
+import gc
+import json
+import mmap
+import shutil
+import string
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
 from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Tuple, Dict, Sequence, Optional
+from typing import Callable, List, NamedTuple, Tuple, Mapping, Sequence, Optional, Iterator, Union, TextIO
 from argparse import ArgumentParser
 
+if not __package__:
+    # Run as a script (`python src/main.py`), the `src` package is then imported from the root folder
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.compressed import (
+    MapSource, is_compressed, is_stream_source, iter_map_lines, load_grid_stream, open_map_stream
+)
+from src.container import MapContainer, is_container
+from src.corridors import Corridor, CorridorIndex, build_corridor_index
+from src.grid import Grid, MappedGrid, Node, SparseGrid, _CellMap, cell_set, state_set
+from src.lookahead import RouteTable
+from src.neighbour_table import build_neighbour_table, iter_table_path
+from src.parallel_loader import load_grid_parallel
+from src.numpy_loader import NUMPY_AVAILABLE, load_nodes_vectorized
+from src.prescan import prescan_map
+from src.rules import corner_turn, dash_end_error, is_intersection, is_wrong_dash, letter_way, start_way
+from src.run_length import OUTPUT_FORMATS, RunLengthEncoder
+
 _START_CHAR = '@'
 _END_CHAR = 'x'
 _HORIZONTAL_DIRECTION = '-'
@@ -10,12 +37,16 @@ _VERTICAL_DIRECTION = '|'
 _CORNER = '+'
 SPECIAL_CHARS = [_START_CHAR, _END_CHAR, _HORIZONTAL_DIRECTION, _VERTICAL_DIRECTION, _CORNER]
 
+# Bump whenever the traversal rules change, cached results of older versions are then ignored
+ENGINE_VERSION = 2
 
-@dataclass
-class Node:
-    value: str
-    pos_x: int
-    pos_y: int
+# Maps with a smaller share of occupied cells are loaded into a `SparseGrid` when it can be used
+SPARSE_OCCUPANCY = 0.05
+_VALID_BYTES = frozenset((''.join(SPECIAL_CHARS) + string.ascii_uppercase).encode('ascii'))
+
+NodeMap = Mapping[Tuple[int, int], Node]
+# Bit of every move direction in the visited states, same bits as in the neighbour table
+_DIRECTION_BITS = {(-1, 0): 1, (1, 0): 2, (0, -1): 4, (0, 1): 8}
 
 
 @dataclass
@@ -26,30 +57,32 @@ class Direction:
 
 def load_map_from_file(file_path: Path) -> List[str]:
     """
-    Loads map layout from file in form of list of strings
+    Loads map layout from file in form of list of strings, gzip, bz2 and xz files are decompressed as they are read
     :param file_path: Path to the target file
     :return: List of strings
     """
+    if is_compressed(file_path):
+        with open_map_stream(file_path) as stream:
+            return [line.decode('latin-1') for line in iter_map_lines(stream)]
     with file_path.open() as f:
         return [line.strip('\n') for line in f.readlines()]
 
 
-def load_nodes(str_map: List[str]) -> Tuple[Node, Dict[Tuple[int, int], Node]]:
+def load_nodes(str_map: List[str]) -> Tuple[Node, Grid]:
     """
-    Parses string map into a dictionary of positions and non-empty nodes. Along with that, it finds a starting node
-    that is marked with character @ and returns it directly.
+    Parses string map into a `Grid` of characters. Along with that, it finds a starting node that is marked with
+    character @ and returns it directly. The grid stores one byte per cell, so letters are the ASCII `A` to `Z` like
+    in the file loaders - other uppercase characters such as `Ä` are an invalid char.
 
     :param str_map: Map to be parsed
-    :return: Starting Node and all other nodes
+    :return: Starting Node and the grid with all other nodes
     """
-    node_dict = {}
     start_node = None
     end_node_found = False
     for i in range(len(str_map)):
         for j in range(len(str_map[i])):
             if str_map[i][j] == ' ':
                 continue
-            node_dict[(j, i)] = Node(value=str_map[i][j], pos_x=j, pos_y=i)
             if str_map[i][j] == _START_CHAR:
                 if start_node is not None:
                     raise ValueError("Multiple start characters")
@@ -57,20 +90,74 @@ def load_nodes(str_map: List[str]) -> Tuple[Node, Dict[Tuple[int, int], Node]]:
                 continue
             elif str_map[i][j] == _END_CHAR:
                 end_node_found = True
-            elif str_map[i][j] not in SPECIAL_CHARS and not str_map[i][j].isupper():
+            elif str_map[i][j] not in SPECIAL_CHARS and not 'A' <= str_map[i][j] <= 'Z':
                 raise ValueError("Invalid char")
 
     if start_node is None:
         raise ValueError("Missing start character")
     if end_node_found is False:
         raise ValueError("Missing end character")
-    return start_node, node_dict
+    return start_node, Grid.from_lines([line.encode('ascii') for line in str_map])
+
+
+def load_grid(file_path: Path, allow_sparse: bool = False) -> Tuple[Node, Union[Grid, SparseGrid]]:
+    """
+    Loads and validates the map file, with NumPy when it's installed and with `load_nodes` otherwise. Invalid maps
+    are rejected by `prescan_map` before anything is built.
+
+    :param file_path: Path to the target file
+    :param allow_sparse: Return a `SparseGrid` if less than `SPARSE_OCCUPANCY` of the cells are occupied
+    :return: Starting Node and the grid with all other nodes
+    """
+    raw_map = file_path.read_bytes()
+    if b'\r' in raw_map:
+        # Same newlines as the text mode of `load_map_from_file`
+        raw_map = raw_map.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+    start_offset = prescan_map(raw_map, allowed=_VALID_BYTES)
+    if allow_sparse:
+        lines = raw_map.split(b'\n')
+        if raw_map.endswith(b'\n'):
+            lines.pop()
+        occupied = len(raw_map) - raw_map.count(b' ') - raw_map.count(b'\n')
+        if occupied < SPARSE_OCCUPANCY * max(map(len, lines)) * len(lines):
+            pos_y = raw_map.count(b'\n', 0, start_offset)
+            pos_x = start_offset - raw_map.rfind(b'\n', 0, start_offset) - 1
+            return Node(value=_START_CHAR, pos_x=pos_x, pos_y=pos_y), SparseGrid.from_lines(lines)
+    if NUMPY_AVAILABLE:
+        return load_nodes_vectorized(raw_map, allowed=_VALID_BYTES)
+    return load_nodes(raw_map.decode('ascii').splitlines())
+
+
+@contextmanager
+def open_mapped_nodes(file_path: Path) -> Iterator[Tuple[Node, MappedGrid]]:
+    """
+    Lazy alternative to `load_nodes(load_map_from_file(...))`. The file is memory-mapped and only the start and end
+    characters are searched for up front, the cells are decoded as the traversal asks for them. Because of that an
+    invalid char is only reported if it's found next to the path.
+
+    :param file_path: Path to the target file
+    :return: Context manager with starting Node and the lazily loaded grid
+    """
+    with file_path.open('rb') as f:
+        if file_path.stat().st_size == 0:
+            raise ValueError("Missing start character")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            start_offset = buffer.find(_START_CHAR.encode())
+            if start_offset != -1 and buffer.find(_START_CHAR.encode(), start_offset + 1) != -1:
+                raise ValueError("Multiple start characters")
+            if start_offset == -1:
+                raise ValueError("Missing start character")
+            if buffer.find(_END_CHAR.encode()) == -1:
+                raise ValueError("Missing end character")
+            grid = MappedGrid(buffer=buffer, allowed=_VALID_BYTES)
+            pos_x, pos_y = grid.position_of(start_offset)
+            yield Node(value=_START_CHAR, pos_x=pos_x, pos_y=pos_y), grid
 
 
 def check_orientation_valid(
         current_node: Node,
         direction: Direction,
-        nodes: Dict[Tuple[int, int], Node]
+        nodes: NodeMap
 ) -> bool:
     """
     Check if the orientation is valid for given '|' or '-'. It is invalid if there is a "one way".
@@ -81,19 +168,22 @@ def check_orientation_valid(
     :param nodes: All Nodes on the map
     :return: True or False
     """
-    neighbours = expand_node(current_node=current_node, previous_node=current_node, nodes=nodes)
-    if ((direction.x != 0 and current_node.value == _VERTICAL_DIRECTION) or (
+    if not ((direction.x != 0 and current_node.value == _VERTICAL_DIRECTION) or (
             direction.y != 0 and current_node.value == _HORIZONTAL_DIRECTION
-    )) and len(neighbours) <= 2:
-        # Fake intersection, example situation: @--|--x
-        return False
-    return True
+    )):
+        return True
+    # Only a dash that is crossed needs its neighbours, it's a fake intersection with at most 2 of them
+    if isinstance(nodes, _CellMap):
+        neighbour_count = nodes.neighbour_count(current_node.pos_x, current_node.pos_y)
+    else:
+        neighbour_count = len(expand_node(current_node=current_node, previous_node=current_node, nodes=nodes))
+    return is_intersection(neighbour_count)
 
 
 def expand_node(
         previous_node: Node,
         current_node: Node,
-        nodes: Dict[Tuple[int, int], Node]
+        nodes: NodeMap
 ) -> List[Node]:
     """
     Collects all of the nodes except the previous ones as we never want to turn around (180 degrees) and return. This
@@ -105,13 +195,15 @@ def expand_node(
     :return: Neighbouring nodes
     """
     pos_x, pos_y = current_node.pos_x, current_node.pos_y
+    if isinstance(nodes, _CellMap):
+        return nodes.neighbours(pos_x, pos_y, previous_node.pos_x, previous_node.pos_y)
     neighbours = [nodes.get((pos_x - 1, pos_y), None), nodes.get((pos_x + 1, pos_y), None),
                   nodes.get((pos_x, pos_y - 1), None), nodes.get((pos_x, pos_y + 1), None)]
     return [n for n in neighbours if n is not None and n.value != ' ' and not (n.pos_y == previous_node.pos_y
                                                                                and n.pos_x == previous_node.pos_x)]
 
 
-def expand_start_node(start_node: Node, nodes: Dict[Tuple[int, int], Node]) -> Node:
+def expand_start_node(start_node: Node, nodes: NodeMap) -> Node:
     """
     Same as `expand_node` but just for the start case as it has some extra error handling.
 
@@ -119,17 +211,12 @@ def expand_start_node(start_node: Node, nodes: Dict[Tuple[int, int], Node]) -> N
     :param nodes: Entire map of nodes
     :return: Neighbouring nodes
     """
-    start_neighbours = expand_node(current_node=start_node, nodes=nodes, previous_node=start_node)
-    if len(start_neighbours) == 0:
-        raise ValueError("No neighbours for starting point")
-    if len(start_neighbours) > 1:
-        raise ValueError("Multiple starting paths")
-    return start_neighbours[0]
+    return start_way(expand_node(current_node=start_node, nodes=nodes, previous_node=start_node))
 
 
 def dash_handler(
         current_node: Node,
-        nodes: Dict[Tuple[int, int], Node],
+        nodes: NodeMap,
         direction: Direction,
 ) -> Optional[Node]:
     """
@@ -143,6 +230,8 @@ def dash_handler(
     """
     next_position = (current_node.pos_x + direction.x, current_node.pos_y + direction.y)
     next_node = nodes.get(next_position, None)
+    if next_node is None:
+        return None
     if not check_orientation_valid(current_node=next_node, direction=direction, nodes=nodes):
         raise ValueError("Reached a problematic node with wrong dash")
     return next_node
@@ -150,22 +239,30 @@ def dash_handler(
 
 def uppercase_handler(
         current_node: Node,
-        nodes: Dict[Tuple[int, int], Node],
+        nodes: NodeMap,
         neighbours: List[Node],
-        direction: Direction
+        direction: Direction,
+        routes: Optional[RouteTable] = None
 ) -> Tuple[Node, Direction]:
     """
     Handler which takes care of uppercase letter, it determines if we've reached an intersection - then takes the node
     that follows the direction. If that's not the case then the letter should have only one neighbor and path should
-    continue with that node and direction.
+    continue with that node and direction. A letter with two ways on is resolved like a corner fork: a way that
+    enters a dash across its orientation is only real if it crosses an intersection, which is looked up in `routes`.
     :param current_node: Current node
     :param nodes: All nodes on map
     :param neighbours: Neighbouring nodes
     :param direction: Direction of the path
+    :param routes: Memoized route lookahead of the walk, a new one is made if it's not given
     :return: Next node and new direction
     """
     if len(neighbours) == 2:
-        raise ValueError("Found letter intersection with 3 surrounding chars - don't know what to do!")
+        routes = routes if routes is not None else RouteTable(nodes)
+
+        def is_route(n: Node) -> bool:
+            return routes.is_route(n, move_x=n.pos_x - current_node.pos_x, move_y=n.pos_y - current_node.pos_y)
+
+        neighbours = [letter_way(neighbours, is_route=is_route)]
     if len(neighbours) == 3:
         # keep direction if crossroad
         next_position = (current_node.pos_x + direction.x, current_node.pos_y + direction.y)
@@ -195,93 +292,527 @@ def corner_handler(
         n for n in neighbours if not (
                 n.pos_x - current_node.pos_x == direction.x and n.pos_y - current_node.pos_y == direction.y)
     ]
-    if len(f_n) > 1:
-        # Check potential Fork
-        valid_n = []
-        for n in f_n:
-            # Check if corner neighbour nodes are valid -> they can either continue direction or turn right away
-            candidate_direction = Direction(x=n.pos_x - current_node.pos_x, y=n.pos_y - current_node.pos_y)
-            if candidate_direction.x != 0 and n.value == _VERTICAL_DIRECTION:
-                continue
-            if candidate_direction.y != 0 and n.value == _HORIZONTAL_DIRECTION:
-                continue
-            valid_n.append(n)
-        if len(valid_n) > 1:
-            raise ValueError("Fork in path")
-        if len(valid_n) == 0:
-            raise ValueError("Fake turn")
-        return valid_n[0], Direction(x=valid_n[0].pos_x - current_node.pos_x, y=valid_n[0].pos_y - current_node.pos_y)
-    if len(f_n) == 0:
-        raise ValueError("Fake turn")
-    return f_n[0], Direction(x=f_n[0].pos_x - current_node.pos_x, y=f_n[0].pos_y - current_node.pos_y)
+    # Corner neighbour nodes are valid if they can either continue the direction or turn right away
+    turn = corner_turn(f_n, is_wrong_dash=lambda n: is_wrong_dash(n.value, move_x=n.pos_x - current_node.pos_x))
+    return turn, Direction(x=turn.pos_x - current_node.pos_x, y=turn.pos_y - current_node.pos_y)
 
 
-def traverse(start_node: Node, nodes: Dict[Tuple[int, int], Node]) -> Sequence[Node]:
+class StepHandlers(NamedTuple):
+    """
+    Functions that make the moves of the walk. `src/stats.py` passes wrappers of them that count their calls.
+    """
+    expand_node: Callable[..., List[Node]]
+    dash_handler: Callable[..., Optional[Node]]
+    corner_handler: Callable[..., Tuple[Node, Direction]]
+    uppercase_handler: Callable[..., Tuple[Node, Direction]]
+
+
+DEFAULT_HANDLERS = StepHandlers(
+    expand_node=expand_node,
+    dash_handler=dash_handler,
+    corner_handler=corner_handler,
+    uppercase_handler=uppercase_handler
+)
+
+
+def iter_path(
+        start_node: Node,
+        nodes: NodeMap,
+        corridors: Optional[CorridorIndex] = None,
+        handlers: StepHandlers = DEFAULT_HANDLERS
+) -> Iterator[Union[Node, Corridor]]:
     """
     Function that iterates through the map by starting from first node, expanding its neighbours and checking if we
     have a valid situation depending on the value of that node - if that's not satisfied than an error is thrown.
+    Every step is yielded as soon as it's made, nothing but the current position is kept.
 
     :param start_node: Starting node on the map - inferred from `load_nodes` map
     :param nodes: Nodes that represent the map
-    :return: Final full path of the nodes
+    :param corridors: Optional corridor index, straight runs of dashes are then yielded as a single `Corridor`
+    :param handlers: Functions that make the moves
+    :return: Iterator over the nodes of the path
     """
-    visited = [start_node]
+    yield start_node
     current_node = expand_start_node(start_node, nodes)
-    direction = Direction(x=current_node.pos_x - start_node.pos_x, y=current_node.pos_y - start_node.pos_y)
+    yield from iter_path_from(previous_node=start_node, current_node=current_node, nodes=nodes, corridors=corridors,
+                              handlers=handlers)
+
+
+def iter_path_from(
+        previous_node: Node,
+        current_node: Node,
+        nodes: NodeMap,
+        corridors: Optional[CorridorIndex] = None,
+        handlers: StepHandlers = DEFAULT_HANDLERS
+) -> Iterator[Union[Node, Corridor]]:
+    """
+    Continues the walk of `iter_path` from any of its steps. The state of the walk is fully described by the current
+    node and the one before it, as the direction is always the move between them. The walk is deterministic, so if a
+    state is reached twice the path is a cycle that never gets to the end - the states are kept in a bitset of 4 bits
+    per cell and a repeated one raises an error.
+
+    :param previous_node: Previously visited node
+    :param current_node: Node to continue from, it's the first one yielded
+    :param nodes: Nodes that represent the map
+    :param corridors: Optional corridor index, straight runs of dashes are then yielded as a single `Corridor`
+    :param handlers: Functions that make the moves
+    :return: Iterator over the remaining nodes of the path
+    """
+    direction = Direction(x=current_node.pos_x - previous_node.pos_x, y=current_node.pos_y - previous_node.pos_y)
+    add_state = state_set(nodes).add
+    routes = RouteTable(nodes)
+    expand = handlers.expand_node
+    cell_neighbours = nodes.neighbours if expand is expand_node and isinstance(nodes, _CellMap) else None
     while True:
         if current_node is None:
-            raise ValueError("Node can't be None", visited)
-        neighbours = expand_node(current_node=current_node, previous_node=visited[-1], nodes=nodes)
-        if current_node == visited[-1]:
-            break
-        visited.append(current_node)
-        if current_node.value == _END_CHAR:
-            return visited
-        if len(neighbours) == 0:
-            raise ValueError("Broken path")
-        if current_node.value.isupper():
-            current_node, direction = uppercase_handler(
-                current_node=current_node,
-                nodes=nodes,
-                neighbours=neighbours,
-                direction=direction
-            )
-        elif current_node.value == _CORNER:
-            current_node, direction = corner_handler(
-                current_node=current_node,
-                neighbours=neighbours,
-                direction=direction
-            )
+            raise ValueError("Node can't be None", previous_node)
+        pos_x, pos_y = current_node.pos_x, current_node.pos_y
+        if cell_neighbours is None:
+            neighbours = expand(current_node=current_node, previous_node=previous_node, nodes=nodes)
         elif current_node.value in [_VERTICAL_DIRECTION, _HORIZONTAL_DIRECTION]:
-            current_node = dash_handler(current_node=current_node, direction=direction, nodes=nodes)
-            if current_node is None:
-                raise ValueError("Invalid corner")
+            # A dash goes straight on, `next_step` only counts its neighbours if there is no cell ahead of it
+            neighbours = None
+        else:
+            # Same as `expand_node`, without its dispatch on the type of the map on every step
+            neighbours = cell_neighbours(pos_x, pos_y, previous_node.pos_x, previous_node.pos_y)
+        if pos_x == previous_node.pos_x and pos_y == previous_node.pos_y:
+            return
+        if not add_state(pos_x, pos_y, _DIRECTION_BITS[(direction.x, direction.y)]):
+            raise ValueError("Cycle in path")
+        if corridors is not None and current_node.value in [_VERTICAL_DIRECTION, _HORIZONTAL_DIRECTION]:
+            jump = corridors.jump(current_node=current_node, step_x=direction.x, step_y=direction.y)
+            if jump is not None:
+                corridor, previous_node, current_node = jump
+                yield corridor
+                continue
+        yield current_node
+        previous_node = current_node
+        if current_node.value == _END_CHAR:
+            return
+        current_node, direction = next_step(
+            current_node=current_node,
+            neighbours=neighbours,
+            direction=direction,
+            nodes=nodes,
+            routes=routes,
+            handlers=handlers
+        )
+
+
+def next_step(
+        current_node: Node,
+        neighbours: Optional[List[Node]],
+        direction: Direction,
+        nodes: NodeMap,
+        routes: Optional[RouteTable] = None,
+        handlers: StepHandlers = DEFAULT_HANDLERS
+) -> Tuple[Optional[Node], Direction]:
+    """
+    Single move of the walk, picks the handler for the value of the current node. The start node has no handler, it
+    stays where it is, which ends the walk if the path leads back to it.
 
+    :param current_node: Current node, not the end
+    :param neighbours: Neighbouring nodes except the previous one, from `expand_node`. It may be None for a dash on a
+        map with cell indices, which only needs the cell ahead of it
+    :param direction: Direction of the path
+    :param nodes: Nodes that represent the map
+    :param routes: Memoized route lookahead of the walk for letter junctions
+    :param handlers: Functions that make the moves
+    :return: Next node and new direction
+    """
+    if neighbours is not None and len(neighbours) == 0:
+        raise ValueError("Broken path")
+    if current_node.value.isupper():
+        return handlers.uppercase_handler(
+            current_node=current_node,
+            nodes=nodes,
+            neighbours=neighbours,
+            direction=direction,
+            routes=routes
+        )
+    if current_node.value == _CORNER:
+        return handlers.corner_handler(
+            current_node=current_node,
+            neighbours=neighbours,
+            direction=direction
+        )
+    if current_node.value in [_VERTICAL_DIRECTION, _HORIZONTAL_DIRECTION]:
+        next_node = handlers.dash_handler(current_node=current_node, direction=direction, nodes=nodes)
+        if next_node is None:
+            if neighbours is None:
+                raise ValueError(dash_end_error(nodes.neighbour_count(current_node.pos_x, current_node.pos_y)))
+            raise ValueError(dash_end_error(len(neighbours) + 1))
+        return next_node, direction
+    return current_node, direction
+
+
+def traverse(
+        start_node: Node,
+        nodes: NodeMap,
+        corridors: Optional[CorridorIndex] = None
+) -> Sequence[Union[Node, Corridor]]:
+    """
+    Same as `iter_path` but collects the whole path.
+
+    :param start_node: Starting node on the map - inferred from `load_nodes` map
+    :param nodes: Nodes that represent the map
+    :param corridors: Optional corridor index, straight runs of dashes are then returned as a single `Corridor`
+    :return: Final full path of the nodes
+    """
+    # Grids create the nodes as they are walked, the collected path would otherwise be rescanned by every run of the
+    # cyclic garbage collector while it grows. Nodes hold no references, there is nothing for it to collect in them.
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return list(iter_path(start_node=start_node, nodes=nodes, corridors=corridors))
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+
+def bounded_path(
+        steps: Iterator[Union[Node, Corridor]],
+        max_steps: Optional[int] = None,
+        time_limit: Optional[float] = None,
+        started: Optional[float] = None
+) -> Iterator[Union[Node, Corridor]]:
+    """
+    Passes the steps of a path through, but aborts the walk once it makes more than `max_steps` steps or runs longer
+    than `time_limit` seconds. Reading the clock costs about as much as a step, so it's only read at the first step
+    and then every 1024 steps: a limit is noticed up to 1024 steps late, a few milliseconds of walking. The time of
+    the loading counts when `started` is given; the loaders themselves aren't interrupted, a slow load is reported
+    at the first step.
+
+    :param steps: Steps from `iter_path`
+    :param max_steps: Maximum number of steps, a corridor counts as one step
+    :param time_limit: Maximum time in seconds
+    :param started: `time.monotonic()` when the solve started, defaults to the start of the walk
+    :return: Iterator over the same steps
+    """
+    deadline = None
+    if time_limit is not None:
+        deadline = (started if started is not None else time.monotonic()) + time_limit
+    for count, step in enumerate(steps, 1):
+        if max_steps is not None and count > max_steps:
+            raise ValueError(f"Path is longer than {max_steps} steps")
+        if deadline is not None and count & 1023 == 1 and time.monotonic() > deadline:
+            raise ValueError(f"Path took longer than {time_limit}s")
+        yield step
+
+
+def iter_path_chars(steps: Iterator[Union[Node, Corridor]], nodes: NodeMap, letters: List[str]) -> Iterator[str]:
+    """
+    Turns the steps of the path into path characters. Letters are appended to `letters` the first time their cell is
+    visited, visited cells are kept in a bitset so a letter is never collected twice from the same location.
 
-def main(file_path: str) -> Tuple[str, str]:
+    :param steps: Steps from `iter_path`
+    :param nodes: Nodes that represent the map
+    :param letters: List that collected letters are appended to
+    :return: Iterator over the path characters of each step
+    """
+    visited_letter_nodes = cell_set(nodes)
+    for step in steps:
+        if isinstance(step, Corridor):
+            yield step.text
+            continue
+        if step.value.isupper() and visited_letter_nodes.add(step.pos_x, step.pos_y):
+            letters.append(step.value)
+        yield step.value
+
+
+def _grid_path(
+        start_node: Node,
+        node_map: Grid,
+        corridors: bool = False,
+        table: bool = False,
+        bidirectional: bool = False
+) -> Iterator[Union[Node, Corridor]]:
+    if bidirectional:
+        from src.bidirectional import iter_bidirectional_path
+        return iter_bidirectional_path(start_node=start_node, grid=node_map)
+    if table:
+        return iter_table_path(start_node=start_node, table=build_neighbour_table(node_map))
+    corridor_index = build_corridor_index(node_map) if corridors else None
+    return iter_path(start_node=start_node, nodes=node_map, corridors=corridor_index)
+
+
+@contextmanager
+def open_path(
+        file_path: Union[MapSource, MapContainer],
+        lazy: bool = False,
+        corridors: bool = False,
+        table: bool = False,
+        max_steps: Optional[int] = None,
+        time_limit: Optional[float] = None,
+        map_index: int = 0,
+        parallel: bool = False,
+        bidirectional: bool = False
+) -> Iterator[Tuple[NodeMap, Iterator[Union[Node, Corridor]]]]:
+    """
+    Loads the map and prepares the iteration over its path. The map stays loaded (or mapped) until the context exits.
+    The file can also be a map container (see `src/container.py`), the map is then taken from it without any parsing.
+    An open `MapContainer` can be passed instead of its path, it's then left open. Compressed files, `-` (the standard
+    input) and binary file-like objects are read as a stream (see `src/compressed.py`).
+
+    :param file_path: Path to the file, `-`, a binary file-like object or an open map container
+    :param lazy: Memory-map the file and decode only the cells next to the path
+    :param corridors: Precompute straight corridors and cross each of them in a single step
+    :param table: Precompute neighbour masks of all cells and walk the path with bit operations
+    :param max_steps: Abort the walk after this many steps
+    :param time_limit: Abort the walk once the solve, loading included, has taken this many seconds
+    :param map_index: Index of the map when the file is a map container
+    :param parallel: Parse row bands of the file in worker processes into a shared memory grid
+    :param bidirectional: Also walk the path back from the end in a worker process (see `src/bidirectional.py`)
+    :return: Context manager with the map and the iterator over its path
+    """
+    started = time.monotonic()
+    if sum([lazy, corridors, table, bidirectional]) > 1:
+        raise ValueError("Only one of lazy, corridors, table and bidirectional can be used at once")
+    if lazy and parallel:
+        raise ValueError("Only one of lazy and parallel can be used at once")
+    if isinstance(file_path, MapContainer):
+        # An open container, its mapping is reused by every map solved from it
+        start_node, node_map = file_path.load(map_index)
+        steps = _grid_path(start_node=start_node, node_map=node_map, corridors=corridors, table=table,
+                           bidirectional=bidirectional)
+        yield node_map, bounded_path(steps, max_steps=max_steps, time_limit=time_limit, started=started)
+    elif is_stream_source(file_path):
+        # Streams are read once from the start, so `lazy` and `parallel` make no difference for them
+        with open_map_stream(file_path) as stream:
+            start_node, node_map = load_grid_stream(stream, allowed=_VALID_BYTES)
+        steps = _grid_path(start_node=start_node, node_map=node_map, corridors=corridors, table=table,
+                           bidirectional=bidirectional)
+        yield node_map, bounded_path(steps, max_steps=max_steps, time_limit=time_limit, started=started)
+    elif is_container(Path(file_path)):
+        # Container grids are memory-mapped already, so `lazy` makes no difference for them
+        with MapContainer(Path(file_path)) as container:
+            start_node, node_map = container.load(map_index)
+            steps = _grid_path(start_node=start_node, node_map=node_map, corridors=corridors, table=table,
+                               bidirectional=bidirectional)
+            yield node_map, bounded_path(steps, max_steps=max_steps, time_limit=time_limit, started=started)
+    elif parallel:
+        with load_grid_parallel(Path(file_path), allowed=_VALID_BYTES) as (start_node, node_map):
+            steps = _grid_path(start_node=start_node, node_map=node_map, corridors=corridors, table=table,
+                               bidirectional=bidirectional)
+            yield node_map, bounded_path(steps, max_steps=max_steps, time_limit=time_limit, started=started)
+    elif lazy:
+        with open_mapped_nodes(Path(file_path)) as (start_node, node_map):
+            steps = iter_path(start_node=start_node, nodes=node_map)
+            yield node_map, bounded_path(steps, max_steps=max_steps, time_limit=time_limit, started=started)
+    else:
+        # The corridor index, the neighbour table and the bidirectional walk work on the flat cells of a dense `Grid`
+        start_node, node_map = load_grid(Path(file_path), allow_sparse=not (corridors or table or bidirectional))
+        steps = _grid_path(start_node=start_node, node_map=node_map, corridors=corridors, table=table,
+                           bidirectional=bidirectional)
+        yield node_map, bounded_path(steps, max_steps=max_steps, time_limit=time_limit, started=started)
+
+
+def solve(
+        file_path: Union[MapSource, MapContainer],
+        lazy: bool = False,
+        corridors: bool = False,
+        table: bool = False,
+        max_steps: Optional[int] = None,
+        time_limit: Optional[float] = None,
+        map_index: int = 0,
+        parallel: bool = False,
+        bidirectional: bool = False
+) -> Tuple[str, str]:
+    """
+    Loads the map and follows its path.
+
+    :param file_path: Path to the file, `-`, a binary file-like object or an open map container
+    :param lazy: Memory-map the file and decode only the cells next to the path
+    :param corridors: Precompute straight corridors and cross each of them in a single step
+    :param table: Precompute neighbour masks of all cells and walk the path with bit operations
+    :param max_steps: Abort the walk after this many steps
+    :param time_limit: Abort the walk once the solve, loading included, has taken this many seconds
+    :param map_index: Index of the map when the file is a map container
+    :param parallel: Parse row bands of the file in worker processes into a shared memory grid
+    :param bidirectional: Also walk the path back from the end in a worker process (see `src/bidirectional.py`)
+    :return: Visited letters and full path chars
+    """
+    visited_letters = []
+    with open_path(file_path, lazy=lazy, corridors=corridors, table=table, max_steps=max_steps,
+                   time_limit=time_limit, map_index=map_index, parallel=parallel,
+                   bidirectional=bidirectional) as (node_map, steps):
+        full_path = "".join(iter_path_chars(steps=steps, nodes=node_map, letters=visited_letters))
+    return "".join(visited_letters), full_path
+
+
+def _path_chunks(steps: Iterator[Union[Node, Corridor]], node_map: NodeMap, letters: List[str],
+                 encoder: Optional[RunLengthEncoder], chunk_size: int) -> Iterator[str]:
+    # Path chars (encoded when there is an encoder) grouped into chunks of at least `chunk_size` chars
+    chunk = []
+    chunk_length = 0
+    for chars in iter_path_chars(steps=steps, nodes=node_map, letters=letters):
+        if encoder is not None:
+            chars = encoder.feed(chars)
+        chunk.append(chars)
+        chunk_length += len(chars)
+        if chunk_length >= chunk_size:
+            yield "".join(chunk)
+            chunk, chunk_length = [], 0
+    if encoder is not None:
+        chunk.append(encoder.finish())
+    yield "".join(chunk)
+
+
+def write_solution(
+        file_path: MapSource,
+        output: TextIO,
+        lazy: bool = False,
+        corridors: bool = False,
+        table: bool = False,
+        chunk_size: int = 1 << 16,
+        max_steps: Optional[int] = None,
+        time_limit: Optional[float] = None,
+        map_index: int = 0,
+        parallel: bool = False,
+        output_format: str = 'plain',
+        bidirectional: bool = False,
+        letters_first: bool = True
+) -> None:
+    """
+    Streaming version of `main`. By default the output is the same as the one of `main`: letters have to be printed
+    before the path but they are only known at its end, so the path is written in chunks to a spooled temporary file
+    (kept in memory up to a limit, then on disk) and copied to the output afterwards. Without `letters_first` every
+    chunk of the path is written to the output and flushed as soon as it's walked, and the letters follow on the line
+    after the path. An error then ends the partial output with an `Error: ...` line before it's raised. With the `rle`
+    format the path is run-length encoded as it's walked, so long corridors take a few bytes instead of one per step.
+
+    :param file_path: Path to the file, `-` or a binary file-like object
+    :param output: Stream to write the letters and the path to
+    :param lazy: Memory-map the file and decode only the cells next to the path
+    :param corridors: Precompute straight corridors and cross each of them in a single step
+    :param table: Precompute neighbour masks of all cells and walk the path with bit operations
+    :param chunk_size: Number of path characters buffered before they are written out
+    :param max_steps: Abort the walk after this many steps
+    :param time_limit: Abort the walk once the solve, loading included, has taken this many seconds
+    :param map_index: Index of the map when the file is a map container
+    :param parallel: Parse row bands of the file in worker processes into a shared memory grid
+    :param output_format: `plain` for the path chars, `rle` for the run-length encoded path (see `src/run_length.py`)
+    :param bidirectional: Also walk the path back from the end in a worker process (see `src/bidirectional.py`)
+    :param letters_first: Print the letters before the path like `main`, otherwise the path is written as it's walked
+    """
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format {output_format}")
+    encoder = RunLengthEncoder() if output_format == 'rle' else None
+    visited_letters = []
+    options = dict(lazy=lazy, corridors=corridors, table=table, max_steps=max_steps, time_limit=time_limit,
+                   map_index=map_index, parallel=parallel, bidirectional=bidirectional)
+    if not letters_first:
+        try:
+            with open_path(file_path, **options) as (node_map, steps):
+                for chunk in _path_chunks(steps, node_map, visited_letters, encoder, chunk_size):
+                    output.write(chunk)
+                    output.flush()
+        except ValueError as err:
+            output.write(f"\nError: {err.args[0] if err.args else ''}\n")
+            output.flush()
+            raise
+        output.write("\n" + "".join(visited_letters) + "\n")
+        return
+    with tempfile.SpooledTemporaryFile(max_size=chunk_size * 16, mode='w+') as spool:
+        with open_path(file_path, **options) as (node_map, steps):
+            for chunk in _path_chunks(steps, node_map, visited_letters, encoder, chunk_size):
+                spool.write(chunk)
+        output.write("".join(visited_letters) + "\n")
+        spool.seek(0)
+        shutil.copyfileobj(spool, output, chunk_size)
+        output.write("\n")
+
+
+def main(file_path: str, lazy: bool = False, corridors: bool = False, table: bool = False) -> Tuple[str, str]:
     """
     Main "wrapper" function
 
     :param file_path: Path to the file
+    :param lazy: Memory-map the file and decode only the cells next to the path
+    :param corridors: Precompute straight corridors and cross each of them in a single step
+    :param table: Precompute neighbour masks of all cells and walk the path with bit operations
     :return: List of visited letters and list of full path chars
     """
-    start_node, node_map = load_nodes(load_map_from_file(Path(file_path)))
-    nodes = traverse(start_node=start_node, nodes=node_map)
-    visited_letter_nodes = set()
-    visited_letters = []
-    full_path = []
-    for node in nodes:
-        if node.value.isupper() and (node.pos_x, node.pos_y) not in visited_letter_nodes:
-            visited_letters.append(node.value)
-            visited_letter_nodes.add((node.pos_x, node.pos_y))
-        full_path.append(node.value)
-    print("".join(visited_letters))
-    print("".join(full_path))
-    return "".join(visited_letters), "".join(full_path)
+    letters, path = solve(file_path, lazy=lazy, corridors=corridors, table=table)
+    print(letters)
+    print(path)
+    return letters, path
 
 
 if __name__ == '__main__':
     parser = ArgumentParser()
-    parser.add_argument('--path', type=str, required=True, help='Path to the map')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--path', type=str, help='Path to the map, may be gzip, bz2 or xz compressed, - for stdin')
+    source.add_argument('--batch', type=str, help='Directory or glob of maps to solve, prints one JSON line per map')
+    source.add_argument('--manifest', type=str, help='File listing one map path per line, solved like --batch')
+    parser.add_argument('--lazy', action='store_true', help='Memory-map the map and read only the visited rows')
+    parser.add_argument('--corridors', action='store_true', help='Cross straight runs of dashes in a single step')
+    parser.add_argument('--table', action='store_true', help='Walk the path using precomputed neighbour masks')
+    parser.add_argument('--workers', type=int, default=None, help='Number of batch worker processes')
+    parser.add_argument('--chunk-size', type=int, default=16, help='Number of maps sent to a batch worker at once')
+    parser.add_argument('--ordered', action='store_true', help='Print batch results in input order')
+    parser.add_argument('--timeout', type=float, default=None, help='Time limit in seconds for a single batch map')
+    parser.add_argument('--cache-dir', type=str, default=None, help='Directory of the batch result cache')
+    parser.add_argument('--format', choices=['plain', 'rle'], default='plain',
+                        help='Print the path as is or run-length encoded, e.g. @A-{1000}+x')
+    parser.add_argument('--bidirectional', action='store_true',
+                        help='Also walk the path back from the end in a worker process')
+    parser.add_argument('--parallel', action='store_true', help='Parse row bands of the map in worker processes')
+    parser.add_argument('--map-index', type=int, default=0, help='Index of the map when --path is a map container')
+    parser.add_argument('--max-steps', type=int, default=None, help='Abort the walk after this many steps')
+    parser.add_argument('--time-limit', type=float, default=None, help='Abort the walk after this many seconds')
+    parser.add_argument('--letters-last', action='store_true',
+                        help='Write the path as it is walked and the letters on the line after it')
+    parser.add_argument('--stats', action='store_true', help='Print timings and counters of the solve to stderr')
+    parser.add_argument('--stats-capture', choices=['cprofile', 'tracemalloc'], default=None,
+                        help='Also profile the solve with cProfile or trace its allocations, implies --stats')
     args = parser.parse_args()
-    main(args.path)
+    if args.stats or args.stats_capture:
+        if args.path is None or args.lazy or args.corridors or args.table or args.parallel or args.bidirectional:
+            parser.error('--stats measures the default engine, it needs --path and no --lazy, --corridors, --table, '
+                         '--parallel or --bidirectional')
+        if args.format != 'plain':
+            parser.error('--stats prints the plain path, it can\'t be used with --format')
+        from src.stats import SolveStats, solve_with_stats
+        stats = SolveStats()
+        try:
+            main_letters, main_path = solve_with_stats(args.path, stats=stats, capture=args.stats_capture,
+                                                       max_steps=args.max_steps, time_limit=args.time_limit,
+                                                       map_index=args.map_index)
+            print(main_letters)
+            print(main_path)
+        finally:
+            profile = stats.profile
+            stats.profile = None
+            print(json.dumps(stats.as_dict(), indent=2), file=sys.stderr)
+            if profile:
+                print(profile, file=sys.stderr)
+    elif args.path is not None:
+        write_solution(
+            args.path,
+            output=sys.stdout,
+            lazy=args.lazy,
+            corridors=args.corridors,
+            table=args.table,
+            max_steps=args.max_steps,
+            time_limit=args.time_limit,
+            map_index=args.map_index,
+            parallel=args.parallel,
+            output_format=args.format,
+            bidirectional=args.bidirectional,
+            letters_first=not args.letters_last
+        )
+    else:
+        from src.batch import collect_map_paths, run_batch
+        failed_maps = run_batch(
+            map_paths=collect_map_paths(source=args.batch, manifest=args.manifest),
+            workers=args.workers,
+            chunk_size=args.chunk_size,
+            ordered=args.ordered,
+            timeout=args.timeout,
+            lazy=args.lazy,
+            corridors=args.corridors,
+            table=args.table,
+            cache_dir=args.cache_dir
+        )
+        sys.exit(1 if failed_maps else 0)
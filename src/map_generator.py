@@ -0,0 +1,245 @@
+import math
+import random
+import string
+from typing import Callable, Dict, List, Sequence, Tuple
+
+Point = Tuple[int, int]
+
+
+class _Canvas:
+    """
+    Mutable map that paths are drawn on. Path segments are axis-aligned, vertices become corners and cells that are
+    already taken (crossings) are left as they are.
+    """
+
+    def __init__(self, width: int, height: int):
+        self.rows = [bytearray(b' ' * width) for _ in range(height)]
+        self.path_cells: List[Point] = []
+
+    def set(self, point: Point, char: str):
+        self.rows[point[1]][point[0]] = ord(char)
+
+    def get(self, point: Point) -> str:
+        return chr(self.rows[point[1]][point[0]])
+
+    def draw_path(self, points: Sequence[Point]):
+        """
+        Draws a path through the given vertices, starting with '@' and ending with 'x'.
+
+        :param points: Vertices of the path, consecutive ones have to share a row or a column
+        """
+        for (x_0, y_0), (x_1, y_1) in zip(points, points[1:]):
+            step_x, step_y = (x_1 > x_0) - (x_1 < x_0), (y_1 > y_0) - (y_1 < y_0)
+            dash = '-' if step_x else '|'
+            for i in range(1, max(abs(x_1 - x_0), abs(y_1 - y_0))):
+                cell = (x_0 + i * step_x, y_0 + i * step_y)
+                if self.get(cell) == ' ':
+                    self.set(cell, dash)
+                    self.path_cells.append(cell)
+        for point in points[1:-1]:
+            self.set(point, '+')
+            self.path_cells.append(point)
+        self.set(points[0], '@')
+        self.set(points[-1], 'x')
+
+    def sprinkle_letters(self, rng: random.Random, density: float):
+        """
+        Replaces a share of the path cells (straight cells, corners and crossings) with random letters.
+
+        :param rng: Random generator
+        :param density: Share of path cells that become letters
+        """
+        for cell in self.path_cells:
+            if rng.random() < density:
+                self.set(cell, rng.choice(string.ascii_uppercase))
+
+    def lines(self) -> List[str]:
+        return [row.decode('ascii').rstrip() for row in self.rows]
+
+
+def _side(cells: int) -> int:
+    return max(int(math.sqrt(cells)), 8)
+
+
+def spiral_map(cells: int, seed: int = 0) -> List[str]:
+    """
+    Square spiral that winds inwards with a blank line between its rings.
+
+    :param cells: Approximate number of cells of the map
+    :param seed: Seed of the letter placement
+    :return: Map rows
+    """
+    side = _side(cells)
+    points = [(0, 0)]
+    low, high = 0, side - 1
+    while high - low > 2:
+        for x, y in ((high, low), (high, high), (low, high), (low, low + 2)):
+            points.append((x, y))
+        low, high = low + 2, high - 2
+        points.append((high, low))
+    canvas = _Canvas(width=side, height=side)
+    canvas.draw_path(points[:-1])
+    canvas.sprinkle_letters(random.Random(seed), density=0.02)
+    return canvas.lines()
+
+
+def snake_map(cells: int, seed: int = 0) -> List[str]:
+    """
+    Horizontal lines that are joined at alternating ends, with a blank row between them.
+
+    :param cells: Approximate number of cells of the map
+    :param seed: Seed of the letter placement
+    :return: Map rows
+    """
+    canvas = _snake_canvas(cells)
+    canvas.sprinkle_letters(random.Random(seed), density=0.02)
+    return canvas.lines()
+
+
+def _snake_canvas(cells: int) -> _Canvas:
+    side = _side(cells)
+    points = []
+    for y in range(0, side - 1, 2):
+        row = [(0, y), (side - 1, y)]
+        points.extend(row if y % 4 == 0 else row[::-1])
+    canvas = _Canvas(width=side, height=side)
+    canvas.draw_path(points)
+    return canvas
+
+
+def intersections_map(cells: int, seed: int = 0) -> List[str]:
+    """
+    Horizontal snake that is crossed by a vertical snake, letters are placed on most of the crossings.
+
+    :param cells: Approximate number of cells of the map
+    :param seed: Seed of the letter placement
+    :return: Map rows
+    """
+    side = _side(cells)
+    rows = list(range(2, side - 3, 2))
+    if len(rows) % 2 == 1:
+        rows.pop()
+    columns = list(range(2, side - 2, 2))
+    bottom = rows[-1] + 2
+    points = []
+    for i, y in enumerate(rows):
+        row = [(0, y), (side - 1, y)]
+        points.extend(row if i % 2 == 0 else row[::-1])
+    points.append((0, bottom))
+    for i, x in enumerate(columns):
+        points.extend([(x, bottom), (x, 0)] if i % 2 == 0 else [(x, 0), (x, bottom)])
+    canvas = _Canvas(width=side, height=bottom + 1)
+    canvas.draw_path(points)
+    rng = random.Random(seed)
+    canvas.sprinkle_letters(rng, density=0.01)
+    for x in columns:
+        for y in rows:
+            if rng.random() < 0.8:
+                canvas.set((x, y), rng.choice(string.ascii_uppercase))
+    return canvas.lines()
+
+
+def compact_map(cells: int, seed: int = 0) -> List[str]:
+    """
+    Dense staircases of `+` chars (similar to `ultra_compact.txt`) that are joined by short loops at the top and
+    bottom of the map.
+
+    :param cells: Approximate number of cells of the map
+    :param seed: Seed of the letter placement
+    :return: Map rows
+    """
+    steps = max(int(math.sqrt(cells / 2)), 4)
+    staircases = max(steps // 3, 1)
+    top, bottom = 2, steps + 1
+    canvas = _Canvas(width=3 * staircases + steps + 4, height=steps + 5)
+    points = []
+    for s in range(staircases):
+        offset = 3 * s
+        stairs = []
+        for i in range(steps):
+            stairs.extend([(offset + i, top + i), (offset + i + 1, top + i)])
+        if s % 2 == 1:
+            stairs.reverse()
+        points.extend(stairs)
+        if s % 2 == 0:
+            points.extend([(offset + steps, bottom + 2), (offset + steps + 3, bottom + 2)])
+        else:
+            points.extend([(offset, top - 2), (offset + 3, top - 2)])
+    if staircases % 2 == 0:
+        points[-2:] = [(3 * staircases - 3, 0)]
+    else:
+        points[-2:] = [(3 * staircases - 3 + steps, bottom + 2)]
+    canvas.draw_path(points)
+    canvas.sprinkle_letters(random.Random(seed), density=0.05)
+    return canvas.lines()
+
+
+VALID_GENERATORS: Dict[str, Callable[[int, int], List[str]]] = {
+    'spiral': spiral_map,
+    'snake': snake_map,
+    'intersections': intersections_map,
+    'compact': compact_map,
+}
+
+
+def _replace(lines: List[str], point: Point, char: str) -> List[str]:
+    x, y = point
+    lines = list(lines)
+    line = lines[y].ljust(x + 1)
+    lines[y] = (line[:x] + char + line[x + 1:]).rstrip()
+    return lines
+
+
+def _find(lines: List[str], char: str) -> Point:
+    for y, line in enumerate(lines):
+        if char in line:
+            return line.index(char), y
+    raise ValueError(f"No {char} on the map")
+
+
+def invalid_map(error: str, cells: int) -> List[str]:
+    """
+    Takes a valid snake map without letters and breaks it in a way that mirrors one of the maps in `maps/errors/`.
+
+    :param error: Name of the defect, one of `INVALID_KINDS`
+    :param cells: Approximate number of cells of the map
+    :return: Map rows
+    """
+    lines = _snake_canvas(cells).lines()
+    start = _find(lines, '@')
+    end = _find(lines, 'x')
+    middle = (len(lines[0]) // 2, 0)
+    # Corner at the end of the third row of the snake, the path reaches it horizontally and the cell above is blank
+    corner = (len(lines[0]) - 1, 4)
+    if error == 'missing_start':
+        return _replace(lines, start, '-')
+    if error == 'missing_end':
+        return _replace(lines, end, '-')
+    if error == 'multiple_starts':
+        return _replace(lines, middle, '@')
+    if error == 'multiple_start_neighbours':
+        return _replace(_replace(lines, start, '-'), middle, '@')
+    if error == 'invalid_char':
+        return _replace(lines, middle, 'p')
+    if error == 'broken_path':
+        return _replace(lines, middle, ' ')
+    if error == 'fake_turn':
+        return _replace(lines, middle, '+')
+    if error == 'fork':
+        return _replace(lines, (corner[0], corner[1] - 1), '|')
+    if error == 'invalid_uppercase_intersection':
+        return _replace(_replace(lines, (corner[0], corner[1] - 1), '|'), corner, 'B')
+    raise ValueError(f"Unknown error kind {error}")
+
+
+INVALID_KINDS: Dict[str, str] = {
+    'missing_start': "Missing start character",
+    'missing_end': "Missing end character",
+    'multiple_starts': "Multiple start characters",
+    'multiple_start_neighbours': "Multiple starting paths",
+    'invalid_char': "Invalid char",
+    'broken_path': "Broken path",
+    'fake_turn': "Fake turn",
+    'fork': "Fork in path",
+    'invalid_uppercase_intersection': "Found letter intersection with 3 surrounding chars",
+}
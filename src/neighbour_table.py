@@ -0,0 +1,187 @@
+import string
+from typing import Iterator, List, Optional, Tuple
+
+from src.grid import _CHARS, Grid, Node, _CellMap
+from src.lookahead import RouteTable
+from src.rules import corner_turn, dash_end_error, is_intersection, letter_way, start_way
+
+LEFT = 1
+RIGHT = 2
+UP = 4
+DOWN = 8
+_NEIGHBOUR_MASK = 0x0F
+
+EMPTY = 0
+LETTER = 1
+CORNER = 2
+HORIZONTAL = 3
+VERTICAL = 4
+END = 5
+START = 6
+
+_TYPE_CODES = bytearray(256)
+for _char in string.ascii_uppercase:
+    _TYPE_CODES[ord(_char)] = LETTER
+_TYPE_CODES[ord('+')] = CORNER
+_TYPE_CODES[ord('-')] = HORIZONTAL
+_TYPE_CODES[ord('|')] = VERTICAL
+_TYPE_CODES[ord('x')] = END
+_TYPE_CODES[ord('@')] = START
+_OCCUPIED = bytes(0 if i == ord(' ') else 1 for i in range(256))
+
+# Number of neighbours for every 4-bit neighbour mask
+_NEIGHBOUR_COUNT = bytes(bin(i).count('1') for i in range(16))
+# Direction bit -> opposite direction bit
+_OPPOSITE = {LEFT: RIGHT, RIGHT: LEFT, UP: DOWN, DOWN: UP}
+# Direction bit -> move
+_MOVES = {LEFT: (-1, 0), RIGHT: (1, 0), UP: (0, -1), DOWN: (0, 1)}
+
+
+class NeighbourTable(_CellMap):
+    """
+    One byte per cell of a `Grid`: the low 4 bits tell which of the left, right, up and down neighbours are occupied,
+    the high 4 bits hold the type code of the cell (letter, corner, horizontal, vertical, end or start). It's a
+    `_CellMap` of the grid's cells that counts neighbours from the masks, so the `RouteTable` of the handlers works
+    on it too.
+    """
+    __slots__ = ('grid', 'cells', 'width')
+
+    def __init__(self, grid: Grid, cells: bytes):
+        self.grid = grid
+        self.cells = cells
+        self.width = grid.width
+
+    def cell_type(self, offset: int) -> int:
+        return self.cells[offset] >> 4
+
+    def neighbour_mask(self, offset: int) -> int:
+        return self.cells[offset] & _NEIGHBOUR_MASK
+
+    def step(self, direction: int) -> int:
+        """
+        Offset difference of a move in the given direction.
+        """
+        if direction == LEFT:
+            return -1
+        if direction == RIGHT:
+            return 1
+        if direction == UP:
+            return -self.width
+        return self.width
+
+    def value_at(self, pos_x: int, pos_y: int) -> Optional[str]:
+        return self.grid.value_at(pos_x, pos_y)
+
+    def get(self, position: Tuple[int, int], default: Optional[Node] = None) -> Optional[Node]:
+        return self.grid.get(position, default)
+
+    def neighbour_count(self, pos_x: int, pos_y: int) -> int:
+        return _NEIGHBOUR_COUNT[self.cells[pos_y * self.width + pos_x] & _NEIGHBOUR_MASK]
+
+    def cell_index(self, pos_x: int, pos_y: int) -> int:
+        return self.grid.cell_index(pos_x, pos_y)
+
+    @property
+    def cell_count(self) -> int:
+        return self.grid.cell_count
+
+    def __iter__(self) -> Iterator[Tuple[int, int]]:
+        return iter(self.grid)
+
+    def __len__(self) -> int:
+        return len(self.grid)
+
+
+def build_neighbour_table(grid: Grid) -> NeighbourTable:
+    """
+    Computes the neighbour masks of the whole grid at once. Cells are treated as bytes of one big integer, so a shift
+    by 8 bits moves to the next cell in a row and a shift by `8 * width` bits to the next row.
+
+    :param grid: Map of characters
+    :return: Neighbour table
+    """
+    width, size = grid.width, len(grid.cells)
+    if size == 0:
+        return NeighbourTable(grid=grid, cells=b'')
+    all_cells = (1 << (8 * size)) - 1
+    # `translate` needs a bytes object, so the cells of a container grid (a memoryview) are copied once here
+    cells = grid.cells.tobytes() if isinstance(grid.cells, memoryview) else grid.cells
+    occupied = int.from_bytes(cells.translate(_OCCUPIED), 'little')
+    not_first_column = int.from_bytes((b'\x00' + b'\xff' * (width - 1)) * grid.height, 'little')
+    not_last_column = int.from_bytes((b'\xff' * (width - 1) + b'\x00') * grid.height, 'little')
+    left = (occupied << 8) & not_first_column
+    right = (occupied >> 8) & not_last_column
+    up = (occupied << (8 * width)) & all_cells
+    down = occupied >> (8 * width)
+    masks = (left * LEFT + right * RIGHT + up * UP + down * DOWN) & (occupied * 0xFF)
+    types = int.from_bytes(cells.translate(_TYPE_CODES), 'little')
+    return NeighbourTable(grid=grid, cells=(masks | types << 4).to_bytes(size, 'little'))
+
+
+def _ways(mask: int) -> List[int]:
+    return [way for way in (LEFT, RIGHT, UP, DOWN) if mask & way]
+
+
+def iter_table_path(start_node: Node, table: NeighbourTable) -> Iterator[Node]:
+    """
+    Same walk as `iter_path` in `src/main.py`, with the same rules from `src/rules.py`, but the ways on are the bits
+    of the neighbour masks and moving is adding an offset. Nothing is allocated on a straight run apart from the
+    yielded nodes and the 4 bits per cell of visited `(cell, direction)` states that detect cycles, only the start,
+    forks and letter junctions list their ways.
+
+    :param start_node: Starting node on the map
+    :param table: Neighbour table of the map
+    :return: Iterator over the nodes of the path
+    """
+    cells, width, grid_cells = table.cells, table.width, table.grid.cells
+    steps = {direction: table.step(direction) for direction in (LEFT, RIGHT, UP, DOWN)}
+    yield start_node
+    offset = start_node.pos_y * width + start_node.pos_x
+    direction = start_way(_ways(cells[offset] & _NEIGHBOUR_MASK))
+    offset += steps[direction]
+    visited_states = bytearray((len(cells) + 1) // 2)
+    # Lookahead of letter junctions, allocated at the first junction
+    routes = None
+    while True:
+        state_mask = direction << ((offset & 1) << 2)
+        if visited_states[offset >> 1] & state_mask:
+            raise ValueError("Cycle in path")
+        visited_states[offset >> 1] |= state_mask
+        cell = cells[offset]
+        yield Node(value=_CHARS[grid_cells[offset]], pos_x=offset % width, pos_y=offset // width)
+        cell_type = cell >> 4
+        if cell_type == END or cell_type == START:
+            return
+        neighbours = cell & _NEIGHBOUR_MASK & ~_OPPOSITE[direction]
+        if neighbours == 0:
+            raise ValueError("Broken path")
+        if cell_type == LETTER:
+            count = _NEIGHBOUR_COUNT[neighbours]
+            if count == 2:
+                if routes is None:
+                    routes = RouteTable(table)
+                pos_x, pos_y = offset % width, offset // width
+
+                def is_route(way: int) -> bool:
+                    move_x, move_y = _MOVES[way]
+                    return routes.is_route(table.get((pos_x + move_x, pos_y + move_y)), move_x=move_x, move_y=move_y)
+
+                direction = letter_way(_ways(neighbours), is_route=is_route)
+            elif count == 1:
+                direction = neighbours
+        elif cell_type == CORNER:
+            turns = neighbours & ~direction
+            if _NEIGHBOUR_COUNT[turns] != 1:
+                direction = corner_turn(_ways(turns), is_wrong_dash=lambda turn: (
+                    cells[offset + steps[turn]] >> 4 == (VERTICAL if turn & (LEFT | RIGHT) else HORIZONTAL)
+                ))
+            else:
+                direction = turns
+        else:
+            if not cell & direction:
+                raise ValueError(dash_end_error(_NEIGHBOUR_COUNT[cell & _NEIGHBOUR_MASK]))
+            next_cell = cells[offset + steps[direction]]
+            wrong_dash = VERTICAL if direction & (LEFT | RIGHT) else HORIZONTAL
+            if next_cell >> 4 == wrong_dash and not is_intersection(_NEIGHBOUR_COUNT[next_cell & _NEIGHBOUR_MASK]):
+                raise ValueError("Reached a problematic node with wrong dash")
+        offset += steps[direction]
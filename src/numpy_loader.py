@@ -0,0 +1,62 @@
+from typing import AbstractSet, Tuple
+
+from src.grid import Grid, Node
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on the environment
+    np = None
+
+NUMPY_AVAILABLE = np is not None
+
+_NEW_LINE = ord('\n')
+_EMPTY = ord(' ')
+_START = ord('@')
+_END = ord('x')
+
+
+def load_nodes_vectorized(raw_map: bytes, allowed: AbstractSet[int]) -> Tuple[Node, Grid]:
+    """
+    NumPy version of `load_nodes` that works on the raw bytes of the map file. All checks are done with array
+    operations and the errors are the same as the ones `load_nodes` raises - the one found first in reading order
+    wins, just like in the loop.
+
+    :param raw_map: Content of the map file
+    :param allowed: Byte values of valid non-empty chars
+    :return: Starting Node and the grid with all other nodes
+    """
+    data = np.frombuffer(raw_map, dtype=np.uint8)
+    is_new_line = data == _NEW_LINE
+    line_ends = np.flatnonzero(is_new_line)
+    if len(data) and not is_new_line[-1]:
+        line_ends = np.append(line_ends, len(data))
+    line_starts = np.concatenate(([0], line_ends[:-1] + 1)).astype(np.int64)
+
+    allowed_lookup = np.zeros(256, dtype=bool)
+    allowed_lookup[list(allowed)] = True
+    allowed_lookup[[_EMPTY, _NEW_LINE]] = True
+    invalid = np.flatnonzero(~allowed_lookup[data])
+    starts = np.flatnonzero(data == _START)
+    first_invalid = invalid[0] if len(invalid) else len(data)
+    second_start = starts[1] if len(starts) > 1 else len(data)
+    if second_start < first_invalid:
+        raise ValueError("Multiple start characters")
+    if first_invalid < len(data):
+        raise ValueError("Invalid char")
+    if len(starts) == 0:
+        raise ValueError("Missing start character")
+    if not np.any(data == _END):
+        raise ValueError("Missing end character")
+
+    height = len(line_ends)
+    width = int((line_ends - line_starts).max()) if height else 0
+    # Coordinates are only computed for the occupied cells, the row of an offset is the first line that ends after it
+    content = np.flatnonzero(~is_new_line & (data != _EMPTY))
+    rows = np.searchsorted(line_ends, content)
+    cells = np.full(height * width, _EMPTY, dtype=np.uint8)
+    cells[rows * width + content - line_starts[rows]] = data[content]
+
+    start_offset = int(starts[0])
+    start_y = int(np.searchsorted(line_ends, start_offset))
+    start_node = Node(value='@', pos_x=start_offset - int(line_starts[start_y]), pos_y=start_y)
+    return start_node, Grid(cells=bytearray(cells.tobytes()), width=width, height=height)
@@ -0,0 +1,187 @@
+import mmap
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager, nullcontext
+from multiprocessing.shared_memory import SharedMemory
+from pathlib import Path
+from typing import AbstractSet, Iterator, List, NamedTuple, Optional, Tuple
+
+from src.grid import Grid, Node
+
+_NEW_LINE = b'\n'
+_START = b'@'
+_END = b'x'
+# Bands smaller than this are not worth a worker process
+MIN_BAND_BYTES = 1 << 20
+
+
+class BandReport(NamedTuple):
+    """
+    Result of scanning one band of rows. Offsets are offsets in the file (with normalised newlines), `starts` holds at
+    most the first two start characters of the band as `(offset, row in band, column)`.
+    """
+    lines: int
+    width: int
+    starts: List[Tuple[int, int, int]]
+    has_end: bool
+    first_invalid: Optional[int]
+
+
+def _read_band(file_path: str, begin: int, end: int) -> bytes:
+    with open(file_path, 'rb') as f:
+        f.seek(begin)
+        band = f.read(end - begin)
+    if b'\r' in band:
+        # Same newlines as the text mode of `load_map_from_file`, offsets only shrink so their order is kept
+        band = band.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+    return band
+
+
+def _band_lines(band: bytes) -> List[bytes]:
+    lines = band.split(_NEW_LINE)
+    if band.endswith(_NEW_LINE):
+        lines.pop()
+    return lines
+
+
+def scan_band(file_path: str, begin: int, end: int, allowed: bytes) -> BandReport:
+    """
+    Worker side of the first pass, counts the rows of a band and finds its start, end and invalid characters.
+
+    :param file_path: Path to the map file
+    :param begin: Offset of the first byte of the band
+    :param end: Offset after the last byte of the band
+    :param allowed: Valid non-empty chars
+    :return: Report of the band
+    """
+    band = _read_band(file_path, begin, end)
+    lines = _band_lines(band)
+    starts = []
+    offset = band.find(_START)
+    while offset != -1 and len(starts) < 2:
+        row_start = band.rfind(_NEW_LINE, 0, offset) + 1
+        starts.append((begin + offset, band.count(_NEW_LINE, 0, offset), offset - row_start))
+        offset = band.find(_START, offset + 1)
+    invalid = band.translate(None, allowed + b' \n')
+    return BandReport(
+        lines=len(lines),
+        width=max(map(len, lines), default=0),
+        starts=starts,
+        has_end=_END in band,
+        first_invalid=begin + band.find(invalid[:1]) if invalid else None
+    )
+
+
+def fill_band(file_path: str, begin: int, end: int, shared_name: str, first_row: int, width: int):
+    """
+    Worker side of the second pass, writes the rows of a band padded to the width into the shared grid.
+
+    :param file_path: Path to the map file
+    :param begin: Offset of the first byte of the band
+    :param end: Offset after the last byte of the band
+    :param shared_name: Name of the shared memory block of the grid
+    :param first_row: Index of the first row of the band in the grid
+    :param width: Width of the grid
+    """
+    lines = _band_lines(_read_band(file_path, begin, end))
+    shared = SharedMemory(name=shared_name)
+    try:
+        shared.buf[first_row * width:(first_row + len(lines)) * width] = b''.join(line.ljust(width) for line in lines)
+    finally:
+        shared.close()
+
+
+def split_bands(file_path: Path, bands: int) -> List[Tuple[int, int]]:
+    """
+    Splits the file into about equally sized byte ranges that end at line boundaries.
+
+    :param file_path: Path to the map file
+    :param bands: Wanted number of bands
+    :return: `(begin, end)` offsets of the bands
+    """
+    size = file_path.stat().st_size
+    if size == 0:
+        return []
+    with file_path.open('rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        boundaries = [0]
+        for i in range(1, bands):
+            new_line = buffer.find(_NEW_LINE, max(boundaries[-1], size * i // bands))
+            if new_line == -1 or new_line + 1 >= size:
+                break
+            boundaries.append(new_line + 1)
+    boundaries.append(size)
+    return list(zip(boundaries, boundaries[1:]))
+
+
+def _run_tasks(executor: Optional[ProcessPoolExecutor], function, tasks: List[tuple]) -> list:
+    if executor is None:
+        return [function(*task) for task in tasks]
+    return list(executor.map(function, *zip(*tasks)))
+
+
+def _merge_reports(reports: List[BandReport]) -> Tuple[int, int, int]:
+    """
+    Reproduces the validation of `load_nodes` from the band reports: the first of a second start and an invalid char
+    in reading order wins, then missing start and missing end are checked.
+
+    :return: Row and column of the start and the number of rows
+    """
+    starts = []
+    first_row = 0
+    for report in reports:
+        starts.extend((offset, first_row + row, column) for offset, row, column in report.starts)
+        first_row += report.lines
+    invalid_offsets = [report.first_invalid for report in reports if report.first_invalid is not None]
+    first_invalid = min(invalid_offsets, default=None)
+    if len(starts) > 1 and (first_invalid is None or starts[1][0] < first_invalid):
+        raise ValueError("Multiple start characters")
+    if first_invalid is not None:
+        raise ValueError("Invalid char")
+    if not starts:
+        raise ValueError("Missing start character")
+    if not any(report.has_end for report in reports):
+        raise ValueError("Missing end character")
+    return starts[0][1], starts[0][2], first_row
+
+
+@contextmanager
+def load_grid_parallel(
+        file_path: Path,
+        allowed: AbstractSet[int],
+        workers: Optional[int] = None
+) -> Iterator[Tuple[Node, Grid]]:
+    """
+    Parses the map in row bands in parallel. A first pass reports the rows, width, starts, ends and invalid chars of
+    every band, the merged reports give the same errors as `load_nodes`. A second pass writes the bands into a grid
+    in shared memory, the yielded `Grid` is a view of it and can't be used after the context exits.
+
+    :param file_path: Path to the map file
+    :param allowed: Byte values of valid non-empty chars
+    :param workers: Number of worker processes, defaults to the number of CPUs
+    :return: Context manager with the starting Node and the shared grid
+    """
+    workers = workers or os.cpu_count() or 1
+    bands = split_bands(file_path, max(1, min(workers, file_path.stat().st_size // MIN_BAND_BYTES)))
+    allowed_chars = bytes(sorted(allowed))
+    path = str(file_path)
+    scan_tasks = [(path, begin, end, allowed_chars) for begin, end in bands]
+    with ProcessPoolExecutor(max_workers=len(bands)) if len(bands) > 1 else nullcontext() as executor:
+        reports = _run_tasks(executor, scan_band, scan_tasks)
+        start_row, start_column, height = _merge_reports(reports)
+        width = max(report.width for report in reports)
+        shared = SharedMemory(create=True, size=max(width * height, 1))
+        try:
+            first_rows = [sum(report.lines for report in reports[:i]) for i in range(len(reports))]
+            _run_tasks(executor, fill_band, [(path, begin, end, shared.name, first_row, width)
+                                             for (begin, end), first_row in zip(bands, first_rows)])
+        except BaseException:
+            shared.close()
+            shared.unlink()
+            raise
+    cells = shared.buf[:width * height]
+    try:
+        yield Node(value='@', pos_x=start_column, pos_y=start_row), Grid(cells=cells, width=width, height=height)
+    finally:
+        cells.release()
+        shared.close()
+        shared.unlink()
@@ -0,0 +1,57 @@
+from typing import AbstractSet
+
+_NEW_LINE = b'\n'
+_START = b'@'
+_END = b'x'
+_EMPTY = ord(' ')
+
+
+def _cell(raw_map: bytes, line_start: int, line_end: int, pos_x: int) -> int:
+    offset = line_start + pos_x
+    return raw_map[offset] if offset < line_end else _EMPTY
+
+
+def prescan_map(raw_map: bytes, allowed: AbstractSet[int]) -> int:
+    """
+    Rejects invalid maps straight from the raw bytes, before any grid is allocated. Only bulk `bytes` operations are
+    used: `translate` deletes every valid byte so whatever is left is invalid, `find` locates the start characters
+    and `in` the end character. The errors and their order are the same as in `load_nodes`, followed by the checks
+    of the start cell's neighbours that `expand_start_node` makes as the first step of the walk.
+
+    :param raw_map: Content of the map file, with `\\n` line endings
+    :param allowed: Byte values of valid non-empty chars
+    :return: Offset of the start character
+    """
+    invalid = raw_map.translate(None, bytes(allowed) + b' \n')
+    first_invalid = raw_map.find(invalid[:1]) if invalid else len(raw_map)
+    start = raw_map.find(_START)
+    second_start = raw_map.find(_START, start + 1) if start != -1 else -1
+    if second_start != -1 and second_start < first_invalid:
+        raise ValueError("Multiple start characters")
+    if invalid:
+        raise ValueError("Invalid char")
+    if start == -1:
+        raise ValueError("Missing start character")
+    if _END not in raw_map:
+        raise ValueError("Missing end character")
+
+    line_start = raw_map.rfind(_NEW_LINE, 0, start) + 1
+    line_end = raw_map.find(_NEW_LINE, start)
+    line_end = len(raw_map) if line_end == -1 else line_end
+    pos_x = start - line_start
+    neighbours = [
+        _cell(raw_map, line_start, line_end, pos_x - 1) if pos_x > 0 else _EMPTY,
+        _cell(raw_map, line_start, line_end, pos_x + 1),
+    ]
+    if line_start > 0:
+        above_start = raw_map.rfind(_NEW_LINE, 0, line_start - 1) + 1
+        neighbours.append(_cell(raw_map, above_start, line_start - 1, pos_x))
+    if line_end < len(raw_map):
+        below_end = raw_map.find(_NEW_LINE, line_end + 1)
+        neighbours.append(_cell(raw_map, line_end + 1, len(raw_map) if below_end == -1 else below_end, pos_x))
+    occupied = sum(1 for cell in neighbours if cell != _EMPTY)
+    if occupied == 0:
+        raise ValueError("No neighbours for starting point")
+    if occupied > 1:
+        raise ValueError("Multiple starting paths")
+    return start
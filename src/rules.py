@@ -0,0 +1,90 @@
+from typing import Callable, List, TypeVar
+
+# A way on is a neighbouring node for the handlers of `src/main.py` and a direction bit for the table walk of
+# `src/neighbour_table.py`, both walks make their decisions with the functions below
+Way = TypeVar('Way')
+
+_HORIZONTAL_DIRECTION = '-'
+_VERTICAL_DIRECTION = '|'
+
+
+def is_wrong_dash(value: str, move_x: int) -> bool:
+    """
+    :param value: Char of the entered cell
+    :param move_x: Horizontal part of the move into the cell
+    :return: True if the cell is a dash entered across its orientation
+    """
+    return value == (_VERTICAL_DIRECTION if move_x != 0 else _HORIZONTAL_DIRECTION)
+
+
+def is_intersection(neighbour_count: int) -> bool:
+    """
+    A dash entered across its orientation is only part of the path if it's an intersection, with at most 2
+    neighbours it's a fake one. Example situation: @--|--x
+
+    :param neighbour_count: Number of neighbours of the crossed dash
+    :return: True or False
+    """
+    return neighbour_count > 2
+
+
+def start_way(ways: List[Way]) -> Way:
+    """
+    The start has to have exactly one way on.
+
+    :param ways: Ways on from the start
+    :return: The only way on
+    """
+    if len(ways) == 0:
+        raise ValueError("No neighbours for starting point")
+    if len(ways) > 1:
+        raise ValueError("Multiple starting paths")
+    return ways[0]
+
+
+def corner_turn(turns: List[Way], is_wrong_dash: Callable[[Way], bool]) -> Way:
+    """
+    A corner turns by 90 degrees. If it can turn both ways, a turn into a dash across its orientation doesn't count,
+    if that still leaves both of them it's a fork.
+
+    :param turns: Ways on from the corner, except straight on
+    :param is_wrong_dash: Tells if a turn enters a dash across its orientation
+    :return: The turn to take
+    """
+    if len(turns) > 1:
+        turns = [turn for turn in turns if not is_wrong_dash(turn)]
+        if len(turns) > 1:
+            raise ValueError("Fork in path")
+    if len(turns) == 0:
+        raise ValueError("Fake turn")
+    return turns[0]
+
+
+def letter_way(ways: List[Way], is_route: Callable[[Way], bool]) -> Way:
+    """
+    A letter with two ways on (a turn, not a crossing) is resolved like a corner fork, only one of them may be a
+    route.
+
+    :param ways: Ways on from the letter
+    :param is_route: Tells if a way is a route, see `RouteTable`
+    :return: The way to take
+    """
+    routes = [way for way in ways if is_route(way)]
+    if len(routes) == 0:
+        raise ValueError("Fake turn")
+    if len(routes) > 1:
+        raise ValueError("Found letter intersection with 3 surrounding chars - don't know what to do!")
+    return routes[0]
+
+
+def dash_end_error(neighbour_count: int) -> str:
+    """
+    Error of a dash that has no cell ahead of it.
+
+    :param neighbour_count: Number of neighbours of the dash, the previous cell included
+    :return: Error message
+    """
+    if neighbour_count <= 1:
+        # The previous cell is the only neighbour
+        return "Broken path"
+    return "Invalid corner"
@@ -0,0 +1,77 @@
+import re
+from typing import List
+
+# A run of one char, map chars are never braces or digits so the format can't be ambiguous
+_RUN = re.compile(r'(.)\1*')
+_ENCODED_RUN = re.compile(r'(.)\{(\d+)\}')
+
+OUTPUT_FORMATS = ['plain', 'rle']
+
+
+def _encode_run(char: str, count: int) -> str:
+    encoded = f'{char}{{{count}}}'
+    return encoded if len(encoded) < count else char * count
+
+
+class RunLengthEncoder:
+    """
+    Incremental run-length encoder of path chars. A run is written as `char{count}` when that's shorter than the run
+    itself (`-{1000}`), otherwise as plain chars, so `@A-{1000}+|{500}x` decodes to `@A` + 1000 dashes + `+` +
+    500 pipes + `x`. Chars are fed as they come from the traversal and the encoded output of every finished run is
+    returned right away, only the current run is kept.
+    """
+    __slots__ = ('char', 'count')
+
+    def __init__(self):
+        self.char = ''
+        self.count = 0
+
+    def feed(self, chars: str) -> str:
+        """
+        Adds chars to the encoded path.
+
+        :param chars: Path chars of one or more steps
+        :return: Encoded output of the runs that ended
+        """
+        if len(chars) == 1 or chars == chars[0] * len(chars):
+            if chars[0] == self.char:
+                self.count += len(chars)
+                return ''
+            output = _encode_run(self.char, self.count) if self.count else ''
+            self.char, self.count = chars[0], len(chars)
+            return output
+        parts: List[str] = []
+        for match in _RUN.finditer(chars):
+            parts.append(self.feed(match.group(0)))
+        return ''.join(parts)
+
+    def finish(self) -> str:
+        """
+        Ends the path.
+
+        :return: Encoded output of the last run
+        """
+        output = _encode_run(self.char, self.count) if self.count else ''
+        self.char, self.count = '', 0
+        return output
+
+
+def encode_path(path: str) -> str:
+    """
+    Run-length encodes a whole path.
+
+    :param path: Path chars
+    :return: Encoded path
+    """
+    encoder = RunLengthEncoder()
+    return encoder.feed(path) + encoder.finish() if path else ''
+
+
+def decode_path(encoded: str) -> str:
+    """
+    Expands a run-length encoded path back to its chars.
+
+    :param encoded: Encoded path
+    :return: Path chars
+    """
+    return _ENCODED_RUN.sub(lambda match: match.group(1) * int(match.group(2)), encoded)
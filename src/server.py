@@ -0,0 +1,297 @@
+import asyncio
+import json
+import os
+import sys
+import time
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence
+
+from src.main import iter_path, iter_path_chars, load_nodes, solve
+
+Record = Dict[str, Any]
+
+# Requests and responses are single lines, big maps make long lines
+MAX_LINE_BYTES = 64 * 1024 * 1024
+
+
+def _warm_up() -> int:
+    return os.getpid()
+
+
+def solve_request(request: Record) -> Record:
+    """
+    Worker side of a request. It either carries the map itself (`map`) or a path to a map file (`path`).
+
+    :param request: Decoded request
+    :return: Record with either `letters` and `path` or an `error`
+    """
+    try:
+        if 'map' in request:
+            str_map = request['map'].split('\n')
+            if str_map and str_map[-1] == '':
+                str_map.pop()
+            start_node, nodes = load_nodes(str_map)
+            letters = []
+            path = "".join(iter_path_chars(iter_path(start_node=start_node, nodes=nodes), nodes=nodes, letters=letters))
+            return {'letters': "".join(letters), 'path': path}
+        letters, path = solve(request['path'])
+        return {'letters': letters, 'path': path}
+    except ValueError as err:
+        return {'error': str(err.args[0]) if err.args else ''}
+    except (KeyError, OSError) as err:
+        return {'error': f"{type(err).__name__}: {err}"}
+
+
+@dataclass
+class _Job:
+    request: Record
+    connection: '_Connection'
+    # Key of the job in `connection.jobs`, request ids are the client's and may be missing or repeated
+    key: int
+    cancelled: bool = False
+    future: Optional[asyncio.Future] = None
+
+
+@dataclass
+class _Connection:
+    writer: asyncio.StreamWriter
+    jobs: Dict[int, _Job] = field(default_factory=dict)
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    next_key: int = 0
+
+    async def send(self, record: Record):
+        async with self.lock:
+            if self.writer.is_closing():
+                return
+            self.writer.write((json.dumps(record) + '\n').encode())
+            await self.writer.drain()
+
+
+class SolverServer:
+    """
+    Asyncio server that takes newline delimited JSON requests (`{"id": 1, "map": "..."}` or
+    `{"id": 1, "path": "..."}`) and answers each with one JSON line. The CPU bound work runs in a process pool that is
+    warmed up at start. Requests wait in a bounded queue - when it's full the server stops reading from the
+    connections, so clients are slowed down instead of the server growing its memory - and at most
+    `max_concurrency` of them are solved at once. `{"cancel": 1}` cancels a request.
+    """
+
+    def __init__(
+            self,
+            workers: Optional[int] = None,
+            max_concurrency: int = 8,
+            queue_size: int = 64,
+            max_request_bytes: int = MAX_LINE_BYTES
+    ):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_concurrency = max_concurrency
+        self.queue_size = queue_size
+        self.max_request_bytes = max_request_bytes
+        self.pool: Optional[ProcessPoolExecutor] = None
+        self.queue: Optional[asyncio.Queue] = None
+        self.server: Optional[asyncio.AbstractServer] = None
+        self._consumers: List[asyncio.Task] = []
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0, unix_path: Optional[str] = None):
+        loop = asyncio.get_running_loop()
+        self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        await asyncio.gather(*[loop.run_in_executor(self.pool, _warm_up) for _ in range(self.workers)])
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        self._consumers = [asyncio.create_task(self._consume()) for _ in range(self.max_concurrency)]
+        if unix_path is not None:
+            self.server = await asyncio.start_unix_server(
+                self._handle_connection, path=unix_path, limit=self.max_request_bytes
+            )
+        else:
+            self.server = await asyncio.start_server(
+                self._handle_connection, host=host, port=port, limit=self.max_request_bytes
+            )
+
+    @property
+    def port(self) -> int:
+        return self.server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        self.server.close()
+        await self.server.wait_closed()
+        for consumer in self._consumers:
+            consumer.cancel()
+        await asyncio.gather(*self._consumers, return_exceptions=True)
+        self.pool.shutdown(wait=True, cancel_futures=True)
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        connection = _Connection(writer=writer)
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    await connection.send({'error': "Request too large"})
+                    break
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                except ValueError:
+                    await connection.send({'error': "Invalid JSON"})
+                    continue
+                if not isinstance(request, dict):
+                    await connection.send({'error': "Request must be a JSON object"})
+                    continue
+                if 'cancel' in request:
+                    await self._cancel(connection, request['cancel'])
+                    continue
+                job = _Job(request=request, connection=connection, key=connection.next_key)
+                connection.next_key += 1
+                connection.jobs[job.key] = job
+                # Blocks when the queue is full, which stops reading from this connection
+                await self.queue.put(job)
+        finally:
+            for job in connection.jobs.values():
+                job.cancelled = True
+                if job.future is not None:
+                    job.future.cancel()
+            writer.close()
+
+    async def _cancel(self, connection: _Connection, request_id: Any):
+        # Every pending request of the connection with that id is cancelled
+        for job in [job for job in connection.jobs.values() if job.request.get('id') == request_id]:
+            del connection.jobs[job.key]
+            job.cancelled = True
+            if job.future is not None:
+                # A running job can't be stopped inside the worker, its result is just dropped
+                job.future.cancel()
+            await connection.send({'id': request_id, 'error': "Cancelled"})
+
+    async def _consume(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self.queue.get()
+            try:
+                if job.cancelled:
+                    continue
+                job.future = loop.run_in_executor(self.pool, solve_request, job.request)
+                try:
+                    record = await job.future
+                except asyncio.CancelledError:
+                    if job.cancelled:
+                        continue
+                    raise
+                except Exception as err:
+                    # A malformed request (or a dead worker) fails only its own job, the consumer keeps serving
+                    record = {'error': f"{type(err).__name__}: {err}"}
+                if job.connection.jobs.pop(job.key, None) is None:
+                    # Cancelled while it was running, the client already got its answer
+                    continue
+                await job.connection.send({'id': job.request.get('id'), **record})
+            finally:
+                self.queue.task_done()
+
+
+async def _client_worker(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, requests: List[Record],
+                         latencies: List[float]) -> int:
+    errors = 0
+    for request in requests:
+        started = time.perf_counter()
+        writer.write((json.dumps(request) + '\n').encode())
+        await writer.drain()
+        response = json.loads(await reader.readline())
+        latencies.append(time.perf_counter() - started)
+        errors += 'error' in response
+    writer.close()
+    return errors
+
+
+def _percentile(values: List[float], percent: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))]
+
+
+async def run_load(
+        map_paths: Sequence[str],
+        requests: int,
+        concurrency: int,
+        host: str = '127.0.0.1',
+        port: Optional[int] = None,
+        unix_path: Optional[str] = None
+) -> Dict[str, float]:
+    """
+    Load generator: sends the maps (their content, in a round robin) over `concurrency` connections and measures
+    the latency of every request.
+
+    :param map_paths: Maps to send
+    :param requests: Total number of requests
+    :param concurrency: Number of connections sending requests at the same time
+    :param host: Server host
+    :param port: Server port
+    :param unix_path: Server Unix socket, used instead of host and port
+    :return: Latency percentiles in milliseconds and throughput
+    """
+    contents = []
+    for map_path in map_paths:
+        with open(map_path) as f:
+            contents.append(f.read())
+    all_requests = [{'id': i, 'map': contents[i % len(contents)]} for i in range(requests)]
+    latencies: List[float] = []
+    connections = []
+    for _ in range(concurrency):
+        if unix_path is not None:
+            connections.append(await asyncio.open_unix_connection(unix_path, limit=MAX_LINE_BYTES))
+        else:
+            connections.append(await asyncio.open_connection(host, port, limit=MAX_LINE_BYTES))
+    started = time.perf_counter()
+    errors = await asyncio.gather(*[
+        _client_worker(reader, writer, all_requests[i::concurrency], latencies)
+        for i, (reader, writer) in enumerate(connections)
+    ])
+    elapsed = time.perf_counter() - started
+    return {
+        'requests': requests,
+        'errors': sum(errors),
+        'p50_ms': _percentile(latencies, 50) * 1000,
+        'p99_ms': _percentile(latencies, 99) * 1000,
+        'requests_per_second': requests / elapsed,
+    }
+
+
+async def _serve(args):
+    server = SolverServer(workers=args.workers, max_concurrency=args.max_concurrency, queue_size=args.queue_size)
+    await server.start(host=args.host, port=args.port, unix_path=args.unix)
+    print(f"Listening on {args.unix or f'{args.host}:{server.port}'}", file=sys.stderr)
+    try:
+        await server.server.serve_forever()
+    finally:
+        await server.close()
+
+
+def main(args: Optional[Sequence[str]] = None):
+    parser = ArgumentParser(description='Solver service and its load generator')
+    parser.add_argument('command', choices=['serve', 'load'])
+    parser.add_argument('--host', type=str, default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', type=str, default=None, help='Unix socket path instead of TCP')
+    parser.add_argument('--workers', type=int, default=None, help='Number of worker processes')
+    parser.add_argument('--max-concurrency', type=int, default=8, help='Requests solved at the same time')
+    parser.add_argument('--queue-size', type=int, default=64, help='Requests waiting before reads are paused')
+    parser.add_argument('--maps', nargs='+', default=['maps/basic.txt'], help='Maps sent by the load generator')
+    parser.add_argument('--requests', type=int, default=1000, help='Number of requests of the load generator')
+    parser.add_argument('--concurrency', type=int, default=16, help='Connections of the load generator')
+    parsed = parser.parse_args(args)
+    if parsed.command == 'serve':
+        asyncio.run(_serve(parsed))
+    else:
+        report = asyncio.run(run_load(
+            map_paths=parsed.maps,
+            requests=parsed.requests,
+            concurrency=parsed.concurrency,
+            host=parsed.host,
+            port=parsed.port,
+            unix_path=parsed.unix
+        ))
+        print(json.dumps(report))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from src.grid import Grid, Node
+from src.main import SPECIAL_CHARS, _END_CHAR, _START_CHAR, iter_path, iter_path_from, load_nodes
+
+# A step depends on its cell, the neighbours of that cell and (for dashes) the neighbours of the next cell
+_INFLUENCE_RADIUS = 2
+_NEIGHBOURHOOD = [
+    (dx, dy)
+    for dx in range(-_INFLUENCE_RADIUS, _INFLUENCE_RADIUS + 1)
+    for dy in range(-_INFLUENCE_RADIUS, _INFLUENCE_RADIUS + 1)
+    if abs(dx) + abs(dy) <= _INFLUENCE_RADIUS
+]
+
+
+class SolverSession:
+    """
+    Keeps a parsed map together with its last traversal, so that the map can be edited and solved again without
+    starting over. Every step of the stored path is a checkpoint: the walk can be resumed from any step as its state
+    is just the step's node and the one before it. An edit only invalidates the steps from the first one whose
+    decision could see an edited cell (a cell within 2 steps of it) onwards, everything before that is kept. Letter
+    junctions look further ahead (see `src/lookahead.py`), along their row and column, so edits next to those lines
+    invalidate the junction's step as well.
+    """
+
+    def __init__(self, str_map: List[str]):
+        self.grid: Optional[Grid] = None
+        self.start_node: Optional[Node] = None
+        self.path: List[Node] = []
+        self.first_visits: Dict[int, int] = {}
+        self.letters: List[Tuple[int, str]] = []
+        self.junctions: List[Tuple[int, int, int]] = []
+        self.error: Optional[ValueError] = None
+        self._reload(str_map)
+
+    def _reload(self, str_map: List[str]):
+        self.path, self.first_visits, self.letters, self.junctions, self.error = [], {}, [], [], None
+        try:
+            self.start_node, self.grid = load_nodes(str_map)
+        except ValueError as err:
+            self.start_node, self.error = None, err
+            self.grid = Grid.from_lines([line.encode('ascii', errors='replace') for line in str_map])
+            return
+        self._extend(iter_path(start_node=self.start_node, nodes=self.grid))
+
+    def _extend(self, steps: Iterator[Node]):
+        try:
+            for node in steps:
+                step = len(self.path)
+                self.path.append(node)
+                offset = self.grid.cell_index(node.pos_x, node.pos_y)
+                if offset not in self.first_visits:
+                    self.first_visits[offset] = step
+                    if node.value.isupper():
+                        self.letters.append((step, node.value))
+                if node.value.isupper() and self._neighbour_count(node.pos_x, node.pos_y) == 3:
+                    self.junctions.append((step, node.pos_x, node.pos_y))
+        except ValueError as err:
+            self.error = err
+
+    def _truncate(self, step: int):
+        for node in self.path[step:]:
+            offset = self.grid.cell_index(node.pos_x, node.pos_y)
+            if self.first_visits.get(offset, -1) >= step:
+                del self.first_visits[offset]
+        del self.path[step:]
+        while self.letters and self.letters[-1][0] >= step:
+            self.letters.pop()
+        while self.junctions and self.junctions[-1][0] >= step:
+            self.junctions.pop()
+        self.error = None
+
+    def _first_affected_step(self, positions: List[Tuple[int, int]]) -> Optional[int]:
+        steps = []
+        for pos_x, pos_y in positions:
+            for dx, dy in _NEIGHBOURHOOD:
+                x, y = pos_x + dx, pos_y + dy
+                if 0 <= x < self.grid.width and 0 <= y < self.grid.height:
+                    step = self.first_visits.get(self.grid.cell_index(x, y))
+                    if step is not None:
+                        steps.append(step)
+        for step, junction_x, junction_y in self.junctions:
+            if any(abs(pos_x - junction_x) <= 1 or abs(pos_y - junction_y) <= 1 for pos_x, pos_y in positions):
+                steps.append(step)
+                break
+        return min(steps) if steps else None
+
+    def _neighbour_count(self, pos_x: int, pos_y: int) -> int:
+        return sum(
+            self.grid.get(position) is not None
+            for position in ((pos_x - 1, pos_y), (pos_x + 1, pos_y), (pos_x, pos_y - 1), (pos_x, pos_y + 1))
+        )
+
+    def _lines(self) -> List[str]:
+        width = self.grid.width
+        return [
+            self.grid.cells[y * width:(y + 1) * width].decode('ascii', errors='replace').rstrip()
+            for y in range(self.grid.height)
+        ]
+
+    def edit(self, changes: Dict[Tuple[int, int], str]) -> int:
+        """
+        Applies edits to the map and solves it again, from the first step that the edits can affect.
+
+        :param changes: New chars by `(x, y)` position, use ' ' to clear a cell. Nothing is changed if any of them
+            isn't a single char
+        :return: Index of the step the traversal was resumed from (0 for a full re-solve)
+        """
+        for position, char in changes.items():
+            if not isinstance(char, str) or len(char) != 1:
+                raise ValueError(f"Edit at {position} is not a single char: {char!r}")
+        needs_reload = self.start_node is None or any(
+            not (0 <= x < self.grid.width and 0 <= y < self.grid.height)
+            or char in (_START_CHAR, _END_CHAR)
+            or self.grid.value_at(x, y) in (_START_CHAR, _END_CHAR)
+            or not (char == ' ' or char in SPECIAL_CHARS or 'A' <= char <= 'Z')
+            for (x, y), char in changes.items()
+        )
+        if needs_reload:
+            lines = self._lines()
+            for (x, y), char in changes.items():
+                lines.extend([''] * (y + 1 - len(lines)))
+                line = lines[y].ljust(x + 1)
+                lines[y] = (line[:x] + char + line[x + 1:]).rstrip()
+            self._reload(lines)
+            return 0
+
+        for (x, y), char in changes.items():
+            self.grid.cells[self.grid.cell_index(x, y)] = ord(char)
+        step = self._first_affected_step(list(changes))
+        if step is None:
+            return len(self.path)
+        # The move into the first affected step was decided before the edited area, so its position still holds
+        resume_position = (self.path[step].pos_x, self.path[step].pos_y)
+        self._truncate(step)
+        if step == 0:
+            self._extend(iter_path(start_node=self.start_node, nodes=self.grid))
+        else:
+            current_node = self.grid.get(resume_position)
+            self._extend(iter_path_from(previous_node=self.path[-1], current_node=current_node, nodes=self.grid))
+        return step
+
+    @property
+    def result(self) -> Tuple[str, str]:
+        """
+        Letters and path of the current map, raises the map's error if it's invalid.
+
+        :return: Visited letters and full path chars
+        """
+        if self.error is not None:
+            raise self.error
+        return "".join(letter for _, letter in self.letters), "".join(node.value for node in self.path)
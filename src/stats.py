@@ -0,0 +1,224 @@
+import cProfile
+import io
+import pstats
+import sys
+import time
+import tracemalloc
+from contextlib import ExitStack, contextmanager
+from dataclasses import asdict, dataclass, field
+from functools import wraps
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import src.main as engine
+from src.compressed import MapSource, is_stream_source, load_grid_stream, open_map_stream
+from src.container import MapContainer, is_container
+from src.grid import Node, _CellMap
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+INSTRUMENTED_FUNCTIONS = ['expand_node', 'dash_handler', 'corner_handler', 'uppercase_handler']
+CAPTURE_MODES = ['cprofile', 'tracemalloc']
+
+
+@dataclass
+class SolveStats:
+    """
+    Measurements of a single solve. Phase and handler times are in seconds, handler times include the time of the
+    functions they call. `expand_node` counts the neighbour expansions of the walk itself. `peak_memory_bytes` is
+    the peak of the traced allocations in the `tracemalloc` capture mode and the peak resident size of the process
+    otherwise.
+    """
+    phases: Dict[str, float] = field(default_factory=dict)
+    handler_calls: Dict[str, int] = field(default_factory=lambda: dict.fromkeys(INSTRUMENTED_FUNCTIONS, 0))
+    handler_seconds: Dict[str, float] = field(default_factory=lambda: dict.fromkeys(INSTRUMENTED_FUNCTIONS, 0.0))
+    steps: int = 0
+    neighbour_lookups: int = 0
+    intersections: int = 0
+    peak_memory_bytes: Optional[int] = None
+    error: Optional[str] = None
+    profile: Optional[str] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class _CountingMap(_CellMap):
+    """
+    Read-only view of a map that counts the cells looked up through it. It's a `_CellMap` with the cell indices of
+    the wrapped map, so the walk keeps the same bitsets as on the map itself.
+    """
+    __slots__ = ('nodes', 'stats')
+
+    def __init__(self, nodes: _CellMap, stats: SolveStats):
+        self.nodes = nodes
+        self.stats = stats
+
+    @property
+    def dense_sets(self) -> bool:
+        return self.nodes.dense_sets
+
+    def value_at(self, pos_x: int, pos_y: int) -> Optional[str]:
+        self.stats.neighbour_lookups += 1
+        return self.nodes.value_at(pos_x, pos_y)
+
+    def get(self, position: Tuple[int, int], default: Optional[Node] = None) -> Optional[Node]:
+        self.stats.neighbour_lookups += 1
+        return self.nodes.get(position, default)
+
+    def neighbour_count(self, pos_x: int, pos_y: int) -> int:
+        self.stats.neighbour_lookups += 4
+        return self.nodes.neighbour_count(pos_x, pos_y)
+
+    def neighbours(self, pos_x: int, pos_y: int, previous_x: int, previous_y: int) -> List[Node]:
+        self.stats.neighbour_lookups += 4
+        return self.nodes.neighbours(pos_x, pos_y, previous_x, previous_y)
+
+    def cell_index(self, pos_x: int, pos_y: int) -> int:
+        return self.nodes.cell_index(pos_x, pos_y)
+
+    @property
+    def cell_count(self) -> int:
+        return self.nodes.cell_count
+
+    def __iter__(self):
+        return iter(self.nodes)
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+
+def _counted(function, stats: SolveStats):
+    name = function.__name__
+
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            stats.handler_calls[name] += 1
+            stats.handler_seconds[name] += time.perf_counter() - started
+
+    return wrapper
+
+
+def _counting_expand(stats: SolveStats):
+    expand = _counted(engine.expand_node, stats)
+
+    @wraps(engine.expand_node)
+    def wrapper(previous_node: Node, current_node: Node, nodes: engine.NodeMap) -> List[Node]:
+        neighbours = expand(previous_node=previous_node, current_node=current_node, nodes=nodes)
+        # Three ways on besides the one the walk came from, the walk crosses an intersection. The walk expands every
+        # step once, so they are classified without any lookups of their own
+        if len(neighbours) == 3 and current_node.value not in (engine._CORNER, engine._START_CHAR):
+            stats.intersections += 1
+        return neighbours
+
+    return wrapper
+
+
+def _counting_handlers(stats: SolveStats) -> engine.StepHandlers:
+    # Only this walk gets the wrappers, the regular walk and any other solve running at the same time pay nothing
+    return engine.StepHandlers(
+        expand_node=_counting_expand(stats),
+        **{name: _counted(getattr(engine.DEFAULT_HANDLERS, name), stats) for name in INSTRUMENTED_FUNCTIONS[1:]}
+    )
+
+
+@contextmanager
+def _phase(stats: SolveStats, name: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.phases[name] = time.perf_counter() - started
+
+
+def _load(file_path: MapSource, map_index: int, stack: ExitStack) -> Tuple[Node, engine.NodeMap]:
+    # Same loaders as the default engine of `open_path`
+    if is_stream_source(file_path):
+        with open_map_stream(file_path) as stream:
+            return load_grid_stream(stream, allowed=engine._VALID_BYTES)
+    if is_container(Path(file_path)):
+        return stack.enter_context(MapContainer(Path(file_path))).load(map_index)
+    return engine.load_grid(Path(file_path), allow_sparse=True)
+
+
+def _solve(file_path: MapSource, stats: SolveStats, max_steps: Optional[int], time_limit: Optional[float],
+           map_index: int) -> Tuple[str, str]:
+    letters = []
+    chars = []
+    started = time.monotonic()
+    with ExitStack() as stack:
+        with _phase(stats, 'load'):
+            start_node, nodes = _load(file_path, map_index, stack)
+        with _phase(stats, 'traverse'):
+            steps = engine.iter_path(start_node=start_node, nodes=_CountingMap(nodes, stats),
+                                     handlers=_counting_handlers(stats))
+            steps = engine.bounded_path(_counted_steps(steps, stats), max_steps=max_steps,
+                                        time_limit=time_limit, started=started)
+            for chars_of_step in engine.iter_path_chars(steps=steps, nodes=nodes, letters=letters):
+                chars.append(chars_of_step)
+    with _phase(stats, 'output'):
+        path = "".join(chars)
+    return "".join(letters), path
+
+
+def _counted_steps(steps: Iterator[Node], stats: SolveStats) -> Iterator[Node]:
+    for node in steps:
+        stats.steps += 1
+        yield node
+
+
+def solve_with_stats(
+        file_path: MapSource,
+        stats: SolveStats,
+        capture: Optional[str] = None,
+        max_steps: Optional[int] = None,
+        time_limit: Optional[float] = None,
+        map_index: int = 0
+) -> Tuple[str, str]:
+    """
+    `solve` with the default engine that fills `stats` while it runs. The map is loaded the same way as by `solve`.
+    The stats are filled in even when the map is invalid and the error is raised.
+
+    :param file_path: Path to the file, `-` or a binary file-like object
+    :param stats: Object that the measurements are written to
+    :param capture: Optional deep dive, `cprofile` stores the top functions by cumulative time in `stats.profile`,
+        `tracemalloc` traces allocations and stores the top allocation sites
+    :param max_steps: Abort the walk after this many steps
+    :param time_limit: Abort the walk once the solve, loading included, has taken this many seconds
+    :param map_index: Index of the map when the file is a map container
+    :return: Visited letters and full path chars
+    """
+    if capture is not None and capture not in CAPTURE_MODES:
+        raise ValueError(f"Unknown capture mode {capture}")
+    profiler = cProfile.Profile() if capture == 'cprofile' else None
+    if capture == 'tracemalloc':
+        tracemalloc.start()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        return _solve(file_path, stats, max_steps=max_steps, time_limit=time_limit, map_index=map_index)
+    except ValueError as err:
+        stats.error = str(err.args[0]) if err.args else ''
+        raise
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            report = io.StringIO()
+            pstats.Stats(profiler, stream=report).sort_stats('cumulative').print_stats(20)
+            stats.profile = report.getvalue()
+        if capture == 'tracemalloc':
+            snapshot = tracemalloc.take_snapshot()
+            stats.peak_memory_bytes = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            stats.profile = "\n".join(str(line) for line in snapshot.statistics('lineno')[:20])
+        elif resource is not None:
+            # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+            max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            stats.peak_memory_bytes = max_rss if sys.platform == 'darwin' else max_rss * 1024
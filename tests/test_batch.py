@@ -0,0 +1,93 @@
+import io
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+import src.batch
+from src.batch import HAS_ALARM, collect_map_paths, run_batch, solve_chunk, solve_map
+from src.container import compile_container
+
+
+def test_collect_directory():
+    paths = collect_map_paths(source='maps/errors')
+    assert len(paths) == 13
+    assert paths == sorted(paths)
+
+
+def test_collect_glob():
+    assert collect_map_paths(source='maps/compact*.txt') == [
+        Path('maps/compact.txt'), Path('maps/compact_2.txt'), Path('maps/compact_3.txt'), Path('maps/compact_4.txt')
+    ]
+
+
+def test_collect_manifest(tmp_path):
+    manifest = tmp_path / 'manifest.txt'
+    manifest.write_text('a.txt\n\nsub/b.txt\n')
+    assert collect_map_paths(manifest=str(manifest)) == [tmp_path / 'a.txt', tmp_path / 'sub' / 'b.txt']
+
+
+def test_solve_map_records():
+    assert solve_map(Path('maps/basic.txt')) == {
+        'map': 'maps/basic.txt', 'letters': 'ACB', 'path': '@---A---+|C|+---+|+-B-x'
+    }
+    assert solve_map(Path('maps/errors/err_fork.txt')) == {'map': 'maps/errors/err_fork.txt', 'error': 'Fork in path'}
+
+
+@pytest.mark.skipif(not HAS_ALARM, reason="Needs SIGALRM")
+def test_solve_map_timeout(tmp_path):
+    map_file = tmp_path / 'long.txt'
+    # Walking 5M steps takes seconds, far over the limit on any machine
+    map_file.write_text('@' + '-' * 5000000 + 'x')
+    assert solve_map(map_file, timeout=0.01)['error'] == 'Timed out after 0.01s'
+
+
+def _crash(*args, **kwargs):
+    os._exit(1)
+
+
+def test_run_batch_broken_pool(monkeypatch):
+    monkeypatch.setattr(src.batch, 'solve_chunk', _crash)
+    output = io.StringIO()
+    failed = run_batch([Path('maps/basic.txt'), Path('maps/tough.txt')], workers=1, chunk_size=1, ordered=True,
+                       output=output)
+    records = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert failed == 2
+    assert [r['map'] for r in records] == ['maps/basic.txt', 'maps/tough.txt']
+    assert all(r['error'].startswith('BrokenProcessPool') for r in records)
+
+
+def test_run_batch_broken_pool_with_container(monkeypatch, tmp_path):
+    container_path = tmp_path / 'maps.tmap'
+    compile_container([Path('maps/basic.txt'), Path('maps/tough.txt')], container_path)
+    monkeypatch.setattr(src.batch, 'solve_chunk', _crash)
+    output = io.StringIO()
+    failed = run_batch([container_path], workers=1, chunk_size=1, ordered=True, output=output)
+    records = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert failed == 2
+    assert [(r['map'], r['map_index']) for r in records] == [(str(container_path), 0), (str(container_path), 1)]
+    assert all(r['error'].startswith('BrokenProcessPool') for r in records)
+
+
+def test_solve_chunk_maps_a_container_once(monkeypatch, tmp_path):
+    container_path = tmp_path / 'maps.tmap'
+    compile_container([Path('maps/basic.txt'), Path('maps/errors/err_fork.txt'), Path('maps/tough.txt')],
+                      container_path)
+    opened = []
+    original = src.batch.MapContainer
+    monkeypatch.setattr(src.batch, 'MapContainer', lambda path: opened.append(path) or original(path))
+    records = solve_chunk([(container_path, 0), (container_path, 1), (Path('maps/basic.txt'), None)])
+    assert opened == [container_path]
+    assert [r.get('letters', r.get('error')) for r in records] == ['ACB', 'Fork in path', 'ACB']
+    assert [r.get('map_index') for r in records] == [0, 1, None]
+
+
+def test_run_batch_ordered():
+    map_paths = collect_map_paths(source='maps/*.txt') + collect_map_paths(source='maps/errors')
+    output = io.StringIO()
+    failed = run_batch(map_paths, workers=2, chunk_size=3, ordered=True, output=output)
+    records = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert [r['map'] for r in records] == [str(p) for p in map_paths]
+    assert failed == sum('error' in r for r in records) >= 13
+    assert {'map': 'maps/basic.txt', 'letters': 'ACB', 'path': '@---A---+|C|+---+|+-B-x'} in records
@@ -0,0 +1,60 @@
+import time
+
+import pytest
+
+from src.benchmark import find_regressions, run_benchmarks
+from src.main import load_nodes, traverse
+from src.map_generator import INVALID_KINDS, VALID_GENERATORS, intersections_map, invalid_map, snake_map
+
+
+@pytest.mark.parametrize('kind', list(VALID_GENERATORS))
+@pytest.mark.parametrize('cells', [100, 5000])
+def test_generated_maps_are_valid(kind, cells):
+    lines = VALID_GENERATORS[kind](cells, 3)
+    assert lines == VALID_GENERATORS[kind](cells, 3)
+    assert 0.5 * cells <= len(lines) * max(map(len, lines)) <= 2 * cells
+    start_node, nodes = load_nodes(lines)
+    path = traverse(start_node=start_node, nodes=nodes)
+    assert path[-1].value == 'x'
+
+
+@pytest.mark.parametrize('kind, message', list(INVALID_KINDS.items()))
+def test_generated_invalid_maps(kind, message):
+    with pytest.raises(ValueError) as err:
+        start_node, nodes = load_nodes(invalid_map(kind, 1000))
+        traverse(start_node=start_node, nodes=nodes)
+    assert message in str(err.value)
+
+
+def test_run_benchmarks_and_compare():
+    results = run_benchmarks(kinds=['snake', 'invalid:fork'], sizes=[400])
+    assert [(r['kind'], r['size']) for r in results] == [('snake', 400), ('invalid:fork', 400)]
+    assert results[0]['steps'] > 0 and results[0]['error'] is None
+    assert results[1]['error'] == "Fork in path"
+    assert results[0]['peak_memory_bytes'] > 0
+
+    baseline = [dict(results[0], steps_per_second=results[0]['steps_per_second'] * 10)]
+    regressions = find_regressions(results, baseline, tolerance=0.2)
+    assert [r['current']['kind'] for r in regressions] == ['snake']
+    assert find_regressions(results, results, tolerance=0.2) == []
+
+
+def _best_walk_seconds(start_node, *node_maps) -> list:
+    # The walks take turns, so a slow spell of the machine doesn't favour one of them
+    timings = [[] for _ in node_maps]
+    for _ in range(5):
+        for nodes, node_timings in zip(node_maps, timings):
+            started = time.perf_counter()
+            traverse(start_node=start_node, nodes=nodes)
+            node_timings.append(time.perf_counter() - started)
+    return [min(node_timings) for node_timings in timings]
+
+
+@pytest.mark.parametrize('generator', [intersections_map, snake_map])
+def test_grid_walk_is_not_slower_than_walk_over_prebuilt_nodes(generator):
+    # The original solver walked a dictionary of prebuilt nodes, the grid creates only the nodes next to the path
+    start_node, grid = load_nodes(generator(100_000, 0))
+    nodes = dict(grid.items())
+    assert traverse(start_node=start_node, nodes=grid) == traverse(start_node=start_node, nodes=nodes)
+    grid_seconds, nodes_seconds = _best_walk_seconds(start_node, grid, nodes)
+    assert grid_seconds <= nodes_seconds
@@ -0,0 +1,102 @@
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+from src import bidirectional
+from src.bidirectional import _walk_back
+from src.grid import Grid
+from src.main import _DIRECTION_BITS, iter_path, load_grid, load_nodes, solve, traverse
+from src.map_generator import compact_map, intersections_map, snake_map, spiral_map
+
+map_paths = sorted(Path('maps').glob('**/*.txt'))
+# The corner next to the end has dashes on both sides, only the forward walk knows where it came from
+ambiguous_map = ['@---+', '    |', ' -+-+', '  x']
+
+
+@pytest.fixture
+def always_split(monkeypatch):
+    # The small maps of the tests are walked from both ends even on a single CPU
+    monkeypatch.setattr(bidirectional, 'MIN_CELLS', 0)
+    monkeypatch.setattr(bidirectional.os, 'cpu_count', lambda: 2)
+
+
+def _outcome(file_path, **options):
+    try:
+        return solve(str(file_path), **options)
+    except ValueError as err:
+        return err.args[0]
+
+
+def _walk_back_lines(lines):
+    grid = Grid.from_lines([line.encode('ascii') for line in lines])
+    states = bytearray((grid.cell_count + 1) // 2 + 1)
+    end_offset = bytes(grid.cells).index(b'x')
+    return grid, _walk_back(grid, memoryview(states), stop_index=len(states) - 1, end_offset=end_offset)
+
+
+@pytest.mark.parametrize('map_path', map_paths)
+def test_bidirectional_solve_matches(always_split, map_path):
+    assert _outcome(map_path, bidirectional=True) == _outcome(map_path)
+
+
+@pytest.mark.parametrize('generator', [spiral_map, snake_map, intersections_map, compact_map])
+def test_bidirectional_generated_maps(always_split, tmp_path, generator):
+    map_file = tmp_path / 'generated.txt'
+    map_file.write_text('\n'.join(generator(20000)) + '\n')
+    assert _outcome(map_file, bidirectional=True) == _outcome(map_file)
+
+
+@pytest.mark.parametrize('generator', [spiral_map, snake_map, intersections_map])
+def test_reverse_chain_is_the_end_of_the_path(generator):
+    lines = generator(2000)
+    grid, (cells, direction_bits) = _walk_back_lines(lines)
+    path = traverse(*load_nodes(lines))
+    assert len(cells) > 1
+    tail = path[len(path) - len(cells):]
+    assert [node.pos_y * grid.width + node.pos_x for node in reversed(tail)] == list(cells)
+    moves = [(node.pos_x - previous.pos_x, node.pos_y - previous.pos_y)
+             for previous, node in zip(path[len(path) - len(cells) - 1:], tail)]
+    assert [_DIRECTION_BITS[move] for move in reversed(moves)] == list(direction_bits)
+
+
+def test_reverse_walk_stops_at_ambiguous_junction(always_split, tmp_path):
+    _, (cells, _) = _walk_back_lines(ambiguous_map)
+    assert len(cells) == 1
+    map_file = tmp_path / 'ambiguous.txt'
+    map_file.write_text('\n'.join(ambiguous_map) + '\n')
+    assert _outcome(map_file, bidirectional=True) == ('', '@---+|+-+x')
+
+
+def test_multiple_ends_fall_back_to_forward_walk(always_split, tmp_path):
+    map_file = tmp_path / 'ends.txt'
+    map_file.write_text('@-A-x\n\n  x\n')
+    assert _outcome(map_file, bidirectional=True) == ('A', '@-A-x')
+
+
+def test_bidirectional_with_other_engines():
+    with pytest.raises(ValueError, match='Only one of'):
+        solve('maps/basic.txt', table=True, bidirectional=True)
+
+
+def test_small_grid_is_walked_forward_only(monkeypatch):
+    start_node, grid = load_nodes(snake_map(2000))
+    monkeypatch.setattr(bidirectional, 'ProcessPoolExecutor', None)
+    path = list(bidirectional.iter_bidirectional_path(start_node=start_node, grid=grid))
+    assert path == traverse(start_node=start_node, nodes=grid)
+
+
+@pytest.mark.skipif((os.cpu_count() or 1) < 2, reason="The backward walk needs a second CPU")
+@pytest.mark.parametrize('generator', [snake_map, intersections_map])
+def test_bidirectional_walk_beats_forward_walk(tmp_path, generator):
+    map_file = tmp_path / 'generated.txt'
+    map_file.write_text('\n'.join(generator(2_000_000)) + '\n')
+    start_node, grid = load_grid(map_file)
+    started = time.perf_counter()
+    forward = sum(1 for _ in iter_path(start_node=start_node, nodes=grid))
+    forward_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    both_ends = sum(1 for _ in bidirectional.iter_bidirectional_path(start_node=start_node, grid=grid))
+    assert both_ends == forward
+    assert time.perf_counter() - started < forward_seconds
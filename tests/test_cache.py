@@ -0,0 +1,127 @@
+import io
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+import src.cache
+from src.batch import run_batch, solve_map
+from src.cache import ResultCache, cached_solve, map_key
+from src.container import compile_container
+
+
+def test_map_key_depends_on_engine_version(monkeypatch):
+    key = map_key(b'@-x')
+    assert key == map_key(b'@-x') != map_key(b'@--x')
+    monkeypatch.setattr(src.cache, 'ENGINE_VERSION', -1)
+    assert map_key(b'@-x') != key
+
+
+def test_map_key_depends_on_result_options():
+    key = map_key(b'@-x')
+    assert map_key(b'@-x', {'table': True, 'corridors': False, 'max_steps': None, 'map_index': 0}) == key
+    assert len({key, map_key(b'@-x', {'lazy': True}), map_key(b'@-x', {'max_steps': 5}),
+                map_key(b'@-x', {'map_index': 1}), map_key(b'@-x', {'corridors': True})}) == 5
+
+
+def test_memory_lru_eviction():
+    cache = ResultCache(max_entries=2)
+    cache.put('a', {'letters': 'A', 'path': '@Ax'})
+    cache.put('b', {'letters': 'B', 'path': '@Bx'})
+    assert cache.get('a') is not None
+    cache.put('c', {'letters': 'C', 'path': '@Cx'})
+    assert cache.get('b') is None
+    assert cache.get('a') is not None and cache.get('c') is not None
+    assert cache.stats == {'hits': 3, 'disk_hits': 0, 'misses': 1}
+
+
+def test_disk_tier_is_shared(tmp_path):
+    ResultCache(directory=str(tmp_path)).put('key', {'error': 'Fork in path'})
+    other_process = ResultCache(directory=str(tmp_path))
+    assert other_process.get('key') == {'error': 'Fork in path'}
+    assert other_process.stats == {'hits': 1, 'disk_hits': 1, 'misses': 0}
+    assert not list(tmp_path.glob('*.tmp'))
+
+
+def test_disk_size_eviction(tmp_path):
+    cache = ResultCache(directory=str(tmp_path))
+    record = {'letters': '', 'path': '@---x'}
+    for i, key in enumerate(['a', 'b', 'c']):
+        cache.put(key, record)
+        os.utime(tmp_path / f'{key}.json', (i, i))
+    cache.memory.clear()
+    cache.get('a')
+    cache.max_disk_bytes = 2 * (tmp_path / 'a.json').stat().st_size
+    cache.put('d', record)
+    assert sorted(p.stem for p in tmp_path.glob('*.json')) == ['a', 'd']
+    assert cache.disk_bytes == sum(p.stat().st_size for p in tmp_path.glob('*.json'))
+
+
+def test_disk_size_is_a_running_total(tmp_path, monkeypatch):
+    cache = ResultCache(directory=str(tmp_path))
+    cache.put('a', {'letters': '', 'path': '@-x'})
+    listed = []
+    monkeypatch.setattr(cache, '_evict_disk', lambda: listed.append(True))
+    cache.put('b', {'letters': '', 'path': '@-x'})
+    cache.put('b', {'letters': '', 'path': '@--x'})
+    assert not listed
+    assert cache.disk_bytes == sum(p.stat().st_size for p in tmp_path.glob('*.json'))
+
+
+def test_cached_solve_caches_results_and_errors():
+    cache = ResultCache()
+    assert cached_solve('maps/basic.txt', cache) == ("ACB", "@---A---+|C|+---+|+-B-x")
+    assert cached_solve('maps/basic.txt', cache, table=True) == ("ACB", "@---A---+|C|+---+|+-B-x")
+    for _ in range(2):
+        with pytest.raises(ValueError) as err:
+            cached_solve('maps/errors/err_fork.txt', cache)
+        assert str(err.value) == "Fork in path"
+    assert cache.stats == {'hits': 2, 'disk_hits': 0, 'misses': 2}
+
+
+def test_cached_solve_keys_result_options():
+    cache = ResultCache()
+    assert cached_solve('maps/basic.txt', cache) == ("ACB", "@---A---+|C|+---+|+-B-x")
+    with pytest.raises(ValueError) as err:
+        cached_solve('maps/basic.txt', cache, max_steps=5)
+    assert str(err.value) == "Path is longer than 5 steps"
+    assert cached_solve('maps/basic.txt', cache, max_steps=100) == ("ACB", "@---A---+|C|+---+|+-B-x")
+    # A time limit depends on the machine, those solves bypass the cache
+    assert cached_solve('maps/basic.txt', cache, time_limit=60) == ("ACB", "@---A---+|C|+---+|+-B-x")
+    assert cache.stats == {'hits': 0, 'disk_hits': 0, 'misses': 3}
+
+
+def test_cached_solve_keys_corridors():
+    # A corridor is a single step, so with corridors the path of basic.txt fits into fewer steps
+    cache = ResultCache()
+    with pytest.raises(ValueError) as err:
+        cached_solve('maps/basic.txt', cache, max_steps=20)
+    assert str(err.value) == "Path is longer than 20 steps"
+    assert cached_solve('maps/basic.txt', cache, max_steps=20, corridors=True) == ("ACB", "@---A---+|C|+---+|+-B-x")
+    assert cache.stats == {'hits': 0, 'disk_hits': 0, 'misses': 2}
+
+
+def test_cached_solve_hashes_only_the_map_of_a_container(tmp_path, monkeypatch):
+    first, second = tmp_path / 'first.tmap', tmp_path / 'second.tmap'
+    compile_container([Path('maps/basic.txt'), Path('maps/errors/err_fork.txt')], first)
+    compile_container([Path('maps/basic.txt'), Path('maps/tough.txt')], second)
+    monkeypatch.setattr(Path, 'read_bytes', None)
+    cache = ResultCache()
+    assert cached_solve(str(first), cache, map_index=0) == ("ACB", "@---A---+|C|+---+|+-B-x")
+    assert cached_solve(str(second), cache, map_index=0) == ("ACB", "@---A---+|C|+---+|+-B-x")
+    assert cache.stats == {'hits': 1, 'disk_hits': 0, 'misses': 1}
+    with pytest.raises(ValueError, match="Fork in path"):
+        cached_solve(str(first), cache, map_index=1)
+    assert cache.stats == {'hits': 1, 'disk_hits': 0, 'misses': 2}
+
+
+def test_batch_with_cache(tmp_path, capsys):
+    map_paths = [Path('maps/basic.txt'), Path('maps/errors/err_fork.txt')]
+    assert solve_map(map_paths[0], cache_dir=str(tmp_path))['cached'] is False
+    output = io.StringIO()
+    run_batch(map_paths, workers=1, ordered=True, cache_dir=str(tmp_path), output=output)
+    records = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert [r['cached'] for r in records] == [True, False]
+    assert records[1]['error'] == "Fork in path"
+    assert "cache hits: 1, misses: 1" in capsys.readouterr().err
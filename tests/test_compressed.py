@@ -0,0 +1,94 @@
+import bz2
+import gzip
+import io
+import lzma
+import sys
+from pathlib import Path
+
+import pytest
+
+from src.compressed import is_compressed, iter_map_lines, load_grid_stream, open_map_stream
+from src.main import _VALID_BYTES, load_map_from_file, load_nodes, solve
+
+map_paths = sorted(Path('maps').glob('**/*.txt'))
+compressors = {'gz': gzip.compress, 'bz2': bz2.compress, 'xz': lzma.compress}
+
+
+def _outcome(source, **options):
+    try:
+        return solve(source, **options)
+    except ValueError as err:
+        return err.args[0]
+
+
+def _text_mode_lines(content):
+    # What `load_map_from_file` reads from a plain file with the same content
+    return [line.strip('\n') for line in io.TextIOWrapper(io.BytesIO(content)).readlines()]
+
+
+@pytest.mark.parametrize('map_path', map_paths)
+@pytest.mark.parametrize('extension', sorted(compressors))
+def test_compressed_solve_matches(tmp_path, map_path, extension):
+    # No extension on purpose, the format is found from the magic bytes
+    compressed_file = tmp_path / 'map'
+    compressed_file.write_bytes(compressors[extension](map_path.read_bytes()))
+    assert is_compressed(compressed_file)
+    assert _outcome(str(compressed_file)) == _outcome(str(map_path))
+    assert load_map_from_file(compressed_file) == load_map_from_file(map_path)
+
+
+@pytest.mark.parametrize('map_path', map_paths)
+def test_file_like_solve_matches(map_path):
+    assert _outcome(io.BytesIO(map_path.read_bytes())) == _outcome(str(map_path))
+    assert _outcome(io.BytesIO(gzip.compress(map_path.read_bytes())), table=True) == _outcome(str(map_path))
+
+
+def test_stdin(monkeypatch):
+    content = Path('maps/tough.txt').read_bytes()
+    monkeypatch.setattr(sys, 'stdin', io.TextIOWrapper(io.BytesIO(lzma.compress(content))))
+    assert solve('-') == solve('maps/tough.txt')
+
+
+def test_plain_file_is_not_compressed():
+    assert not is_compressed(Path('maps/tough.txt'))
+    assert not is_compressed(Path('maps/missing.txt'))
+
+
+@pytest.mark.parametrize('content, lines', [
+    (b'ab\ncd\n', [b'ab', b'cd']),
+    (b'ab\r\ncd', [b'ab', b'cd']),
+    (b'ab\rcd\r\r\n', [b'ab', b'cd', b'']),
+    (b'ab\n\n', [b'ab', b'']),
+])
+def test_iter_map_lines(content, lines):
+    assert list(iter_map_lines(io.BytesIO(content))) == lines
+    assert [line.encode() for line in _text_mode_lines(content)] == lines
+
+
+@pytest.mark.parametrize('lines', [
+    ['@', '-', '--', '----A', '-------x'],
+    ['   @-A', '', ' x', '-----------------+'],
+    ['@-x'],
+])
+def test_widening_rows_are_packed(lines):
+    with open_map_stream(io.BytesIO('\n'.join(lines).encode())) as stream:
+        start_node, grid = load_grid_stream(stream, allowed=_VALID_BYTES)
+    expected_start, expected_grid = load_nodes(lines)
+    assert start_node == expected_start
+    assert (grid.width, grid.height, bytes(grid.cells)) == (expected_grid.width, expected_grid.height,
+                                                           bytes(expected_grid.cells))
+
+
+@pytest.mark.parametrize('lines, message', [
+    (['@-B-@', '  x'], 'Multiple start characters'),
+    (['@-b-@', '  x'], 'Invalid char'),
+    (['x-A', '', '@-@?'], 'Multiple start characters'),
+    (['x-A', '', '@-?@'], 'Invalid char'),
+    (['--A-x'], 'Missing start character'),
+    (['@-A-'], 'Missing end character'),
+])
+def test_stream_errors(lines, message):
+    with pytest.raises(ValueError, match=message):
+        load_nodes(lines)
+    with pytest.raises(ValueError, match=message):
+        load_grid_stream(io.BytesIO('\n'.join(lines).encode()), allowed=_VALID_BYTES)
@@ -0,0 +1,88 @@
+import io
+import json
+from pathlib import Path
+
+import pytest
+
+import src.main
+from src.batch import collect_map_paths, run_batch
+from src.container import MapContainer, compile_container, is_container
+from src.main import solve
+
+map_paths = collect_map_paths(source='maps/*.txt') + collect_map_paths(source='maps/errors')
+
+
+def _outcome(file_path, **options):
+    try:
+        return solve(file_path, **options)
+    except ValueError as err:
+        return err.args[0]
+
+
+@pytest.fixture(scope='module')
+def container_path(tmp_path_factory):
+    path = tmp_path_factory.mktemp('container') / 'maps.tmap'
+    assert compile_container(map_paths, path) == len(map_paths)
+    return path
+
+
+def test_container_entries(container_path):
+    assert is_container(container_path)
+    assert not is_container(Path('maps/basic.txt'))
+    with MapContainer(container_path) as container:
+        assert len(container) == len(map_paths)
+        entries = [container.entry(i) for i in range(len(container))]
+    assert [entry.name for entry in entries] == [str(path) for path in map_paths]
+    basic = entries[map_paths.index(Path('maps/basic.txt'))]
+    assert (basic.start_x, basic.start_y, basic.error) == (2, 0, None)
+    assert entries[map_paths.index(Path('maps/errors/err_missing_end.txt'))].error == 'Missing end character'
+
+
+@pytest.mark.parametrize('options', [{}, {'corridors': True}, {'table': True}])
+def test_container_solves_like_text(container_path, options):
+    for index, map_path in enumerate(map_paths):
+        assert _outcome(str(container_path), map_index=index, **options) == _outcome(str(map_path)), map_path
+
+
+def test_container_grid_is_a_view(container_path):
+    with MapContainer(container_path) as container:
+        start_node, grid = container.load(map_paths.index(Path('maps/basic.txt')))
+        assert isinstance(grid.cells, memoryview) and grid.cells.readonly
+        assert grid.value_at(start_node.pos_x, start_node.pos_y) == '@'
+        with pytest.raises(IndexError):
+            container.load(len(map_paths))
+    with pytest.raises(ValueError):
+        grid.value_at(0, 0)
+
+
+def test_not_a_container(tmp_path):
+    fake = tmp_path / 'fake.tmap'
+    fake.write_bytes(b'TMAP' + bytes(12))
+    with pytest.raises(ValueError, match='Not a map container'):
+        MapContainer(fake)
+
+
+def test_container_keeps_any_load_error(tmp_path, monkeypatch):
+    def failing_load_grid(file_path, allow_sparse=False):
+        raise ValueError("Some new error")
+
+    monkeypatch.setattr(src.main, 'load_grid', failing_load_grid)
+    path = tmp_path / 'maps.tmap'
+    compile_container([Path('maps/basic.txt')], path)
+    with MapContainer(path) as container:
+        assert container.entry(0).error == "Some new error"
+        with pytest.raises(ValueError, match="Some new error"):
+            container.load(0)
+
+
+@pytest.mark.parametrize('workers, chunk_size', [(1, 16), (2, 3)])
+def test_batch_solves_every_map_of_a_container(container_path, workers, chunk_size):
+    output = io.StringIO()
+    failed = run_batch([container_path, Path('maps/basic.txt')], workers=workers, chunk_size=chunk_size, ordered=True,
+                       output=output)
+    records = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert [r.get('map_index') for r in records] == list(range(len(map_paths))) + [None]
+    for record, map_path in zip(records, map_paths):
+        expected = _outcome(str(map_path))
+        assert (record['error'] if 'error' in record else (record['letters'], record['path'])) == expected
+    assert failed == sum('error' in r for r in records)
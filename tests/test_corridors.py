@@ -0,0 +1,38 @@
+import pytest
+
+from src.corridors import Corridor, build_corridor_index
+from src.main import main, load_nodes, traverse
+from tests.test_lazy_loading import correct_maps
+
+
+@pytest.mark.parametrize('name', correct_maps)
+def test_corridors_match_plain_traversal(name):
+    assert main(f'maps/{name}.txt', corridors=True) == main(f'maps/{name}.txt')
+
+
+@pytest.mark.parametrize('file_name, message', [
+    ('err_broken_path.txt', "Broken path"),
+    ('err_fake_turn.txt', "Fake turn"),
+    ('err_fork.txt', "Fork"),
+    ('err_tough.txt', "problematic node"),
+])
+def test_corridors_keep_errors(file_name, message):
+    with pytest.raises(ValueError) as err:
+        main(f'maps/errors/{file_name}', corridors=True)
+    assert message in str(err.value)
+
+
+def test_corridor_index_ends():
+    _, grid = load_nodes(['@---+', '    |', '    |', '  x-+'])
+    index = build_corridor_index(grid)
+    assert index.ends[1] == 3 and index.ends[3] == 1
+    assert index.ends[9] == 14 and index.ends[14] == 9
+    assert 18 not in index.ends
+
+
+def test_traverse_collapses_corridors():
+    start_node, grid = load_nodes(['@---+', '    |', '    |', '  x-+'])
+    path = traverse(start_node=start_node, nodes=grid, corridors=build_corridor_index(grid))
+    assert Corridor(value='-', length=2, pos_x=1, pos_y=0) in path
+    assert Corridor(value='|', length=1, pos_x=4, pos_y=1) in path
+    assert len(path) == 9
@@ -0,0 +1,69 @@
+import time
+
+import pytest
+
+import src.main
+from src.grid import CellDirectionBitset, Grid, _StateSet, state_set
+from src.main import load_nodes, solve, traverse
+from src.neighbour_table import build_neighbour_table, iter_table_path
+
+# The corners lead back into the first one, the path never gets to the end
+loop_map = ['@  x', '++', '++']
+crossing_loop_map = ['@     x', '++  -|', '--A   ', 'A+   A', '   +  ']
+
+
+@pytest.mark.parametrize('str_map', [loop_map, crossing_loop_map])
+def test_cycle_is_reported(str_map):
+    start_node, nodes = load_nodes(str_map)
+    with pytest.raises(ValueError, match='Cycle in path'):
+        traverse(start_node=start_node, nodes=nodes)
+    with pytest.raises(ValueError, match='Cycle in path'):
+        traverse(start_node=start_node, nodes={position: nodes[position] for position in nodes})
+    with pytest.raises(ValueError, match='Cycle in path'):
+        list(iter_table_path(start_node=start_node, table=build_neighbour_table(nodes)))
+
+
+@pytest.mark.parametrize('options', [{}, {'lazy': True}, {'corridors': True}, {'table': True}])
+def test_cycle_from_file(tmp_path, options):
+    map_file = tmp_path / 'loop.txt'
+    map_file.write_text('\n'.join(loop_map) + '\n')
+    with pytest.raises(ValueError, match='Cycle in path'):
+        solve(str(map_file), **options)
+
+
+def test_state_sets():
+    grid = Grid.from_lines([b'abc', b'def'])
+    for states in (CellDirectionBitset(grid), _StateSet()):
+        assert states.add(1, 1, 4)
+        assert states.add(1, 1, 8)
+        assert states.add(2, 1, 4)
+        assert not states.add(1, 1, 4)
+    assert isinstance(state_set(grid), CellDirectionBitset)
+    assert isinstance(state_set({}), _StateSet)
+
+
+def test_step_limit():
+    with pytest.raises(ValueError, match='Path is longer than 10 steps'):
+        solve('maps/tough.txt', max_steps=10)
+    assert solve('maps/tough.txt', max_steps=47) == solve('maps/tough.txt')
+
+
+def test_time_limit(tmp_path):
+    map_file = tmp_path / 'long.txt'
+    map_file.write_text('@' + '-' * 300000 + 'x')
+    with pytest.raises(ValueError, match='Path took longer than 0.0s'):
+        solve(str(map_file), time_limit=0.0)
+    assert solve('maps/tough.txt', time_limit=60)[0] == 'TOUGH'
+
+
+def test_time_limit_counts_loading(monkeypatch):
+    load_grid = src.main.load_grid
+
+    def slow_load_grid(*args, **kwargs):
+        time.sleep(0.05)
+        return load_grid(*args, **kwargs)
+
+    monkeypatch.setattr(src.main, 'load_grid', slow_load_grid)
+    # The path has 47 steps, far less than 1024, the limit is still noticed at the first one
+    with pytest.raises(ValueError, match='Path took longer than 0.01s'):
+        solve('maps/tough.txt', time_limit=0.01)
@@ -0,0 +1,118 @@
+import gzip
+import io
+import json
+from pathlib import Path
+
+import pytest
+
+from src.diagnostics import ISSUE_KINDS, diagnose_grid, diagnose_map, main
+from src.grid import Grid
+from src.main import solve
+from src.map_generator import compact_map, intersections_map, snake_map
+from src.numpy_loader import NUMPY_AVAILABLE
+from tests.test_lazy_loading import correct_maps
+
+requires_numpy = pytest.mark.skipif(not NUMPY_AVAILABLE, reason="NumPy is not installed")
+
+map_paths = sorted(Path('maps').glob('**/*.txt'))
+# Forks, a fake turn, a dangling dash, an invalid corner and broken ends, all in one map. The last row isn't
+# connected to the start
+many_issues_map = [
+    '@-A-+   +-+',
+    '    |   | |',
+    '  --+---+ +-|-+-+-x',
+    '    |         |',
+    '  +-+-B       +--',
+    '                +',
+    '  +-',
+]
+
+
+def _grid(lines):
+    return Grid.from_lines([line.encode('ascii') for line in lines])
+
+
+def _kinds(issues):
+    return [(issue.kind, issue.pos_x, issue.pos_y) for issue in issues]
+
+
+@requires_numpy
+@pytest.mark.parametrize('map_path', map_paths)
+def test_vectorized_matches_python(map_path):
+    assert diagnose_map(map_path) == diagnose_map(map_path, vectorized=False)
+
+
+@requires_numpy
+@pytest.mark.parametrize('generator', [snake_map, intersections_map, compact_map])
+def test_generated_maps(generator):
+    grid = _grid(generator(5000))
+    assert diagnose_grid(grid) == diagnose_grid(grid, vectorized=False) == []
+
+
+@pytest.mark.parametrize('name', correct_maps)
+@pytest.mark.parametrize('vectorized', [False, pytest.param(True, marks=requires_numpy)])
+def test_valid_maps_have_no_issues(name, vectorized):
+    # Includes maps with cells the walk never gets to, like the letters after the end of `ignore_after_end`
+    report = diagnose_map(Path('maps') / f'{name}.txt', vectorized=vectorized)
+    assert report['error'] is None
+    assert report['issues'] == []
+
+
+@pytest.mark.parametrize('map_path', map_paths)
+def test_issues_only_on_maps_that_fail(map_path):
+    try:
+        solve(str(map_path))
+        error = None
+    except ValueError as err:
+        error = err.args[0]
+    report = diagnose_map(map_path, vectorized=False)
+    assert bool(report['error'] or report['issues']) == (error is not None)
+    if report['error'] is None and report['issues']:
+        assert error in [issue['error'] for issue in report['issues']]
+
+
+@pytest.mark.parametrize('map_name, kind', [
+    ('err_fork.txt', 'fork'),
+    ('err_tough_fork.txt', 'fork'),
+    ('err_fake_turn.txt', 'fake_turn'),
+    ('err_invalid_uppercase_intersection.txt', 'letter_intersection'),
+    ('err_tough.txt', 'dangling_dash'),
+    ('err_broken_path.txt', 'broken_end'),
+    ('err_multiple_start_neighbours.txt', 'multiple_start_paths'),
+])
+def test_error_maps(map_name, kind):
+    report = diagnose_map(Path('maps/errors') / map_name, vectorized=False)
+    assert kind in [issue['kind'] for issue in report['issues']]
+
+
+def test_all_issues_at_once():
+    issues = diagnose_grid(_grid(many_issues_map), vectorized=False)
+    assert _kinds(issues) == [
+        ('broken_end', 2, 2),
+        ('fork', 4, 2),
+        ('dangling_dash', 12, 2),
+        ('fork', 14, 2),
+        ('fake_turn', 16, 2),
+        ('broken_end', 2, 4),
+        ('fork', 4, 4),
+        ('broken_end', 6, 4),
+        ('invalid_corner', 16, 4),
+        ('broken_end', 16, 5),
+    ]
+    assert [issue.char for issue in issues] == ['-', '+', '|', '+', '+', '+', '+', 'B', '-', '+']
+
+
+def test_report_of_invalid_map():
+    report = diagnose_map(io.BytesIO(gzip.compress(b'@-A-+\n    |\n\n    x\n')), vectorized=False)
+    assert report['error'] is None
+    assert report['counts'] == dict.fromkeys(ISSUE_KINDS, 0) | {'broken_end': 1}
+    report = diagnose_map(io.BytesIO(b'-A-+\n'), vectorized=False)
+    assert report['error'] == 'Missing start character'
+
+
+def test_cli(capsys):
+    main(['maps/errors/err_fork.txt', 'maps/basic.txt', '--no-numpy'])
+    records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [record['map'] for record in records] == ['maps/errors/err_fork.txt', 'maps/basic.txt']
+    assert records[0]['issues'] == [{'kind': 'fork', 'x': 10, 'y': 2, 'char': '+', 'error': 'Fork in path'}]
+    assert records[1]['counts'] == dict.fromkeys(ISSUE_KINDS, 0)
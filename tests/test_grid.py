@@ -0,0 +1,52 @@
+import pytest
+
+from src.grid import Grid, Node, _CellMap
+from src.main import load_nodes
+
+
+def test_grid_pads_jagged_rows():
+    grid = Grid.from_lines([b'@-A', b'', b'  x-+'])
+    assert grid.width == 5 and grid.height == 3
+    assert len(grid.cells) == 15
+    assert grid.value_at(4, 2) == '+'
+    assert grid.value_at(4, 0) is None
+    assert grid.value_at(-1, 0) is None
+    assert grid.value_at(0, 3) is None
+
+
+def test_grid_behaves_like_node_dict():
+    _, grid = load_nodes(['@-A', ' x|'])
+    assert grid.get((2, 0)) == Node(value='A', pos_x=2, pos_y=0)
+    assert grid.get((0, 1)) is None
+    assert (1, 1) in grid and (0, 1) not in grid
+    assert len(grid) == 5
+    assert sorted(grid) == [(0, 0), (1, 0), (1, 1), (2, 0), (2, 1)]
+    with pytest.raises(KeyError):
+        _ = grid[(0, 1)]
+
+
+def test_node_has_no_instance_dict():
+    node = Node(value='A', pos_x=0, pos_y=0)
+    assert not hasattr(node, '__dict__')
+
+
+
+def test_cell_map_needs_every_abstract_method():
+    class RowMap(_CellMap):
+        def value_at(self, pos_x, pos_y):
+            return '-' if pos_y == 0 and 0 <= pos_x < 3 else None
+
+        def __iter__(self):
+            return iter([(0, 0), (1, 0), (2, 0)])
+
+    with pytest.raises(TypeError, match="cell_count"):
+        RowMap()
+
+    class IndexedRowMap(RowMap):
+        cell_count = 3
+
+        def cell_index(self, pos_x, pos_y):
+            return pos_x
+
+    row_map = IndexedRowMap()
+    assert len(row_map) == 3 and row_map.neighbour_count(1, 0) == 2
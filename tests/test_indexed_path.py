@@ -0,0 +1,82 @@
+import json
+
+import pytest
+
+from src.indexed_path import IndexedPath, main, solve_indexed
+from src.main import solve
+
+valid_maps = [
+    'maps/basic.txt', 'maps/tough.txt', 'maps/intersection.txt', 'maps/snake.txt', 'maps/spiral.txt', 'maps/goonies.txt'
+]
+
+
+@pytest.mark.parametrize('options', [{}, {'corridors': True}, {'table': True}, {'lazy': True}])
+@pytest.mark.parametrize('map_path', valid_maps)
+def test_indexed_path_matches_solve(map_path, options):
+    indexed = solve_indexed(map_path, **options)
+    assert (indexed.letters, indexed.path) == solve(map_path)
+    assert len(indexed) == len(indexed.path)
+    assert indexed.direction(0) == (0, 0)
+    for step in range(1, len(indexed)):
+        (x, y), (previous_x, previous_y) = indexed.position(step), indexed.position(step - 1)
+        assert indexed.direction(step) == (x - previous_x, y - previous_y)
+
+
+def test_queries():
+    indexed = solve_indexed('maps/tough.txt')
+    start = indexed.position(0)
+    assert list(indexed.steps_at(*start)) == [0]
+    assert indexed.visit_count(-5, -5) == 0
+    crossed = [
+        (x, y) for x, y in zip(indexed.xs, indexed.ys) if indexed.visit_count(x, y) == 2
+    ]
+    assert crossed
+    for x, y in crossed:
+        first, second = indexed.steps_at(x, y)
+        assert first < second and indexed.position(first) == indexed.position(second) == (x, y)
+    assert indexed.letters_between(0, len(indexed)) == 'TOUGH'
+    for start_step in range(len(indexed)):
+        for stop_step in range(start_step, len(indexed) + 1, 7):
+            expected = ''.join(
+                chr(indexed.chars[step]) for step in indexed.letter_steps if start_step <= step < stop_step
+            )
+            assert indexed.letters_between(start_step, stop_step) == expected
+
+
+def test_serialization(tmp_path):
+    indexed = solve_indexed('maps/goonies.txt')
+    indexed.save(tmp_path / 'goonies.path')
+    loaded = IndexedPath.load(tmp_path / 'goonies.path')
+    assert (loaded.letters, loaded.path) == (indexed.letters, indexed.path)
+    assert (loaded.xs, loaded.ys, loaded.directions) == (indexed.xs, indexed.ys, indexed.directions)
+    assert (loaded.cell_keys, loaded.cell_starts, loaded.cell_steps) == (
+        indexed.cell_keys, indexed.cell_starts, indexed.cell_steps
+    )
+    with pytest.raises(ValueError):
+        IndexedPath.from_bytes(b'\x00' * 24)
+
+
+@pytest.mark.parametrize('length', [10, 24, -1])
+def test_truncated_serialization(length):
+    data = solve_indexed('maps/goonies.txt').to_bytes()
+    with pytest.raises(ValueError):
+        IndexedPath.from_bytes(data[:length])
+    with pytest.raises(ValueError):
+        IndexedPath.from_bytes(data + b'\x00')
+
+
+def test_cli(tmp_path, capsys):
+    saved = tmp_path / 'tough.path'
+    main(['maps/tough.txt', '--save', str(saved)])
+    indexed = solve_indexed('maps/tough.txt')
+    start_x, start_y = indexed.position(0)
+    main([str(saved), '--load', '--cell', str(start_x), str(start_y), '--letters-between', '0', str(len(indexed))])
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert lines[0] == lines[1] == {'steps': len(indexed), 'letters': 'TOUGH'}
+    assert lines[2] == {'cell': [start_x, start_y], 'steps': [0]}
+    assert lines[3] == {'start': 0, 'stop': len(indexed), 'letters': 'TOUGH'}
+
+
+def test_invalid_map():
+    with pytest.raises(ValueError, match='Fork in path'):
+        solve_indexed('maps/errors/err_fork.txt')
@@ -0,0 +1,66 @@
+from pathlib import Path
+
+import pytest
+
+from src.grid import CellBitset, CellDirectionBitset, cell_set, state_set
+from src.main import main, open_mapped_nodes, traverse
+
+correct_maps = [
+    'basic', 'compact', 'compact_2', 'goonies', 'ignore_after_end', 'intersection', 'letter_turns', 'letter_only',
+    'snake', 'goofy', 'spiral', 'tough_corner', 'dummy', 'reverse', 'ultra_compact', 'tough', 'twist', 'no_letters'
+]
+
+
+@pytest.mark.parametrize('name', correct_maps)
+def test_lazy_matches_eager(name):
+    assert main(f'maps/{name}.txt', lazy=True) == main(f'maps/{name}.txt')
+
+
+@pytest.mark.parametrize('file_name, message', [
+    ('err_missing_start.txt', "Missing start"),
+    ('err_missing_end.txt', "Missing end"),
+    ('err_multiple_starts.txt', "Multiple start characters"),
+    ('err_multiple_starts_3.txt', "Multiple start characters"),
+    ('err_fork.txt', "Fork"),
+    ('err_invalid_char.txt', "Invalid char"),
+])
+def test_lazy_errors(file_name, message):
+    with pytest.raises(ValueError) as err:
+        main(f'maps/errors/{file_name}', lazy=True)
+    assert message in str(err.value)
+
+
+def test_lazy_start_position():
+    with open_mapped_nodes(Path('maps/basic.txt')) as (start_node, grid):
+        assert start_node.pos_x == 2 and start_node.pos_y == 0
+        assert grid.height == 5
+        assert grid.value_at(10, 2) == 'C'
+        assert grid.value_at(11, 2) is None
+
+
+def test_lazy_ignores_invalid_char_off_the_path(tmp_path):
+    map_file = tmp_path / 'map.txt'
+    map_file.write_text('@-A-x\n\n  ?\n')
+    assert main(str(map_file), lazy=True) == ('A', '@-A-x')
+
+
+@pytest.mark.parametrize('newline', [b'\r\n', b'\r'])
+@pytest.mark.parametrize('name', ['basic', 'snake', 'tough'])
+def test_lazy_other_newlines(tmp_path, name, newline):
+    map_file = tmp_path / 'map.txt'
+    map_file.write_bytes(Path(f'maps/{name}.txt').read_bytes().replace(b'\n', newline))
+    assert main(str(map_file), lazy=True) == main(f'maps/{name}.txt')
+    with open_mapped_nodes(map_file) as (_, grid), open_mapped_nodes(Path(f'maps/{name}.txt')) as (_, expected):
+        assert grid.height == expected.height
+        assert list(grid) == list(expected)
+
+
+def test_lazy_state_is_sized_to_the_path(tmp_path):
+    map_file = tmp_path / 'map.txt'
+    map_file.write_text('@-A-+\n    |\n  x-+\n' + ('-' * 1000 + '\n') * 1000)
+    with open_mapped_nodes(map_file) as (start_node, grid):
+        assert ''.join(node.value for node in traverse(start_node=start_node, nodes=grid)) == '@-A-+|+-x'
+        # Lines are indexed up to the row below the path only
+        assert len(grid.line_ends) == 4
+        assert not isinstance(state_set(grid), CellDirectionBitset)
+        assert not isinstance(cell_set(grid), CellBitset)
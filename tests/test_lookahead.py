@@ -0,0 +1,74 @@
+import pytest
+
+from src.lookahead import RouteTable
+from src.main import load_nodes, solve, traverse
+from src.session import SolverSession
+
+# The dash below `A` isn't part of an intersection, so the letter keeps its direction
+fake_turn_map = ['@-A-x', '  -']
+# The way down crosses three lines and runs into a dash that isn't an intersection
+deep_fake_turn_map = ['@-A-x', ' ---', ' ---', ' ---', '  -']
+# The dash below `A` is an intersection, so both ways are real
+intersection_map = ['@-A-x', ' ---']
+# Both ways run into dashes that aren't intersections
+fake_ways_map = ['@', '|', 'A|', '-', '', '  x']
+
+
+def _outcome(lines, tmp_path, **options):
+    map_file = tmp_path / 'map.txt'
+    map_file.write_text('\n'.join(lines) + '\n')
+    try:
+        return solve(str(map_file), **options)
+    except ValueError as err:
+        return err.args[0]
+
+
+@pytest.mark.parametrize('options', [{}, {'table': True}, {'corridors': True}, {'lazy': True},
+                                     {'bidirectional': True}])
+@pytest.mark.parametrize('lines, expected', [
+    (fake_turn_map, ('A', '@-A-x')),
+    (deep_fake_turn_map, ('A', '@-A-x')),
+    (intersection_map, "Found letter intersection with 3 surrounding chars - don't know what to do!"),
+    (fake_ways_map, 'Fake turn'),
+])
+def test_letter_junctions(tmp_path, lines, expected, options):
+    assert _outcome(lines, tmp_path, **options) == expected
+
+
+def test_letter_junction_on_dictionary_nodes():
+    start_node, nodes = load_nodes(deep_fake_turn_map)
+    path = traverse(start_node=start_node, nodes={position: nodes[position] for position in nodes})
+    assert ''.join(node.value for node in path) == '@-A-x'
+
+
+def test_maps_keep_their_letter_errors():
+    with pytest.raises(ValueError, match='Found letter intersection'):
+        solve('maps/compact_3.txt')
+    with pytest.raises(ValueError, match='Found letter intersection'):
+        solve('maps/compact_3.txt', table=True)
+
+
+def test_route_answers_are_memoized():
+    start_node, grid = load_nodes(deep_fake_turn_map)
+    routes = RouteTable(grid)
+    assert routes.bits is None
+    assert not routes.is_route(grid[(2, 1)], move_x=0, move_y=1)
+    # Every crossed dash of the run got the same answer
+    for pos_y in range(1, 5):
+        assert routes._cached(2, pos_y, 8) is False
+    assert routes._cached(2, 1, 4) is None
+    assert routes.is_route(grid[(3, 0)], move_x=1, move_y=0)
+    assert not routes.is_route(grid[(2, 3)], move_x=0, move_y=1)
+    dictionary_routes = RouteTable({position: grid[position] for position in grid})
+    assert not dictionary_routes.is_route(grid[(2, 1)], move_x=0, move_y=1)
+    assert dictionary_routes.bits is None and dictionary_routes.answers
+
+
+def test_session_edit_along_the_lookahead():
+    session = SolverSession(deep_fake_turn_map)
+    assert session.result == ('A', '@-A-x')
+    # Far from every step of the path, but it turns the last crossed dash into an intersection
+    step = session.edit({(1, 4): '-', (3, 4): '-'})
+    assert step == 2
+    with pytest.raises(ValueError, match='Found letter intersection'):
+        session.result
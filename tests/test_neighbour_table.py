@@ -0,0 +1,48 @@
+from pathlib import Path
+
+import pytest
+
+from src.main import load_nodes, solve, traverse
+from src.map_generator import VALID_GENERATORS
+from src.neighbour_table import (CORNER, DOWN, END, LEFT, LETTER, RIGHT, START, UP, build_neighbour_table,
+                                 iter_table_path)
+from tests.test_lazy_loading import correct_maps
+
+error_maps = sorted(p.name for p in Path('maps/errors').glob('*.txt'))
+
+
+def test_neighbour_masks_and_types():
+    _, grid = load_nodes(['@-+', ' A|', ' x'])
+    table = build_neighbour_table(grid)
+    assert table.neighbour_mask(0) == RIGHT and table.cell_type(0) == START
+    assert table.neighbour_mask(2) == LEFT | DOWN and table.cell_type(2) == CORNER
+    assert table.neighbour_mask(4) == UP | RIGHT | DOWN and table.cell_type(4) == LETTER
+    assert table.neighbour_mask(7) == UP and table.cell_type(7) == END
+    assert table.cells[3] == 0
+
+
+@pytest.mark.parametrize('name', correct_maps)
+def test_table_matches_handlers(name):
+    assert solve(f'maps/{name}.txt', table=True) == solve(f'maps/{name}.txt')
+
+
+@pytest.mark.parametrize('file_name', error_maps)
+def test_table_keeps_errors(file_name):
+    with pytest.raises(ValueError) as expected:
+        solve(f'maps/errors/{file_name}')
+    with pytest.raises(ValueError) as err:
+        solve(f'maps/errors/{file_name}', table=True)
+    assert err.value.args == expected.value.args
+
+
+@pytest.mark.parametrize('kind', list(VALID_GENERATORS))
+def test_table_on_generated_maps(kind):
+    start_node, grid = load_nodes(VALID_GENERATORS[kind](3000, 1))
+    assert list(iter_table_path(start_node, build_neighbour_table(grid))) == traverse(start_node, grid)
+
+
+def test_table_counts_neighbours_like_the_grid():
+    start_node, grid = load_nodes(VALID_GENERATORS['intersections'](500, 2))
+    table = build_neighbour_table(grid)
+    assert dict(table.items()) == dict(grid.items())
+    assert all(table.neighbour_count(x, y) == grid.neighbour_count(x, y) for x, y in grid)
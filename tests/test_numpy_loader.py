@@ -0,0 +1,74 @@
+from pathlib import Path
+
+import pytest
+
+import src.main
+from src.main import _VALID_BYTES, load_map_from_file, load_nodes, solve
+from src.map_generator import VALID_GENERATORS
+from src.numpy_loader import NUMPY_AVAILABLE, load_nodes_vectorized
+
+requires_numpy = pytest.mark.skipif(not NUMPY_AVAILABLE, reason="NumPy is not installed")
+
+all_maps = sorted(Path('maps').glob('**/*.txt'))
+
+
+def _load_both(raw_map: bytes, tmp_path: Path):
+    map_file = tmp_path / 'map.txt'
+    map_file.write_bytes(raw_map)
+    return load_nodes(load_map_from_file(map_file)), load_nodes_vectorized(raw_map, allowed=_VALID_BYTES)
+
+
+@requires_numpy
+@pytest.mark.parametrize('map_path', all_maps, ids=str)
+def test_vectorized_matches_loop(map_path):
+    try:
+        expected_start, expected_grid = load_nodes(load_map_from_file(map_path))
+    except ValueError as err:
+        with pytest.raises(ValueError) as vectorized_err:
+            load_nodes_vectorized(map_path.read_bytes(), allowed=_VALID_BYTES)
+        assert vectorized_err.value.args == err.args
+        return
+    start_node, grid = load_nodes_vectorized(map_path.read_bytes(), allowed=_VALID_BYTES)
+    assert start_node == expected_start
+    assert (grid.width, grid.height, grid.cells) == (expected_grid.width, expected_grid.height, expected_grid.cells)
+
+
+@requires_numpy
+@pytest.mark.parametrize('raw_map, message', [
+    (b'@-?-@\nx', "Invalid char"),
+    (b'@-@-?\nx', "Multiple start characters"),
+    (b'', "Missing start character"),
+    (b'-A-x\n', "Missing start character"),
+    (b'@-A-\n\n', "Missing end character"),
+])
+def test_vectorized_error_order(raw_map, message, tmp_path):
+    map_file = tmp_path / 'map.txt'
+    map_file.write_bytes(raw_map)
+    with pytest.raises(ValueError) as err:
+        load_nodes(load_map_from_file(map_file))
+    assert str(err.value) == message
+    with pytest.raises(ValueError) as err:
+        load_nodes_vectorized(raw_map, allowed=_VALID_BYTES)
+    assert str(err.value) == message
+
+
+@requires_numpy
+def test_vectorized_trailing_lines(tmp_path):
+    (expected_start, expected_grid), (start_node, grid) = _load_both(b'\n  @-x\n\n', tmp_path)
+    assert start_node == expected_start
+    assert (grid.width, grid.height, grid.cells) == (expected_grid.width, expected_grid.height, expected_grid.cells)
+
+
+@requires_numpy
+@pytest.mark.parametrize('kind', list(VALID_GENERATORS))
+def test_vectorized_generated_maps(kind):
+    lines = VALID_GENERATORS[kind](20_000, 5)
+    expected_start, expected_grid = load_nodes(lines)
+    start_node, grid = load_nodes_vectorized(('\n'.join(lines) + '\n').encode(), allowed=_VALID_BYTES)
+    assert start_node == expected_start
+    assert (grid.width, grid.height, grid.cells) == (expected_grid.width, expected_grid.height, expected_grid.cells)
+
+
+def test_fallback_without_numpy(monkeypatch):
+    monkeypatch.setattr(src.main, 'NUMPY_AVAILABLE', False)
+    assert solve('maps/goonies.txt') == ("GOONIES", "@-G-O-+|+-+|O||+-O-N-+|I|+-+|+-I-+|ES|x")
@@ -0,0 +1,73 @@
+from pathlib import Path
+
+import pytest
+
+import src.parallel_loader as parallel_loader
+from src.main import _VALID_BYTES, load_grid, solve
+from src.map_generator import snake_map
+from src.parallel_loader import load_grid_parallel, split_bands
+
+map_paths = sorted(Path('maps').glob('**/*.txt'))
+
+
+def _outcome(file_path, **options):
+    try:
+        return solve(str(file_path), **options)
+    except ValueError as err:
+        return err.args[0]
+
+
+@pytest.fixture
+def small_bands(monkeypatch):
+    # Splits even the small maps into several bands handled by worker processes
+    monkeypatch.setattr(parallel_loader, 'MIN_BAND_BYTES', 8)
+
+
+@pytest.mark.parametrize('map_path', map_paths)
+def test_parallel_solve_matches(map_path, small_bands):
+    assert _outcome(map_path, parallel=True) == _outcome(map_path)
+
+
+def test_parallel_grid_matches_load_grid(small_bands):
+    for map_path in map_paths:
+        try:
+            expected_start, expected_grid = load_grid(map_path)
+        except ValueError:
+            continue
+        with load_grid_parallel(map_path, allowed=_VALID_BYTES, workers=3) as (start_node, grid):
+            assert start_node == expected_start
+            assert (grid.width, grid.height, bytes(grid.cells)) == (
+                expected_grid.width, expected_grid.height, bytes(expected_grid.cells)
+            )
+
+
+def test_split_bands(tmp_path):
+    map_file = tmp_path / 'map.txt'
+    map_file.write_text('\n'.join(snake_map(2000, 1)) + '\n')
+    bands = split_bands(map_file, 4)
+    raw_map = map_file.read_bytes()
+    assert bands[0][0] == 0 and bands[-1][1] == len(raw_map)
+    assert all(raw_map[end - 1:end] == b'\n' for _, end in bands[:-1])
+    assert all(end == begin for (_, end), (begin, _) in zip(bands, bands[1:]))
+
+
+@pytest.mark.parametrize('content, message', [
+    ('  x\n@-', None),
+    ('  x\n@-@\n', 'Multiple start characters'),
+    ('x\n@-\n\n p\n@', 'Invalid char'),
+    ('p\n\n@\n@x', 'Invalid char'),
+    ('\n\n-\n--x\n', 'Missing start character'),
+    ('\n\n@-\n--\n', 'Missing end character'),
+])
+def test_parallel_errors_across_bands(tmp_path, small_bands, content, message):
+    map_file = tmp_path / 'map.txt'
+    map_file.write_text(content)
+    with pytest.raises(ValueError) as err:
+        with load_grid_parallel(map_file, allowed=_VALID_BYTES, workers=4):
+            raise ValueError(None)
+    assert err.value.args[0] == message
+
+
+def test_lazy_and_parallel():
+    with pytest.raises(ValueError):
+        solve('maps/basic.txt', lazy=True, parallel=True)
@@ -0,0 +1,59 @@
+import random
+from pathlib import Path
+
+import pytest
+
+from src.main import _VALID_BYTES, expand_start_node, load_grid, load_nodes
+from src.prescan import prescan_map
+
+
+def _reference(str_map):
+    try:
+        start_node, nodes = load_nodes(str_map)
+        expand_start_node(start_node, nodes)
+    except ValueError as err:
+        return err.args[0]
+    return None
+
+
+def _prescan(raw_map):
+    try:
+        prescan_map(raw_map, allowed=_VALID_BYTES)
+    except ValueError as err:
+        return err.args[0]
+    return None
+
+
+@pytest.mark.parametrize('map_path', sorted(Path('maps').glob('**/*.txt')))
+def test_prescan_maps(map_path):
+    raw_map = map_path.read_bytes()
+    assert _prescan(raw_map) == _reference(raw_map.decode().splitlines())
+
+
+@pytest.mark.parametrize('raw_map, message', [
+    (b'@', "Missing end character"),
+    (b'x\n @', "No neighbours for starting point"),
+    (b' x\n-@-', "Multiple starting paths"),
+    (b'x\n  @\n |', "No neighbours for starting point"),
+    (b'  |\n  @ x', None),
+    (b'x p @-@', "Invalid char"),
+    (b'x @-@ p', "Multiple start characters"),
+])
+def test_prescan_cases(raw_map, message):
+    assert _prescan(raw_map) == message
+
+
+def test_prescan_matches_loader_on_random_maps():
+    rng = random.Random(7)
+    for _ in range(3000):
+        lines = [
+            ''.join(rng.choice('   -|+Ax@p') for _ in range(rng.randint(0, 5)))
+            for _ in range(rng.randint(1, 4))
+        ]
+        assert _prescan('\n'.join(lines).encode()) == _reference(lines), lines
+
+
+def test_load_grid_windows_newlines(tmp_path):
+    map_file = tmp_path / 'crlf.txt'
+    map_file.write_bytes(Path('maps/basic.txt').read_bytes().replace(b'\n', b'\r\n'))
+    assert load_grid(map_file) == load_grid(Path('maps/basic.txt'))
@@ -0,0 +1,56 @@
+import io
+import random
+
+import pytest
+
+from src.main import solve, write_solution
+from src.run_length import RunLengthEncoder, decode_path, encode_path
+
+
+@pytest.mark.parametrize('path, encoded', [
+    ('', ''),
+    ('@x', '@x'),
+    ('@----x', '@----x'),
+    ('@-----x', '@-{5}x'),
+    ('@A' + '-' * 1000 + '+' + '|' * 500 + 'x', '@A-{1000}+|{500}x'),
+])
+def test_encode_path(path, encoded):
+    assert encode_path(path) == encoded
+    assert decode_path(encoded) == path
+
+
+def test_encoder_chunks_match_whole_path():
+    rng = random.Random(3)
+    path = ''.join(rng.choice('-' * 20 + '|' * 10 + '+A') * rng.randint(1, 30) for _ in range(500))
+    encoder = RunLengthEncoder()
+    parts = []
+    position = 0
+    while position < len(path):
+        size = rng.randint(1, 50)
+        parts.append(encoder.feed(path[position:position + size]))
+        position += size
+    parts.append(encoder.finish())
+    assert ''.join(parts) == encode_path(path)
+    assert decode_path(''.join(parts)) == path
+
+
+@pytest.mark.parametrize('options', [{}, {'corridors': True}, {'table': True}])
+@pytest.mark.parametrize('map_path', ['maps/tough.txt', 'maps/snake.txt', 'maps/spiral.txt'])
+def test_write_solution_rle(map_path, options):
+    output = io.StringIO()
+    write_solution(map_path, output=output, output_format='rle', chunk_size=4, **options)
+    letters, encoded, _ = output.getvalue().split('\n')
+    assert (letters, decode_path(encoded)) == solve(map_path)
+
+
+def test_write_solution_rle_long_corridors(tmp_path):
+    map_file = tmp_path / 'long.txt'
+    map_file.write_text('@' + '-' * 1000 + '+\n' + (' ' * 1001 + '|\n') * 300 + ' ' * 1001 + 'x\n')
+    output = io.StringIO()
+    write_solution(str(map_file), output=output, output_format='rle', corridors=True)
+    assert output.getvalue() == '\n@-{1000}+|{300}x\n'
+
+
+def test_unknown_output_format():
+    with pytest.raises(ValueError):
+        write_solution('maps/basic.txt', output=io.StringIO(), output_format='zip')
@@ -0,0 +1,141 @@
+import asyncio
+import json
+
+from src.server import MAX_LINE_BYTES, SolverServer, run_load, solve_request
+
+
+def test_solve_request():
+    with open('maps/basic.txt') as f:
+        content = f.read()
+    assert solve_request({'map': content}) == {'letters': 'ACB', 'path': '@---A---+|C|+---+|+-B-x'}
+    assert solve_request({'path': 'maps/basic.txt'}) == {'letters': 'ACB', 'path': '@---A---+|C|+---+|+-B-x'}
+    assert solve_request({'path': 'maps/errors/err_fork.txt'}) == {'error': 'Fork in path'}
+
+
+async def _exchange(server, requests, cancel=None):
+    reader, writer = await asyncio.open_connection('127.0.0.1', server.port, limit=MAX_LINE_BYTES)
+    for request in requests:
+        writer.write((json.dumps(request) + '\n').encode())
+    if cancel is not None:
+        writer.write((json.dumps({'cancel': cancel}) + '\n').encode())
+    await writer.drain()
+    responses = [json.loads(await reader.readline()) for _ in requests]
+    writer.close()
+    return sorted(responses, key=lambda response: response['id'])
+
+
+def test_server_requests():
+    async def scenario():
+        server = SolverServer(workers=2, max_concurrency=2, queue_size=2)
+        await server.start()
+        try:
+            return await _exchange(server, [
+                {'id': 1, 'path': 'maps/basic.txt'},
+                {'id': 2, 'map': '@-A\n  |\n  x\n'},
+                {'id': 3, 'path': 'maps/errors/err_fork.txt'},
+                {'id': 4, 'map': '@--'},
+            ])
+        finally:
+            await server.close()
+
+    assert asyncio.run(scenario()) == [
+        {'id': 1, 'letters': 'ACB', 'path': '@---A---+|C|+---+|+-B-x'},
+        {'id': 2, 'letters': 'A', 'path': '@-A|x'},
+        {'id': 3, 'error': 'Fork in path'},
+        {'id': 4, 'error': 'Missing end character'},
+    ]
+
+
+def test_server_cancel_queued_request():
+    async def scenario():
+        server = SolverServer(workers=1, max_concurrency=1)
+        await server.start()
+        try:
+            # The first map keeps the only slot busy, so the second one is still queued when it's cancelled
+            return await _exchange(server, [
+                {'id': 1, 'map': '@' + '-' * 300000 + 'x'},
+                {'id': 2, 'path': 'maps/basic.txt'},
+            ], cancel=2)
+        finally:
+            await server.close()
+
+    responses = asyncio.run(scenario())
+    assert responses[0]['id'] == 1 and responses[0]['letters'] == ''
+    assert responses[1] == {'id': 2, 'error': 'Cancelled'}
+
+
+def test_run_load():
+    async def scenario():
+        server = SolverServer(workers=2, max_concurrency=2, queue_size=1)
+        await server.start()
+        try:
+            return await run_load(['maps/basic.txt', 'maps/errors/err_fork.txt'], requests=20, concurrency=4,
+                                  port=server.port)
+        finally:
+            await server.close()
+
+    report = asyncio.run(scenario())
+    assert report['requests'] == 20
+    assert report['errors'] == 10
+    assert 0 < report['p50_ms'] <= report['p99_ms']
+
+
+def test_server_request_too_large():
+    async def scenario():
+        server = SolverServer(workers=1, max_concurrency=1, max_request_bytes=1024)
+        await server.start()
+        try:
+            reader, writer = await asyncio.open_connection('127.0.0.1', server.port)
+            writer.write((json.dumps({'id': 1, 'map': '@' + '-' * 2000 + 'x'}) + '\n').encode())
+            await writer.drain()
+            response = json.loads(await reader.readline())
+            writer.close()
+            return response
+        finally:
+            await server.close()
+
+    assert asyncio.run(scenario()) == {'error': 'Request too large'}
+
+
+def test_server_malformed_requests():
+    async def scenario():
+        server = SolverServer(workers=1, max_concurrency=1)
+        await server.start()
+        try:
+            reader, writer = await asyncio.open_connection('127.0.0.1', server.port)
+            responses = []
+            for request in [[1, 2], {'id': 1, 'map': 5}, {'id': 2, 'path': 'maps/basic.txt'}]:
+                writer.write((json.dumps(request) + '\n').encode())
+                await writer.drain()
+                responses.append(json.loads(await reader.readline()))
+            writer.close()
+            return responses
+        finally:
+            await server.close()
+
+    not_object, bad_map, valid = asyncio.run(scenario())
+    assert not_object == {'error': 'Request must be a JSON object'}
+    assert bad_map['id'] == 1 and bad_map['error'].startswith('AttributeError')
+    # The consumer survived the failed job
+    assert valid == {'id': 2, 'letters': 'ACB', 'path': '@---A---+|C|+---+|+-B-x'}
+
+
+def test_server_requests_without_or_with_repeated_ids():
+    async def scenario():
+        server = SolverServer(workers=2, max_concurrency=2)
+        await server.start()
+        try:
+            reader, writer = await asyncio.open_connection('127.0.0.1', server.port)
+            requests = [{'path': 'maps/basic.txt'}] * 3 + [{'id': 7, 'path': 'maps/basic.txt'}] * 2
+            for request in requests:
+                writer.write((json.dumps(request) + '\n').encode())
+            await writer.drain()
+            responses = [json.loads(await reader.readline()) for _ in requests]
+            writer.close()
+            return responses
+        finally:
+            await server.close()
+
+    responses = asyncio.run(scenario())
+    assert sorted(str(response.get('id')) for response in responses) == ['7', '7', 'None', 'None', 'None']
+    assert all(response['letters'] == 'ACB' for response in responses)
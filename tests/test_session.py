@@ -0,0 +1,94 @@
+import random
+from pathlib import Path
+
+import pytest
+
+from src.main import load_map_from_file, load_nodes, traverse
+from src.map_generator import snake_map
+from src.session import SolverSession
+
+
+def _full_solve(lines):
+    start_node, nodes = load_nodes(lines)
+    letters, seen = [], set()
+    for node in traverse(start_node=start_node, nodes=nodes):
+        if node.value.isupper() and (node.pos_x, node.pos_y) not in seen:
+            seen.add((node.pos_x, node.pos_y))
+            letters.append(node.value)
+    return "".join(letters), "".join(node.value for node in traverse(start_node=start_node, nodes=nodes))
+
+
+def _outcome(solve):
+    try:
+        return solve()
+    except ValueError as err:
+        return err.args
+
+
+def test_session_result():
+    session = SolverSession(load_map_from_file(Path('maps/goonies.txt')))
+    assert session.result == ("GOONIES", "@-G-O-+|+-+|O||+-O-N-+|I|+-+|+-I-+|ES|x")
+
+
+def test_edit_far_from_start_resumes_late():
+    lines = snake_map(10000, seed=4)
+    session = SolverSession(lines)
+    last_row = len(lines) - 1
+    step = session.edit({(len(lines[last_row]) // 2, last_row): 'Q'})
+    assert step > len(session.path) // 2
+    edited = list(lines)
+    row = edited[last_row]
+    edited[last_row] = row[:len(row) // 2] + 'Q' + row[len(row) // 2 + 1:]
+    assert session.result == _full_solve(edited)
+
+
+def test_edit_off_the_path_keeps_result():
+    session = SolverSession(['@-A-x', '', '', '     '])
+    assert session.edit({(2, 3): '+'}) == 5
+    assert session.result == ("A", "@-A-x")
+
+
+def test_edit_that_breaks_and_fixes_the_path():
+    session = SolverSession(['@-A-+', '    |', '  x-+'])
+    session.edit({(4, 1): ' '})
+    with pytest.raises(ValueError) as err:
+        _ = session.result
+    assert "Broken path" in str(err.value)
+    session.edit({(4, 1): 'B'})
+    assert session.result == ("AB", "@-A-+B+-x")
+
+
+@pytest.mark.parametrize('char', ['', 'AB', None])
+def test_edit_of_more_or_less_than_a_char_is_rejected(char):
+    session = SolverSession(['@-A-x'])
+    with pytest.raises(ValueError, match="not a single char"):
+        session.edit({(1, 0): '+', (3, 0): char})
+    assert session.grid.value_at(1, 0) == '-'
+    assert session.result == ("A", "@-A-x")
+
+
+def test_edits_of_start_and_end_reload():
+    session = SolverSession(['@-A-x'])
+    assert session.edit({(4, 0): '-', (6, 1): 'x'}) == 0
+    with pytest.raises(ValueError) as err:
+        _ = session.result
+    assert "Broken path" in str(err.value)
+    session.edit({(5, 0): '+', (5, 1): '+', (4, 0): '-'})
+    assert session.result == ("A", "@-A--++x")
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_random_edits_match_full_solve(seed):
+    rng = random.Random(seed)
+    lines = snake_map(400, seed=seed)
+    session = SolverSession(lines)
+    for _ in range(20):
+        y = rng.randrange(len(lines))
+        x = rng.randrange(max(len(lines[y]), 1))
+        char = rng.choice(' -|+ABC')
+        if lines[y][x:x + 1] in ('@', 'x'):
+            continue
+        line = lines[y].ljust(x + 1)
+        lines[y] = (line[:x] + char + line[x + 1:]).rstrip()
+        session.edit({(x, y): char})
+        assert _outcome(lambda: session.result) == _outcome(lambda: _full_solve(lines))
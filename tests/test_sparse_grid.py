@@ -0,0 +1,60 @@
+from pathlib import Path
+
+import pytest
+
+import src.main as engine
+from src.grid import Grid, SparseGrid
+from src.main import load_grid, solve
+
+map_paths = sorted(Path('maps').glob('**/*.txt'))
+
+
+def _outcome(file_path, **options):
+    try:
+        return solve(str(file_path), **options)
+    except ValueError as err:
+        return err.args[0]
+
+
+@pytest.mark.parametrize('map_path', map_paths)
+def test_sparse_grid_matches_grid(map_path):
+    lines = map_path.read_bytes().splitlines()
+    grid, sparse = Grid.from_lines(lines), SparseGrid.from_lines(lines)
+    assert (sparse.width, sparse.height) == (grid.width, grid.height)
+    for pos_y in range(-1, grid.height + 1):
+        for pos_x in range(-1, grid.width + 2):
+            assert sparse.value_at(pos_x, pos_y) == grid.value_at(pos_x, pos_y)
+    assert list(sparse) == list(grid)
+    assert len(sparse) == len(grid)
+    indices = {sparse.cell_index(*position) for position in sparse}
+    assert len(indices) == len(sparse) and all(0 <= index < sparse.cell_count for index in indices)
+
+
+def test_sparse_cell_index_of_empty_cell():
+    sparse = SparseGrid.from_lines([b'@-' + b' ' * 20 + b'x'])
+    assert sparse.cell_index(22, 0) == 2
+    with pytest.raises(KeyError):
+        sparse.cell_index(10, 0)
+
+
+@pytest.mark.parametrize('map_path', map_paths)
+def test_forced_sparse_solve_matches(map_path, monkeypatch):
+    expected = _outcome(map_path)
+    monkeypatch.setattr(engine, 'SPARSE_OCCUPANCY', 1.1)
+    assert _outcome(map_path) == expected
+
+
+def test_wide_map_is_sparse(tmp_path):
+    width = 20000
+    rows = ['@' + '-' * 10 + '+' + ' ' * (width - 12)]
+    rows += [' ' * 11 + '|' + ' ' * (width - 12) for _ in range(98)]
+    rows.append(' ' * 11 + '+' + '-' * (width - 13) + 'x')
+    map_file = tmp_path / 'wide.txt'
+    map_file.write_text('\n'.join(rows) + '\n')
+    start_node, grid = load_grid(map_file, allow_sparse=True)
+    assert isinstance(grid, SparseGrid)
+    assert grid.cell_count == width + 99
+    assert not isinstance(load_grid(map_file)[1], SparseGrid)
+    letters, path = solve(str(map_file))
+    assert (letters, len(path)) == ('', width + 99)
+    assert _outcome(map_file) == _outcome(map_file, table=True)
@@ -0,0 +1,82 @@
+import io
+from pathlib import Path
+
+import pytest
+
+import src.main as engine
+from src.grid import CellDirectionBitset, state_set
+from src.lookahead import RouteTable
+from src.stats import INSTRUMENTED_FUNCTIONS, SolveStats, _CountingMap, solve_with_stats
+
+
+def test_stats_of_valid_map():
+    stats = SolveStats()
+    assert solve_with_stats('maps/tough.txt', stats=stats) == engine.solve('maps/tough.txt')
+    assert set(stats.phases) == {'load', 'traverse', 'output'}
+    assert stats.steps == 47
+    assert stats.handler_calls['corner_handler'] == 10
+    assert stats.handler_calls['uppercase_handler'] == 5
+    assert stats.intersections == 8
+    assert stats.neighbour_lookups > 4 * stats.steps
+    assert stats.error is None
+    assert stats.as_dict()['steps'] == 47
+
+
+def test_stats_of_invalid_map():
+    stats = SolveStats()
+    with pytest.raises(ValueError):
+        solve_with_stats('maps/errors/err_fork.txt', stats=stats)
+    assert stats.error == 'Fork in path'
+    assert stats.handler_calls['corner_handler'] > 0
+    assert 'traverse' in stats.phases
+
+
+def test_engine_is_not_patched():
+    originals = [getattr(engine, name) for name in INSTRUMENTED_FUNCTIONS]
+    stats = SolveStats()
+    steps = engine.iter_path(*engine.load_grid(Path('maps/tough.txt')))
+    # A regular walk that runs while the stats are taken isn't counted
+    next(steps)
+    solve_with_stats('maps/tough.txt', stats=stats)
+    list(steps)
+    assert [getattr(engine, name) for name in INSTRUMENTED_FUNCTIONS] == originals
+    assert stats.handler_calls['corner_handler'] == 10
+
+
+def test_stats_of_stream_and_limits():
+    with open('maps/tough.txt', 'rb') as f:
+        content = f.read()
+    stats = SolveStats()
+    assert solve_with_stats(io.BytesIO(content), stats=stats) == engine.solve('maps/tough.txt')
+    assert stats.steps == 47
+    stats = SolveStats()
+    with pytest.raises(ValueError):
+        solve_with_stats('maps/tough.txt', stats=stats, max_steps=10)
+    assert stats.error == "Path is longer than 10 steps"
+
+
+@pytest.mark.parametrize('capture, expected', [('cprofile', 'cumulative'), ('tracemalloc', 'size=')])
+def test_capture_modes(capture, expected):
+    stats = SolveStats()
+    solve_with_stats('maps/basic.txt', stats=stats, capture=capture)
+    assert expected in stats.profile
+    assert stats.peak_memory_bytes > 0
+
+
+def test_unknown_capture_mode():
+    with pytest.raises(ValueError):
+        solve_with_stats('maps/basic.txt', stats=SolveStats(), capture='perf')
+
+
+def test_counting_map_keeps_the_bitsets_of_the_grid():
+    start_node, grid = engine.load_grid(Path('maps/tough.txt'))
+    stats = SolveStats()
+    nodes = _CountingMap(grid, stats)
+    assert isinstance(state_set(nodes), CellDirectionBitset)
+    assert RouteTable(nodes).answers is None
+    assert [node.value for node in engine.iter_path(start_node, nodes)] == [
+        node.value for node in engine.iter_path(start_node, grid)
+    ]
+    assert stats.neighbour_lookups > 0
+    with engine.open_mapped_nodes(Path('maps/tough.txt')) as (_, mapped_grid):
+        assert not isinstance(state_set(_CountingMap(mapped_grid, stats)), CellDirectionBitset)
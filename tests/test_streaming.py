@@ -0,0 +1,63 @@
+import io
+from itertools import islice
+
+import pytest
+
+from src.grid import CellBitset
+from src.main import iter_path, load_map_from_file, load_nodes, solve, write_solution
+from tests.test_lazy_loading import correct_maps
+from pathlib import Path
+
+
+def test_iter_path_yields_before_reaching_an_error():
+    start_node, nodes = load_nodes(load_map_from_file(Path('maps/errors/err_fork.txt')))
+    steps = iter_path(start_node=start_node, nodes=nodes)
+    assert "".join(step.value for step in islice(steps, 5)) == "@--A-"
+    with pytest.raises(ValueError) as err:
+        list(steps)
+    assert "Fork" in str(err.value)
+
+
+def test_cell_bitset():
+    _, nodes = load_nodes(['@-A', 'x'])
+    visited = CellBitset(nodes)
+    assert len(visited.bits) == 1
+    assert visited.add(2, 0)
+    assert not visited.add(2, 0)
+    assert visited.add(0, 1)
+
+
+@pytest.mark.parametrize('name', correct_maps)
+@pytest.mark.parametrize('lazy', [False, True])
+def test_write_solution_matches_solve(name, lazy):
+    output = io.StringIO()
+    write_solution(f'maps/{name}.txt', output=output, lazy=lazy, chunk_size=4)
+    letters, path = solve(f'maps/{name}.txt')
+    assert output.getvalue() == f"{letters}\n{path}\n"
+
+
+class _FlushCounter(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self.flushed = []
+
+    def flush(self):
+        self.flushed.append(self.getvalue())
+
+
+@pytest.mark.parametrize('name', correct_maps)
+def test_write_solution_letters_last(name):
+    output = _FlushCounter()
+    write_solution(f'maps/{name}.txt', output=output, chunk_size=4, letters_first=False)
+    letters, path = solve(f'maps/{name}.txt')
+    assert output.getvalue() == f"{path}\n{letters}\n"
+    # Every chunk is out before the walk goes on
+    assert output.flushed[0] == path[:len(output.flushed[0])] and len(output.flushed) >= len(path) // 4
+
+
+def test_write_solution_letters_last_error_after_partial_output():
+    output = io.StringIO()
+    with pytest.raises(ValueError, match="Fork in path"):
+        write_solution('maps/errors/err_fork.txt', output=output, chunk_size=2, letters_first=False)
+    partial, error, end = output.getvalue().split('\n')
+    assert partial.startswith('@--A-') and error == "Error: Fork in path" and end == ''
@@ -1,3 +1,5 @@
+import subprocess
+import sys
 from pathlib import Path
 
 import pytest
@@ -107,3 +109,14 @@ def test_load_map():
     start_node, nodes = load_nodes(str_map=map_str)
     assert len(nodes) == 5
     assert start_node.pos_x == 0 and start_node.pos_y == 0
+
+
+def test_load_nodes_accepts_only_ascii_letters():
+    with pytest.raises(ValueError, match="Invalid char"):
+        load_nodes(['@-Ä-x'])
+
+
+def test_run_as_script():
+    result = subprocess.run([sys.executable, 'src/main.py', '--path=./maps/basic.txt'], capture_output=True,
+                            text=True, check=True)
+    assert result.stdout == "ACB\n@---A---+|C|+---+|+-B-x\n"